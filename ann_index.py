@@ -0,0 +1,145 @@
+# ann_index.py
+# Pilihan tipe index FAISS (flat / HNSW / IVF / IVF-PQ / scalar quantizer)
+# beserta parameternya. Spesifikasi index disimpan di index_meta.json supaya
+# FaissRetriever bisa memuat & mengatur parameter search dengan benar.
+
+import os
+import json
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+INDEX_META_FILE = "index_meta.json"
+
+# Parameter default per tipe index; nilai None dihitung otomatis dari jumlah vektor
+INDEX_TYPES: Dict[str, Dict] = {
+    "flat": {},
+    "hnsw": {"M": 32, "ef_construction": 40, "ef_search": 64},
+    "ivf": {"nlist": None, "nprobe": 8},
+    "ivfpq": {"nlist": None, "nprobe": 8, "m": 64, "nbits": 8},
+    "sq8": {},
+}
+
+
+def resolve_spec(index_type: str = "flat", params: Optional[Dict] = None, count: int = 0) -> Dict:
+    """Gabungkan parameter user dengan default, lalu sesuaikan dengan ukuran data"""
+    index_type = index_type.lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Tipe index tidak dikenal: {index_type} (pilih: {', '.join(INDEX_TYPES)})")
+
+    unknown = set(params or {}) - set(INDEX_TYPES[index_type])
+    if unknown:
+        raise ValueError(f"Parameter tidak dikenal untuk {index_type}: {', '.join(sorted(unknown))}")
+
+    resolved = {**INDEX_TYPES[index_type], **(params or {})}
+    if "nlist" in resolved:
+        if resolved["nlist"] is None:
+            resolved["nlist"] = int(4 * math.sqrt(max(count, 1)))
+        # k-means IVF butuh minimal satu vektor per centroid
+        resolved["nlist"] = max(1, min(int(resolved["nlist"]), max(count, 1)))
+        resolved["nprobe"] = max(1, min(int(resolved["nprobe"]), resolved["nlist"]))
+    if "nbits" in resolved:
+        # Codebook PQ berisi 2^nbits centroid; turunkan bila datanya terlalu sedikit
+        nbits = int(resolved["nbits"])
+        while nbits > 1 and 2 ** nbits > count:
+            nbits -= 1
+        resolved["nbits"] = nbits
+    return {"type": index_type, "params": resolved}
+
+
+def factory_string(spec: Dict, dim: int) -> str:
+    params = spec["params"]
+    index_type = spec["type"]
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params['M']}"
+    if index_type == "ivf":
+        return f"IVF{params['nlist']},Flat"
+    if index_type == "ivfpq":
+        if dim % params["m"]:
+            raise ValueError(f"m={params['m']} harus membagi dimensi vektor ({dim})")
+        return f"IVF{params['nlist']},PQ{params['m']}x{params['nbits']}"
+    if index_type == "sq8":
+        return "SQ8"
+    raise ValueError(f"Tipe index tidak dikenal: {index_type}")
+
+
+def apply_search_params(index, spec: Dict) -> None:
+    """Set parameter waktu-search (nprobe / efSearch) yang tidak selalu ikut tersimpan"""
+    import faiss
+
+    params = spec.get("params", {})
+    space = faiss.ParameterSpace()
+    if "nprobe" in params:
+        space.set_index_parameter(index, "nprobe", int(params["nprobe"]))
+    if "ef_search" in params:
+        space.set_index_parameter(index, "efSearch", int(params["ef_search"]))
+
+
+def build_index(vectors: np.ndarray, spec: Dict):
+    """Buat, latih (jika perlu) dan isi index FAISS sesuai spec (metric L2)"""
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    dim = vectors.shape[1]
+    index = faiss.index_factory(dim, factory_string(spec, dim), faiss.METRIC_L2)
+
+    if spec["type"] == "hnsw":
+        index.hnsw.efConstruction = int(spec["params"]["ef_construction"])
+    if not index.is_trained and len(vectors):
+        index.train(vectors)
+    if len(vectors):
+        index.add(vectors)
+    apply_search_params(index, spec)
+    return index
+
+
+def write_index_meta(index_dir: str, spec: Dict, dim: int, count: int, model_name: str, bilingual: bool = False, build_id: str = None) -> None:
+    meta = {
+        "index_type": spec["type"],
+        "params": spec["params"],
+        "factory": factory_string(spec, dim) if dim else None,
+        "metric": "l2",
+        "dim": dim,
+        "count": count,
+        "model": model_name,
+        "bilingual": bilingual,
+        "build_id": build_id,
+    }
+    with open(os.path.join(index_dir, INDEX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def read_index_meta(index_dir: str) -> Dict:
+    """Isi index_meta.json; index lama tanpa metadata dianggap flat"""
+    path = os.path.join(index_dir, INDEX_META_FILE)
+    if not os.path.exists(path):
+        return {"index_type": "flat", "params": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_index_spec(index_dir: str) -> Dict:
+    """Spec index dari index_meta.json"""
+    meta = read_index_meta(index_dir)
+    return {"type": meta["index_type"], "params": meta.get("params", {})}
+
+
+def index_size_bytes(index) -> int:
+    """Perkiraan memory footprint: ukuran index setelah diserialisasi"""
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def parse_index_params(items) -> Dict:
+    """Ubah argumen CLI ["nlist=64", "nprobe=4"] jadi dict angka"""
+    params = {}
+    for item in items or []:
+        if "=" not in item:
+            raise ValueError(f"Format parameter harus key=value: {item}")
+        key, value = item.split("=", 1)
+        params[key.strip()] = int(value) if value.strip().lstrip("-").isdigit() else float(value)
+    return params
@@ -0,0 +1,122 @@
+# benchmarks/ann_benchmark.py
+# Bandingkan tipe index FAISS: recall@k terhadap exact search, latency search
+# p50/p99 per query, waktu build dan memory footprint.
+#
+# Contoh:
+#   python -m benchmarks.ann_benchmark                       # vektor dari data/faiss_index
+#   python -m benchmarks.ann_benchmark --synthetic 50000      # korpus sintetis lebih besar
+#   python -m benchmarks.ann_benchmark --config flat --config "hnsw:M=16,ef_search=32"
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import INDEX_TYPES, build_index, factory_string, index_size_bytes, parse_index_params, resolve_spec
+from index_bundle import BUNDLE_DIR, IndexBundle
+
+DEFAULT_CONFIGS = ["flat", "hnsw", "ivf", "ivfpq", "sq8"]
+
+
+def load_vectors(args) -> np.ndarray:
+    if args.synthetic:
+        # Data berkelompok (mirip embedding teks), dinormalisasi seperti Cohere v3
+        rng = np.random.default_rng(args.seed)
+        centers = rng.normal(size=(max(args.synthetic // 100, 1), args.dim)).astype("float32")
+        labels = rng.integers(0, len(centers), size=args.synthetic)
+        vectors = centers[labels] + 0.3 * rng.normal(size=(args.synthetic, args.dim)).astype("float32")
+    else:
+        bundle = IndexBundle(os.path.join(args.index, BUNDLE_DIR))
+        vectors = np.array(bundle.vectors, dtype="float32")
+        bundle.close()
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Query = vektor korpus + noise, jadi tetangga terdekatnya tidak trivial"""
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, len(vectors), size=count)
+    queries = vectors[picks] + 0.05 * rng.normal(size=(count, vectors.shape[1])).astype("float32")
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    return np.ascontiguousarray(queries, dtype="float32")
+
+
+def parse_config(text: str):
+    """"hnsw:M=16,ef_search=32" -> ("hnsw", {"M": 16, "ef_search": 32})"""
+    index_type, _, params = text.partition(":")
+    return index_type.strip(), parse_index_params([p for p in params.split(",") if p.strip()])
+
+
+def run_config(vectors, queries, exact_ids, k, index_type, params):
+    spec = resolve_spec(index_type, params, count=len(vectors))
+
+    start = time.perf_counter()
+    index = build_index(vectors, spec)
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    found = np.empty((len(queries), k), dtype="int64")
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found[i] = ids[0]
+
+    hits = sum(len(set(found[i]) & set(exact_ids[i])) for i in range(len(queries)))
+    return {
+        "index_type": spec["type"],
+        "factory": factory_string(spec, vectors.shape[1]),
+        "params": spec["params"],
+        "recall_at_k": hits / float(len(queries) * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "build_seconds": build_seconds,
+        "memory_bytes": index_size_bytes(index),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall/latency/memory tipe index FAISS")
+    parser.add_argument("--index", default="data/faiss_index", help="Folder index (dipakai jika tidak --synthetic)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Jumlah vektor sintetis")
+    parser.add_argument("--dim", type=int, default=1024, help="Dimensi vektor sintetis")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--config", action="append", help=f"tipe[:key=value,...], tipe: {', '.join(INDEX_TYPES)}")
+    parser.add_argument("--json", help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    queries = make_queries(vectors, args.queries, args.seed)
+    k = min(args.k, len(vectors))
+
+    exact = build_index(vectors, resolve_spec("flat"))
+    _, exact_ids = exact.search(queries, k)
+
+    results = []
+    print(f"{len(vectors)} vektor x {vectors.shape[1]} dim, {len(queries)} query, k={k}\n")
+    print(f"{'index':<22}{'recall@k':>10}{'p50 ms':>10}{'p99 ms':>10}{'build s':>10}{'memori MB':>12}")
+    for config in args.config or DEFAULT_CONFIGS:
+        index_type, params = parse_config(config)
+        result = run_config(vectors, queries, exact_ids, k, index_type, params)
+        results.append(result)
+        print(
+            f"{result['factory']:<22}{result['recall_at_k']:>10.3f}{result['p50_ms']:>10.3f}"
+            f"{result['p99_ms']:>10.3f}{result['build_seconds']:>10.2f}{result['memory_bytes'] / 1e6:>12.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(vectors), "dim": int(vectors.shape[1]), "queries": len(queries), "k": k, "results": results}, f, indent=2)
+        print(f"\n✅ Hasil disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/pdf_fixtures.py
+# Generator PDF teks sederhana (tanpa dependency tambahan) untuk benchmark
+# ekstraksi. Isi halaman deterministik berdasarkan seed.
+
+import random
+from typing import List
+
+SENTENCES = [
+    "Mental health is an essential part of overall well-being.",
+    "Depression can affect sleep, appetite and concentration.",
+    "Anxiety often shows up as persistent worry or restlessness.",
+    "Chronic stress may increase the risk of physical illness.",
+    "Terapi kognitif perilaku membantu mengubah pola pikir negatif.",
+    "Konseling memberikan ruang aman untuk bercerita.",
+    "Skrining awal membantu menentukan diagnosis yang tepat.",
+    "The DSM-5 lists the criteria used for a clinical diagnosis.",
+    "Gangguan mood perlu ditangani oleh tenaga profesional.",
+    "The quarterly budget report was approved by the committee.",
+    "Rapat koordinasi dijadwalkan ulang ke minggu depan.",
+    "Daily walks and regular meals support a steady routine.",
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def page_lines(page: int, lines_per_page: int, seed: int) -> List[str]:
+    rng = random.Random(seed * 100003 + page)
+    return [" ".join(rng.sample(SENTENCES, 2)) for _ in range(lines_per_page)]
+
+
+def make_pdf(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """PDF valid dengan `pages` halaman teks Helvetica"""
+    objects = {}
+    font_id = 3
+    objects[font_id] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+    page_ids = []
+    next_id = 4
+    for page in range(pages):
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+
+        text = ["BT /F1 9 Tf 11 TL 40 760 Td"]
+        for line in page_lines(page, lines_per_page, seed):
+            text.append(f"({_escape(line)}) Tj T*")
+        text.append("ET")
+        stream = "\n".join(text).encode("latin-1", "replace")
+
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id)
+        )
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[2] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for obj_id in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset)
+    return bytes(out)
@@ -0,0 +1,259 @@
+# benchmarks/suite.py
+# Benchmark offline: build index, FaissRetriever.search, ekstraksi PDF dan satu
+# giliran chat penuh (run_agent / get_rag_response). Embedder & LLM diganti
+# versi lokal deterministik (EMBEDDINGS_BACKEND=fake, LLM_BACKEND=fake), jadi
+# tidak ada panggilan ke Cohere/Gemini. Hasil ditulis sebagai JSON supaya bisa
+# dibandingkan antar run:
+#
+#   python -m benchmarks.suite                          # semua benchmark
+#   python -m benchmarks.suite --only retrieval pdf     # sebagian
+#   python -m benchmarks.suite --compare lama.json baru.json
+
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BENCHMARKS = ("index_build", "retrieval", "pdf", "chat_turn")
+DEFAULT_RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+QUERIES = [
+    "What does it mean to have a mental illness?",
+    "apa penyebab depresi?",
+    "How can I find a mental health professional?",
+    "bagaimana cara mengatasi kecemasan",
+    "DSM-5 diagnosis criteria",
+    "Can people with mental illness recover?",
+    "obat antidepresan dan efek sampingnya",
+    "What should I do if I know someone who appears to have symptoms?",
+]
+
+
+def latency_stats(samples_ms):
+    samples = np.asarray(samples_ms, dtype="float64")
+    return {
+        "count": int(len(samples)),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench_index_build(args):
+    from create_index import create_faiss_index
+
+    # Cache embedding masih kosong di run pertama, run kedua memakai cache
+    _, cold_ms = timed(create_faiss_index, incremental=False)
+    _, warm_ms = timed(create_faiss_index, incremental=False)
+    _, noop_ms = timed(create_faiss_index, incremental=True)
+
+    with open(os.path.join("data", "faiss_index", "manifest.json"), encoding="utf-8") as f:
+        chunk_count = len(json.load(f)["chunks"])
+    return {
+        "chunks": chunk_count,
+        "full_build_cold_cache_s": cold_ms / 1000,
+        "full_build_warm_cache_s": warm_ms / 1000,
+        "incremental_noop_s": noop_ms / 1000,
+    }
+
+
+def bench_retrieval(args):
+    from retriever import FaissRetriever
+
+    results = {}
+    for index_format in ("bundle", "faiss"):
+        _, load_ms = timed(FaissRetriever, "data/faiss_index", index_format=index_format)
+        retriever = FaissRetriever("data/faiss_index", index_format=index_format)
+        results[index_format] = {"load_ms": load_ms}
+
+        for mode in ("vector", "lexical", "hybrid"):
+            for query in QUERIES:  # pemanasan: isi cache embedding query
+                retriever.search(query, k=3, mode=mode)
+            samples = []
+            start = time.perf_counter()
+            for i in range(args.iterations):
+                _, ms = timed(retriever.search, QUERIES[i % len(QUERIES)], k=3, mode=mode)
+                samples.append(ms)
+            elapsed = time.perf_counter() - start
+            results[index_format][mode] = {**latency_stats(samples), "qps": len(samples) / elapsed}
+    return results
+
+
+def bench_pdf(args):
+    from benchmarks.pdf_fixtures import make_pdf
+    from mental_health_processor import MentalHealthDocumentProcessor
+
+    processor = MentalHealthDocumentProcessor()
+    results = {}
+    for pages in args.pdf_pages:
+        data = make_pdf(pages)
+        samples = []
+        for _ in range(args.pdf_repeats):
+            result, ms = timed(processor.extract_text_from_pdf, io.BytesIO(data))
+            if result.get("status") != "success":
+                raise RuntimeError(f"Ekstraksi PDF gagal: {result.get('error')}")
+            samples.append(ms)
+        stats = latency_stats(samples)
+        results[f"{pages}_pages"] = {
+            **stats,
+            "pages": pages,
+            "bytes": len(data),
+            "pages_per_s": pages / (stats["p50_ms"] / 1000),
+        }
+    return results
+
+
+def bench_chat_turn(args):
+    import main
+    import rag
+    import resources
+    from callback_handler import GeminiCallbackHandler
+
+    llm = resources.get_llm("offline")
+    retriever = rag.load_retriever()
+
+    agent_samples, ttft_samples, rag_samples = [], [], []
+    for i in range(args.turns):
+        query = QUERIES[i % len(QUERIES)]
+        handler = GeminiCallbackHandler()
+        _, ms = timed(main.run_agent, query, "offline", handler)
+        agent_samples.append(ms)
+        ttft_samples.append(handler.metrics.ttft_s * 1000)
+        _, ms = timed(rag.get_rag_response, query, retriever, llm)
+        rag_samples.append(ms)
+    return {
+        "run_agent": latency_stats(agent_samples),
+        "run_agent_ttft": latency_stats(ttft_samples),
+        "get_rag_response": latency_stats(rag_samples),
+    }
+
+
+def prepare_workdir(workdir: str) -> None:
+    """Salin CSV FAQ + style.css ke folder kerja sementara (index dibangun di sana)"""
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    shutil.copy(os.path.join(REPO_ROOT, "data", "Mental_Health_FAQ.csv"), os.path.join(workdir, "data"))
+    shutil.copy(os.path.join(REPO_ROOT, "style.css"), workdir)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(args) -> dict:
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "iterations": args.iterations,
+            "turns": args.turns,
+            "pdf_pages": args.pdf_pages,
+            "pdf_repeats": args.pdf_repeats,
+        },
+        "results": {},
+    }
+
+    selected = args.only or list(BENCHMARKS)
+    # Retrieval & chat turn butuh index, jadi build selalu dijalankan lebih dulu
+    if any(name in selected for name in ("retrieval", "chat_turn")) and "index_build" not in selected:
+        selected = ["index_build"] + selected
+
+    for name in BENCHMARKS:
+        if name in selected:
+            print(f"⏱️  {name}...")
+            report["results"][name] = globals()[f"bench_{name}"](args)
+    return report
+
+
+def flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare(base_path: str, new_path: str) -> None:
+    with open(base_path, encoding="utf-8") as f:
+        base = flatten("", json.load(f)["results"], {})
+    with open(new_path, encoding="utf-8") as f:
+        new = flatten("", json.load(f)["results"], {})
+
+    print(f"{'metric':<55}{'base':>12}{'new':>12}{'delta':>10}")
+    for key in sorted(set(base) & set(new)):
+        delta = (new[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+        print(f"{key:<55}{base[key]:>12.3f}{new[key]:>12.3f}{delta:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline RuangTeduh")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Jalankan benchmark tertentu saja")
+    parser.add_argument("--iterations", type=int, default=200, help="Jumlah query retrieval per mode")
+    parser.add_argument("--turns", type=int, default=20, help="Jumlah giliran chat")
+    parser.add_argument("--pdf-pages", type=int, nargs="+", default=[5, 25, 100])
+    parser.add_argument("--pdf-repeats", type=int, default=3)
+    parser.add_argument("--output", help="File JSON hasil (default: benchmarks/results/bench-<waktu>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Bandingkan dua file hasil")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ruangteduh-bench-")
+    os.environ.update({
+        "EMBEDDINGS_BACKEND": "fake",
+        "LLM_BACKEND": "fake",
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "data", "embedding_cache.sqlite"),
+        "STARTUP_METRICS_PATH": os.path.join(workdir, "data", "metrics", "startup.jsonl"),
+    })
+    # Pesan "missing ScriptRunContext" dari Streamlit tidak relevan di luar `streamlit run`
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    output = os.path.abspath(args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"bench-{time.strftime('%Y%m%d_%H%M%S')}.json"
+    ))
+    prepare_workdir(workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = run_suite(args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"\n✅ Hasil benchmark disimpan ke {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# bm25_index.py
+# Index leksikal BM25 (inverted index) yang dibangun bersama FAISS index.
+# Bobot BM25 tiap posting sudah dihitung saat build, jadi saat query cukup
+# menjumlahkan posting milik term query (tanpa scan seluruh korpus).
+#
+# Isi folder bm25/:
+#   meta.json         -> k1, b, jumlah dokumen, rata-rata panjang dokumen
+#   terms.json        -> {term: [start, end]} ke array posting
+#   postings_doc.npy  -> posisi dokumen (int32), urut per term
+#   postings_w.npy    -> bobot BM25 (float32) untuk posting yang sama
+
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+import numpy as np
+
+BM25_DIR = "bm25"
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Token lowercase; istilah bersambung ("DSM-5") disimpan utuh dan juga per bagian"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-./]", token) if part)
+    return tokens
+
+
+def build_bm25(texts: List[str], out_dir: str, k1: float = 1.5, b: float = 0.75) -> None:
+    """Bangun inverted index BM25; posisi dokumen = urutan `texts`"""
+    doc_terms = [Counter(tokenize(text)) for text in texts]
+    lengths = np.array([sum(counts.values()) for counts in doc_terms], dtype="float32")
+    count = len(texts)
+    avgdl = float(lengths.mean()) if count and lengths.sum() else 1.0
+
+    postings = defaultdict(list)
+    for doc, counts in enumerate(doc_terms):
+        for term, tf in counts.items():
+            postings[term].append((doc, tf))
+
+    terms = {}
+    doc_parts, weight_parts = [], []
+    position = 0
+    for term in sorted(postings):
+        docs, tfs = zip(*postings[term])
+        docs = np.array(docs, dtype="int32")
+        tfs = np.array(tfs, dtype="float32")
+        df = len(docs)
+        idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+        weights = idf * tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * lengths[docs] / avgdl))
+
+        terms[term] = [position, position + df]
+        position += df
+        doc_parts.append(docs)
+        weight_parts.append(weights.astype("float32"))
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "postings_doc.npy"), np.concatenate(doc_parts) if doc_parts else np.zeros(0, "int32"))
+    np.save(os.path.join(out_dir, "postings_w.npy"), np.concatenate(weight_parts) if weight_parts else np.zeros(0, "float32"))
+    with open(os.path.join(out_dir, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(terms, f, ensure_ascii=False)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"k1": k1, "b": b, "count": count, "avgdl": avgdl}, f)
+
+
+def has_bm25(index_path: str) -> bool:
+    return os.path.exists(os.path.join(index_path, BM25_DIR, "meta.json"))
+
+
+class BM25Index:
+    """Pembaca index BM25; array posting di-mmap read-only"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            self.terms = json.load(f)
+        self.postings_doc = np.load(os.path.join(path, "postings_doc.npy"), mmap_mode="r")
+        self.postings_w = np.load(os.path.join(path, "postings_w.npy"), mmap_mode="r")
+
+    def idf(self, term: str) -> float:
+        """IDF BM25 term (0 jika term tidak ada di korpus)"""
+        span = self.terms.get(term)
+        if span is None:
+            return 0.0
+        count = self.meta["count"]
+        df = span[1] - span[0]
+        return math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """(posisi dokumen, skor BM25) terurut, hanya dari posting term query"""
+        spans = [self.terms[t] for t in set(tokenize(query)) if t in self.terms]
+        if not spans:
+            return []
+        docs = np.concatenate([self.postings_doc[start:end] for start, end in spans])
+        weights = np.concatenate([self.postings_w[start:end] for start, end in spans])
+
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        k = min(k, len(unique_docs))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(unique_docs[i]), float(scores[i])) for i in best]
@@ -1,66 +1,166 @@
 # callback_handler.py
+# Metrik streaming per giliran chat (time-to-first-token, token/detik, latensi
+# total) dan pengelompokan token jadi delta untuk UI. Token dihitung dengan
+# tokenizer, bukan jumlah chunk stream, dan diganti usage_metadata dari API
+# jika tersedia. Tampilan tidak lagi digambar ulang dari callback: UI menerima
+# delta lewat st.write_stream.
 import time
-from typing import Any, Dict, List
-import streamlit as st
-from langchain.callbacks.base import BaseCallbackHandler
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from langchain_core.callbacks.base import BaseCallbackHandler
+from conversation_memory import count_tokens
+import telemetry
+
+
+@dataclass
+class TurnMetrics:
+    started_at: Optional[float] = None
+    first_token_at: Optional[float] = None
+    last_token_at: Optional[float] = None
+    ended_at: Optional[float] = None
+    chunks: int = 0              # jumlah chunk stream (satu chunk bisa berisi banyak token)
+    tokens: int = 0              # token output, dihitung saat finish (atau usage_metadata dari API)
+    first_chunk_tokens: int = 0
+    chars: int = 0
+    error: Optional[str] = None
+    usage_tokens: Optional[int] = None
+    parts: List[str] = field(default_factory=list, repr=False)
+
+    def start(self) -> None:
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    def add_token(self, token: str) -> None:
+        now = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = now
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            telemetry.observe("llm.inter_token", now - self.last_token_at, log=False)
+        self.last_token_at = now
+        self.chunks += 1
+        self.chars += len(token)
+        self.parts.append(token)
+
+    def set_output_tokens(self, tokens: int) -> None:
+        """Jumlah token output sebenarnya dari API (menggantikan hitungan lokal)"""
+        self.usage_tokens = tokens
+
+    def finish(self, error: Optional[str] = None) -> None:
+        if self.ended_at is None:
+            self.ended_at = time.perf_counter()
+            # Dihitung sekali dari teks utuh: batas chunk tidak sama dengan batas token
+            text = "".join(self.parts)
+            self.tokens = self.usage_tokens or (count_tokens(text) if text else 0)
+            self.first_chunk_tokens = min(count_tokens(self.parts[0]), self.tokens) if self.parts else 0
+            self._record()
+        self.error = self.error or error
+
+    def _record(self) -> None:
+        """Kirim metrik giliran ke telemetry (histogram TTFT/total + jumlah token)"""
+        if self.ttft_s is not None:
+            telemetry.observe("llm.ttft", self.ttft_s)
+        if self.total_s is not None:
+            telemetry.observe("llm.total", self.total_s, tokens=self.tokens, chunks=self.chunks, tokens_per_s=self.tokens_per_s)
+        telemetry.inc("llm.tokens", self.tokens)
+        telemetry.inc("llm.chunks", self.chunks)
+
+    @property
+    def ttft_s(self) -> Optional[float]:
+        """Time-to-first-token (detik)"""
+        if self.started_at is None or self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_s(self) -> Optional[float]:
+        if self.started_at is None or self.ended_at is None:
+            return None
+        return self.ended_at - self.started_at
+
+    @property
+    def tokens_per_s(self) -> Optional[float]:
+        """Kecepatan generate (token output per detik) setelah chunk pertama"""
+        if self.first_token_at is None or self.ended_at is None or self.chunks < 2:
+            return None
+        elapsed = self.ended_at - self.first_token_at
+        return (self.tokens - self.first_chunk_tokens) / elapsed if elapsed > 0 else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ttft_s": self.ttft_s,
+            "tokens_per_s": self.tokens_per_s,
+            "total_s": self.total_s,
+            "tokens": self.tokens,
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "error": self.error,
+        }
+
 
 class GeminiCallbackHandler(BaseCallbackHandler):
-    def __init__(self, max_update_rate: float = 0.3):
-        self.response = ""
-        self.last_update = time.time()
-        self.last_token_time = time.time()
-        self.container = st.empty()
-        self.max_update_rate = max_update_rate
-        self.token_count = 0
-        
-    def on_llm_start(self, serialized: Dict[str, Any], 
-                    prompts: List[str], **kwargs: Any) -> None:
-        """Sederhanakan animasi loading"""
-        with self.container:
-            st.markdown("⚠️ <i>Mempersiapkan respon...</i>", unsafe_allow_html=True)
+    """Catat metrik streaming satu giliran; hasilnya ada di `self.metrics`"""
+
+    def __init__(self):
+        self.metrics = TurnMetrics()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self.metrics.start()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        self.metrics.start()
 
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        """Optimasi update rate dengan dynamic delay"""
-        self.response += token
-        self.token_count += 1
-        
-        current_time = time.time()
-        elapsed = current_time - self.last_update
-        
-        # Dynamic update rate berdasarkan panjang token
-        dynamic_delay = max(
-            self.max_update_rate, 
-            0.5 - min(self.token_count * 0.01, 0.4)  # Lebih cepat saat token banyak
-        )
-        
-        if elapsed >= dynamic_delay:
-            self._update_display(False)
-            self.last_update = current_time
-            self.last_token_time = current_time
+        self.metrics.add_token(token)
 
     def on_llm_end(self, response, **kwargs: Any) -> None:
-        """Handle response kosong"""
-        if not self.response.strip():
-            self.response = "Hai, Saya Teman kamu"
-        self._update_display(True)
-        
-    def _update_display(self, final: bool):
-        """Format yang lebih bersih dengan batasan panjang"""
-        truncated = (self.response[:200] + '...') if len(self.response) > 200 else self.response
-        
-        with self.container:
-            if final:
-                st.markdown(f"""
-                <div class='assistant-response'>
-                    <div class='response-header'>💡 Respon</div>
-                    <div class='response-content'>{truncated}</div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                cursor = "▌" if (time.time() - self.last_token_time) < 0.5 else "&nbsp;"
-                st.markdown(f"""
-                <div class='assistant-response'>
-                    <div class='response-header'>🔄 Memproses</div>
-                    <div class='response-content'>{truncated}{cursor}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        usage = _usage_metadata(response)
+        if usage and usage.get("output_tokens"):
+            self.metrics.set_output_tokens(usage["output_tokens"])
+        self.metrics.finish()
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.metrics.finish(error=str(error))
+
+
+def _usage_metadata(response) -> Optional[Dict[str, Any]]:
+    """usage_metadata pesan hasil (jika model mengirimkannya), dari LLMResult"""
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    return None
+
+
+def coalesce_deltas(
+    tokens: Iterable[str],
+    min_interval: float = 0.05,
+    max_interval: float = 0.25,
+    chars_per_step: int = 2000
+) -> Iterator[str]:
+    """Gabungkan token jadi delta; frekuensi update mengikuti laju token.
+
+    Token yang datang lebih jarang dari interval update langsung diteruskan.
+    Saat laju tinggi, token digabung (jumlah per delta = laju x interval).
+    Interval melebar dari min_interval sampai max_interval seiring panjang
+    jawaban, karena biaya render di UI ikut tumbuh dengan panjang teks.
+    """
+    buffer = []
+    last_flush = None
+    chars = 0
+    for token in tokens:
+        if not token:
+            continue
+        now = time.perf_counter()
+        chars += len(token)
+        buffer.append(token)
+        interval = min(max_interval, min_interval * (1 + chars / chars_per_step))
+        # Token pertama selalu langsung dikirim (TTFT yang terlihat user)
+        if last_flush is None or now - last_flush >= interval:
+            yield "".join(buffer)
+            buffer.clear()
+            last_flush = now
+    if buffer:
+        yield "".join(buffer)
@@ -0,0 +1,185 @@
+# conversation_memory.py
+# Memori percakapan dengan budget token: giliran terbaru dikirim apa adanya,
+# giliran yang lebih lama dilipat ke ringkasan berjalan. Ringkasan diperbarui
+# secara inkremental (ringkasan lama + giliran yang baru keluar dari jendela),
+# bukan dibuat ulang dari seluruh riwayat. Ukuran prompt jadi terbatas
+# (ringkasan + jendela + input) berapa pun panjang session-nya.
+
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+CONVERSATION_HISTORY_TOKENS = int(os.getenv("CONVERSATION_HISTORY_TOKENS", "1500"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))
+TOKEN_ENCODING = "cl100k_base"
+# Setelah dipadatkan, jendela verbatim dikurangi sampai fraksi budget ini supaya
+# ringkasan tidak perlu diperbarui di setiap giliran
+COMPACT_TARGET = 0.6
+
+SUMMARY_PROMPT = """Perbarui ringkasan percakapan antara user dan asisten kesehatan mental.
+Pertahankan fakta penting tentang user (nama, perasaan, masalah, hal yang sudah dicoba)
+dan janji atau saran dari asisten. Tulis maksimal {max_words} kata dalam bahasa Indonesia.
+
+Ringkasan sebelumnya:
+{summary}
+
+Percakapan baru:
+{turns}
+
+Ringkasan terbaru:"""
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        # Encoding tiktoken diunduh saat pertama dipakai; tanpa jaringan pakai perkiraan
+        print(f"⚠️ tiktoken tidak tersedia, jumlah token diperkirakan: {str(e)}")
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Potong teks dari belakang supaya muat dalam max_tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _format_turns(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(
+        f"{'User' if message['role'] == 'user' else 'Asisten'}: {message['content']}"
+        for message in messages
+    )
+
+
+class ConversationMemory:
+    """Ringkasan berjalan + jendela giliran terbaru dalam budget token.
+
+    `messages` adalah list dict {role, content} (st.session_state.messages).
+    Memori hanya mencatat berapa pesan awal yang sudah dilipat ke ringkasan,
+    jadi objek ini aman disimpan di session_state di antara rerun.
+    """
+
+    def __init__(
+        self,
+        history_tokens: int = CONVERSATION_HISTORY_TOKENS,
+        summary_tokens: int = CONVERSATION_SUMMARY_TOKENS
+    ):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self.summarized = 0  # jumlah pesan awal yang sudah masuk ringkasan
+        self.generation = 0  # naik setiap reset; hasil ringkasan dari generasi lama dibuang
+
+    def reset(self) -> None:
+        self.summary = ""
+        self.summarized = 0
+        self.generation += 1
+
+    def forget(self, count: int) -> None:
+        """`count` pesan awal (yang sudah diringkas) dibuang dari list riwayat"""
+        self.summarized -= min(count, self.summarized)
+
+    def _sync(self, messages: List[Dict[str, str]]) -> None:
+        # Riwayat dihapus / diganti: ringkasan lama tidak berlaku lagi
+        if len(messages) < self.summarized:
+            self.reset()
+
+    def recent(self, messages: List[Dict[str, str]], budget: Optional[int] = None) -> List[Dict[str, str]]:
+        """Pesan terbaru (belum diringkas) yang muat dalam budget, urut kronologis"""
+        self._sync(messages)
+        budget = self.history_tokens if budget is None else budget
+        window = []
+        used = 0
+        for message in reversed(messages[self.summarized:]):
+            tokens = count_tokens(message["content"]) + 4  # overhead role/format per pesan
+            if used + tokens > budget:
+                break
+            window.append(message)
+            used += tokens
+        window.reverse()
+        return window
+
+    def to_langchain(self, messages: List[Dict[str, str]], user_input: str) -> list:
+        """Prompt untuk LLM: ringkasan (system) + giliran terbaru + input user"""
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        prompt = []
+        if self.summary:
+            prompt.append(SystemMessage(content=f"Ringkasan percakapan sebelumnya:\n{self.summary}"))
+        for message in self.recent(messages):
+            cls = HumanMessage if message["role"] == "user" else AIMessage
+            prompt.append(cls(content=message["content"]))
+        prompt.append(HumanMessage(content=user_input))
+        return prompt
+
+    def fold_candidates(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Pesan lama yang perlu dilipat ke ringkasan ([] jika jendela masih muat budget)"""
+        self._sync(messages)
+        pending = messages[self.summarized:]
+        total = sum(count_tokens(message["content"]) + 4 for message in pending)
+        if total <= self.history_tokens:
+            return []
+        keep = len(self.recent(messages, int(self.history_tokens * COMPACT_TARGET)))
+        return pending[:len(pending) - keep]
+
+    def summary_prompt(self, folded: List[Dict[str, str]]) -> str:
+        return SUMMARY_PROMPT.format(
+            max_words=int(self.summary_tokens * 0.7),
+            summary=self.summary or "(belum ada)",
+            turns=truncate_tokens(_format_turns(folded), self.history_tokens)
+        )
+
+    def apply_fold(self, folded: List[Dict[str, str]], summary: Optional[str] = None, generation: Optional[int] = None) -> bool:
+        """Terapkan ringkasan untuk `folded` (pesan setelah `summarized`).
+
+        summary kosong/None -> ringkasan ekstraktif. Hasil dari generasi lama
+        (memori sudah di-reset) diabaikan. Return True jika ringkasan berubah.
+        """
+        if not folded or (generation is not None and generation != self.generation):
+            return False
+        summary = (summary or "").strip()
+        if not summary:
+            lines = [self.summary] if self.summary else []
+            lines += [line[:160] for line in _format_turns(folded).split("\n")]
+            # Simpan bagian terbaru saja jika ringkasan ekstraktif melebihi budget
+            while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_tokens:
+                lines.pop(0)
+            summary = "\n".join(lines)
+
+        self.summary = truncate_tokens(summary, self.summary_tokens)
+        self.summarized += len(folded)
+        return True
+
+    def compact(self, messages: List[Dict[str, str]], summarize: Optional[Callable[[str], str]] = None) -> bool:
+        """Lipat pesan lama ke ringkasan jika jendela melebihi budget (sinkron).
+
+        `summarize(prompt) -> str` biasanya memanggil LLM; jika gagal atau
+        tidak ada, ringkasan dibuat ekstraktif dari potongan tiap pesan.
+        main.py memakai fold_candidates / summary_prompt / apply_fold supaya
+        panggilan LLM berjalan di background. Return True jika ringkasan berubah.
+        """
+        folded = self.fold_candidates(messages)
+        if not folded:
+            return False
+
+        summary = None
+        if summarize is not None:
+            try:
+                summary = summarize(self.summary_prompt(folded))
+            except Exception as e:
+                print(f"⚠️ Gagal memperbarui ringkasan percakapan: {str(e)}")
+        return self.apply_fold(folded, summary)
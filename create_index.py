@@ -1,17 +1,223 @@
 # ✅ create_index.py (VERSI FINAL, TANPA ERROR)
 # Membuat FAISS index dari CSV dengan Cohere + LangChain + User-Agent aman
+#
+# Mode default adalah incremental: setiap chunk disimpan bersama hash-nya di
+# manifest.json, sehingga hanya chunk yang baru/berubah yang di-embed ulang dan
+# chunk dari baris yang dihapus ikut dibuang dari index. Hasil build ditulis ke
+# folder staging di `<index_dir>_builds/`, lalu dipublikasikan dengan rename
+# folder (tanpa symlink, jalan juga di Windows): build aktif dipindah ke
+# `<index_dir>_builds/`, staging di-rename jadi `index_dir`. FaissRetriever tidak
+# pernah membaca folder yang setengah jadi, dan memuat ulang jika build_id di
+# index_meta.json berganti selagi ia memuat.
+# Selain index.faiss/index.pkl, setiap build juga berisi `bundle/` (lihat
+# index_bundle.py) yang bisa dibuka read-only via mmap tanpa pickle. Vektor di
+# bundle juga jadi sumber vektor chunk lama saat build incremental.
+#
+# Tipe index dipilih lewat --index-type (flat/hnsw/ivf/ivfpq/sq8, lihat
+# ann_index.py) dan dicatat di index_meta.json. Index leksikal BM25 (`bm25/`,
+# lihat bm25_index.py) ikut dibangun untuk pencarian hybrid di FaissRetriever.
+#
+# Dengan --bilingual setiap chunk (FAQ berbahasa Inggris) juga diterjemahkan
+# sekali ke bahasa Indonesia saat build (TranslationService, hasilnya di-cache)
+# dan versi terjemahan ikut di-embed. Metadata terjemahan menunjuk ke chunk
+# sumbernya, dan FaissRetriever menggabungkan hit per sumber, jadi query
+# berbahasa Indonesia cocok tanpa menerjemahkan apa pun saat query.
 
 import os
+import json
+import time
 import shutil
-import pandas as pd
-import cohere
+import hashlib
+import uuid
+import argparse
+import numpy as np
 from dotenv import load_dotenv
-from langchain_cohere import CohereEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.schema import Document
+from ann_index import INDEX_TYPES, build_index, factory_string, parse_index_params, read_index_meta, read_index_spec, resolve_spec, write_index_meta
+from bm25_index import BM25_DIR, build_bm25, has_bm25
+from index_bundle import BUNDLE_DIR, IndexBundle, has_bundle, write_bundle
+from embedding_cache import DEFAULT_BATCH_SIZE, DEFAULT_MAX_CONCURRENCY, get_embeddings
+from telemetry import span
+
+EMBEDDING_MODEL = "embed-multilingual-v3.0"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+TRANSLATION_LANGUAGE = "id"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+KEEP_BUILDS = 2
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_id(question_id: str, chunk_hash: str) -> str:
+    """ID dokumen deterministik dari Question_ID + isi chunk"""
+    return hashlib.sha1(f"{question_id}:{chunk_hash}".encode("utf-8")).hexdigest()
+
+
+def _load_chunks(csv_path: str):
+    """Baca CSV, gabungkan kolom per baris, lalu pecah jadi chunk ber-ID"""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path).fillna("")
+    df["combined"] = df.astype(str).agg(" ".join, axis=1)
+    docs = [
+        Document(page_content=text, metadata={"Question_ID": str(qid)})
+        for qid, text in zip(df["Question_ID"].astype(str), df["combined"])
+    ]
+
+    splitter = CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = {}
+    for chunk in splitter.split_documents(docs):
+        chunk_hash = _hash_text(chunk.page_content)
+        doc_id = _chunk_id(chunk.metadata["Question_ID"], chunk_hash)
+        chunk.metadata["chunk_hash"] = chunk_hash
+        # Chunk identik di baris yang sama cukup disimpan sekali
+        chunks.setdefault(doc_id, chunk)
+    return chunks
+
+
+def _add_translations(chunks, target: str = TRANSLATION_LANGUAGE) -> int:
+    """Tambahkan versi terjemahan setiap chunk (ID dari chunk sumber + bahasa + isi terjemahan)"""
+    from tools.translate_tools import FAILED_TRANSLATION, get_translation_service
+
+    sources = list(chunks.items())
+    with span("index.translate_chunks", texts=len(sources)):
+        translations = get_translation_service().translate_batch([chunk.page_content for _, chunk in sources], target)
+
+    added = 0
+    for (source_id, chunk), text in zip(sources, translations):
+        # Gagal diterjemahkan / hasil sama dengan aslinya: cukup versi asli
+        if not text or text == FAILED_TRANSLATION or text.strip() == chunk.page_content.strip():
+            continue
+        # ID ikut hash teks terjemahan: terjemahan berubah (backend lain, cache
+        # dihapus) = chunk baru, bukan vektor lama dengan teks baru
+        text_hash = _hash_text(text)
+        doc_id = hashlib.sha1(f"{source_id}:{target}:{text_hash}".encode("utf-8")).hexdigest()
+        chunks[doc_id] = Document(page_content=text, metadata={
+            "Question_ID": chunk.metadata["Question_ID"],
+            "chunk_hash": text_hash,
+            "source_id": source_id,
+            "lang": target,
+        })
+        added += 1
+    return added
+
+
+def _read_manifest(index_dir: str):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Manifest tidak bisa dibaca ({e}), build ulang penuh.")
+        return None
+
+
+def _manifest_compatible(manifest, model_name: str) -> bool:
+    return bool(manifest) and (
+        manifest.get("version") == MANIFEST_VERSION
+        and manifest.get("model") == model_name
+        and manifest.get("chunk_size") == CHUNK_SIZE
+        and manifest.get("chunk_overlap") == CHUNK_OVERLAP
+    )
+
+
+def _write_manifest(index_dir: str, chunks, model_name: str) -> None:
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "model": model_name,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "chunks": {
+            doc_id: {
+                "question_id": chunk.metadata["Question_ID"],
+                "hash": chunk.metadata["chunk_hash"],
+            }
+            for doc_id, chunk in chunks.items()
+        },
+    }
+    with open(os.path.join(index_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def _new_build_id() -> str:
+    # Suffix acak: dua build di detik & proses yang sama tidak boleh bertabrakan
+    return time.strftime("%Y%m%d_%H%M%S") + f"-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def _publish_index(staging_dir: str, index_dir: str, builds_dir: str) -> None:
+    """Jadikan folder staging sebagai `index_dir`; build lama dipindah ke `builds_dir`"""
+    if os.path.islink(index_dir):
+        os.remove(index_dir)  # format publish sebelumnya (symlink ke builds/)
+    elif os.path.isdir(index_dir):
+        os.rename(index_dir, os.path.join(builds_dir, f"retired-{_new_build_id()}"))
+    # Di antara dua rename ini `index_dir` sesaat tidak ada; reader cukup mencoba lagi
+    os.rename(staging_dir, index_dir)
+
+    # Simpan beberapa build lama untuk rollback manual
+    retired = sorted(
+        (name for name in os.listdir(builds_dir) if not name.startswith(".")),
+        key=lambda name: os.path.getmtime(os.path.join(builds_dir, name)),
+    )
+    for name in retired[:-(KEEP_BUILDS - 1) or None]:
+        shutil.rmtree(os.path.join(builds_dir, name), ignore_errors=True)
+
+
+def create_faq_index(csv_path: str = "data/Mental_Health_FAQ.csv", index_dir: str = "data/faq_index"):
+    """Index khusus kolom Questions (untuk fast path jawaban FAQ tanpa LLM)"""
+    import pandas as pd
+
+    load_dotenv()
+    builds_dir = f"{index_dir}_builds"
+
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"❌ File CSV tidak ditemukan: {csv_path}")
+
+    df = pd.read_csv(csv_path).fillna("")
+    df = df[df["Questions"].astype(str).str.strip() != ""]
+    entries = [
+        {"question_id": str(qid), "question": str(question).strip(), "answer": str(answer).strip()}
+        for qid, question, answer in zip(df["Question_ID"], df["Questions"], df["Answers"])
+    ]
+
+    embeddings = get_embeddings(model=EMBEDDING_MODEL)
+    with span("index.embed_faq", texts=len(entries)):
+        vectors = np.asarray(
+            embeddings.embed_documents([entry["question"] for entry in entries]), dtype="float32"
+        )
+    # Normalisasi sekali di sini, jadi similarity saat query cukup dot product
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    os.makedirs(builds_dir, exist_ok=True)
+    build_id = _new_build_id()
+    staging_dir = os.path.join(builds_dir, f".staging-{build_id}")
+    os.makedirs(staging_dir)
+    np.save(os.path.join(staging_dir, "vectors.npy"), vectors)
+    with open(os.path.join(staging_dir, "entries.json"), "w", encoding="utf-8") as f:
+        json.dump({"model": embeddings.model_name, "entries": entries}, f, ensure_ascii=False)
+
+    _publish_index(staging_dir, index_dir, builds_dir)
+
+    print(f"✅ FAQ question index ({len(entries)} pertanyaan) disimpan ke folder: {index_dir}")
+
+
+def create_faiss_index(
+    incremental: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    index_type: str = None,
+    index_params: dict = None,
+    bilingual: bool = None
+):
+    from langchain_community.docstore.in_memory import InMemoryDocstore
 
-def create_faiss_index():
     load_dotenv()
 
     # ✅ Set user agent via ENV (bukan di parameter)
@@ -20,42 +226,126 @@ def create_faiss_index():
     # Path ke file dan index
     csv_path = "data/Mental_Health_FAQ.csv"
     index_dir = "data/faiss_index"
+    builds_dir = f"{index_dir}_builds"
 
     # Validasi file CSV
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"❌ File CSV tidak ditemukan: {csv_path}")
 
-    # Hapus index lama jika ada
-    if os.path.exists(index_dir):
-        shutil.rmtree(index_dir)
-    os.makedirs(index_dir, exist_ok=True)
+    current_dir = index_dir if os.path.exists(index_dir) else None
 
-    # Ambil API Key
-    cohere_api_key = os.getenv("COHERE_API_KEY")
-    if not cohere_api_key:
-        raise ValueError("❌ COHERE_API_KEY tidak ditemukan di file .env")
+    # Baca data dan split jadi chunks (key = Question_ID + hash chunk)
+    chunks = _load_chunks(csv_path)
+    # Tanpa --bilingual/--no-bilingual, pertahankan mode build sebelumnya
+    if bilingual is None:
+        bilingual = bool(current_dir) and bool(read_index_meta(current_dir).get("bilingual"))
+    if bilingual:
+        print(f"🌐 {_add_translations(chunks)} chunk terjemahan ({TRANSLATION_LANGUAGE}) ditambahkan")
+    ids = list(chunks)
+    # Terjemahan menunjuk ke posisi chunk sumbernya (dipakai retriever untuk dedupe)
+    positions = {doc_id: i for i, doc_id in enumerate(ids)}
+    for doc_id in ids:
+        source_id = chunks[doc_id].metadata.get("source_id")
+        if source_id is not None:
+            chunks[doc_id].metadata["source_position"] = positions[source_id]
 
-    # Baca dan gabungkan data
-    df = pd.read_csv(csv_path).fillna("")
-    df["combined"] = df.astype(str).agg(" ".join, axis=1)
-    docs = [Document(page_content=text) for text in df["combined"].tolist()]
-
-    # Split teks jadi chunks
-    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
-
-    # Embeddings & vectorstore
-    cohere_client = cohere.Client(api_key=cohere_api_key)
-    embeddings = CohereEmbeddings(
-        client=cohere_client,
-        model="embed-multilingual-v3.0",  # ✅ WAJIB
-        async_client=None
+    # Embeddings & vectorstore (Cohere + cache disk, dikirim per batch secara paralel)
+    embeddings = get_embeddings(
+        model=EMBEDDING_MODEL,  # ✅ WAJIB
+        batch_size=batch_size,
+        max_concurrency=max_concurrency
     )
 
-    vectorstore = FAISS.from_documents(chunks, embeddings)
-    vectorstore.save_local(index_dir)
+    # Tanpa --index-type, pertahankan tipe & parameter index yang sedang dipakai
+    if index_type is None:
+        previous_spec = read_index_spec(current_dir) if current_dir else {"type": "flat", "params": {}}
+        index_type = previous_spec["type"]
+        index_params = {**previous_spec["params"], **(index_params or {})}
+    spec = resolve_spec(index_type, index_params, count=len(ids))
+
+    manifest = _read_manifest(current_dir) if (incremental and current_dir) else None
+    previous = None
+    if _manifest_compatible(manifest, embeddings.model_name) and has_bundle(current_dir):
+        previous = IndexBundle(os.path.join(current_dir, BUNDLE_DIR))
+        if len(previous) != len(manifest["chunks"]):
+            print("⚠️ Bundle tidak cocok dengan manifest, build ulang penuh.")
+            previous = None
 
-    print(f"✅ FAISS index berhasil disimpan ke folder: {index_dir}")
+    if previous is not None:
+        # Urutan vektor di bundle sama dengan urutan chunk di manifest
+        old_positions = {doc_id: i for i, doc_id in enumerate(manifest["chunks"])}
+        removed = set(old_positions) - set(chunks)
+        added = [i for i, doc_id in enumerate(ids) if doc_id not in old_positions]
+
+        if (
+            not removed and not added and read_index_spec(current_dir) == spec and has_bm25(current_dir)
+            and bool(read_index_meta(current_dir).get("bilingual")) == bilingual
+        ):
+            print(f"✅ FAISS index sudah up-to-date: {index_dir}")
+            return
+
+        # Vektor chunk lama diambil dari bundle, hanya chunk baru/berubah yang di-embed
+        vectors = np.empty((len(ids), previous.dim), dtype="float32")
+        kept = [i for i, doc_id in enumerate(ids) if doc_id in old_positions]
+        if kept:
+            vectors[kept] = previous.vectors[[old_positions[ids[i]] for i in kept]]
+        if added:
+            with span("index.embed_chunks", texts=len(added), incremental=True):
+                vectors[added] = embeddings.embed_documents([chunks[ids[i]].page_content for i in added])
+        previous.close()
+        if added or removed:
+            print(f"🔁 Incremental: {len(added)} chunk baru/berubah, {len(removed)} chunk dihapus")
+        else:
+            print(f"🔁 Chunk tidak berubah, index dibangun ulang sebagai {spec['type']}")
+    else:
+        with span("index.embed_chunks", texts=len(ids), incremental=False):
+            vectors = np.asarray(
+                embeddings.embed_documents([chunks[doc_id].page_content for doc_id in ids]), dtype="float32"
+            )
+        print(f"🆕 Build penuh: {len(ids)} chunk di-index")
+
+    # Index ANN dibangun ulang dari semua vektor (murah, tanpa panggilan API)
+    index = build_index(vectors, spec)
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore({doc_id: chunks[doc_id] for doc_id in ids}),
+        index_to_docstore_id=dict(enumerate(ids))
+    )
+
+    # Tulis ke folder staging dulu, baru dipublikasikan setelah lengkap
+    os.makedirs(builds_dir, exist_ok=True)
+    build_id = _new_build_id()
+    staging_dir = os.path.join(builds_dir, f".staging-{build_id}")
+    vectorstore.save_local(staging_dir)
+    write_bundle(
+        os.path.join(staging_dir, BUNDLE_DIR), ids, vectors,
+        [chunks[doc_id] for doc_id in ids], embeddings.model_name
+    )
+    # Inverted index BM25 untuk pencarian hybrid (posisi dokumen = urutan ids)
+    build_bm25([chunks[doc_id].page_content for doc_id in ids], os.path.join(staging_dir, BM25_DIR))
+    write_index_meta(staging_dir, spec, vectors.shape[1], len(ids), embeddings.model_name, bilingual=bilingual, build_id=build_id)
+    _write_manifest(staging_dir, chunks, embeddings.model_name)
+
+    _publish_index(staging_dir, index_dir, builds_dir)
+
+    print(f"✅ FAISS index ({factory_string(spec, vectors.shape[1])}) berhasil disimpan ke folder: {index_dir}")
 
 if __name__ == "__main__":
-    create_faiss_index()
+    parser = argparse.ArgumentParser(description="Buat/perbarui FAISS index dari FAQ CSV")
+    parser.add_argument("--full", action="store_true", help="Paksa build ulang penuh (tanpa incremental)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Jumlah teks per request embedding")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="Maksimum request embedding paralel")
+    parser.add_argument("--index-type", choices=sorted(INDEX_TYPES), help="Tipe index FAISS (default: tipe build sebelumnya, atau flat)")
+    parser.add_argument("--index-param", action="append", metavar="KEY=VALUE", help="Parameter index, mis. nlist=64 atau M=16 (boleh berulang)")
+    parser.add_argument("--bilingual", action=argparse.BooleanOptionalAction, default=None, help="Index juga terjemahan Indonesia tiap chunk (default: mode build sebelumnya)")
+    args = parser.parse_args()
+    create_faiss_index(
+        incremental=not args.full,
+        batch_size=args.batch_size,
+        max_concurrency=args.concurrency,
+        index_type=args.index_type,
+        index_params=parse_index_params(args.index_param),
+        bilingual=args.bilingual
+    )
+    create_faq_index()
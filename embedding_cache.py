@@ -0,0 +1,261 @@
+# embedding_cache.py
+# Cache embedding di disk (SQLite) + wrapper batching/concurrency untuk
+# CohereEmbeddings. Dipakai bersama oleh create_index.py dan FaissRetriever.
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from telemetry import span
+
+DEFAULT_MODEL = "embed-multilingual-v3.0"
+DEFAULT_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite")
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+DEFAULT_BATCH_SIZE = 96          # batas teks per request embed Cohere
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class EmbeddingCache:
+    """Cache vektor di SQLite, key = hash(model + jenis input + teks), eviction LRU"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Ambil vektor yang ada di cache, sekaligus perbarui waktu akses (LRU)"""
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            # SQLite membatasi jumlah parameter per query, jadi diproses per 500 key
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+            self._conn.commit()
+
+    def _evict(self, excess: int) -> None:
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class HashingEmbeddings(Embeddings):
+    """Embedder lokal deterministik (feature hashing) untuk testing offline"""
+
+    def __init__(self, size: int = 1024):
+        self.size = size
+        self.model = f"local-hashing-{size}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        words = re.findall(r"\w+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrapper Embeddings: cache di disk + batch berukuran tetap yang dikirim paralel"""
+
+    def __init__(
+        self,
+        base: Embeddings,
+        model_name: str,
+        cache: Optional[EmbeddingCache] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.base = base
+        self.model_name = model_name
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embeddings.embed_documents", texts=len(texts)) as current:
+            return self._embed_documents(texts, current)
+
+    def _embed_documents(self, texts: List[str], current) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.model_name, "document", t) for t in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys))) if self.cache is not None else {}
+
+        # Teks yang belum ada di cache (duplikat cukup di-embed sekali)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        current.set(cache_hits=len(texts) - len(missing), embedded=len(missing))
+        if missing:
+            missing_keys = list(missing)
+            batches = [
+                missing_keys[i:i + self.batch_size]
+                for i in range(0, len(missing_keys), self.batch_size)
+            ]
+            fresh = {}
+            if len(batches) == 1 or self.max_concurrency <= 1:
+                results = [self.base.embed_documents([missing[k] for k in b]) for b in batches]
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                    results = list(pool.map(
+                        lambda b: self.base.embed_documents([missing[k] for k in b]), batches
+                    ))
+            for batch, batch_vectors in zip(batches, results):
+                fresh.update(zip(batch, batch_vectors))
+            if self.cache is not None:
+                self.cache.put_many(fresh)
+            vectors.update(fresh)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        with span("embeddings.embed_query") as current:
+            key = EmbeddingCache.make_key(self.model_name, "query", text)
+            if self.cache is not None:
+                hit = self.cache.get_many([key])
+                if key in hit:
+                    current.set(cache_hit=True)
+                    return hit[key]
+            current.set(cache_hit=False)
+            vector = self.base.embed_query(text)
+            if self.cache is not None:
+                self.cache.put_many({key: vector})
+            return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed banyak query sekaligus (satu request per batch, bukan per query)"""
+        with span("embeddings.embed_queries", texts=len(texts)) as current:
+            keys = [EmbeddingCache.make_key(self.model_name, "query", t) for t in texts]
+            vectors = self.cache.get_many(list(dict.fromkeys(keys))) if self.cache is not None else {}
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in vectors:
+                    missing.setdefault(key, text)
+            current.set(cache_hits=len(texts) - len(missing), embedded=len(missing))
+
+            missing_keys = list(missing)
+            fresh = {}
+            for start in range(0, len(missing_keys), self.batch_size):
+                batch = missing_keys[start:start + self.batch_size]
+                fresh.update(zip(batch, self._base_embed_queries([missing[k] for k in batch])))
+            if fresh and self.cache is not None:
+                self.cache.put_many(fresh)
+            vectors.update(fresh)
+            return [vectors[key] for key in keys]
+
+    def _base_embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # CohereEmbeddings.embed menerima banyak teks dengan input_type query
+        if callable(getattr(self.base, "embed", None)):
+            return self.base.embed(texts, input_type="search_query")
+        return [self.base.embed_query(text) for text in texts]
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> EmbeddingCache:
+    """Satu instance cache per proses, dipakai bersama index builder & retriever"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
+
+
+def get_embeddings(model: str = DEFAULT_MODEL, use_cache: bool = True, **kwargs) -> CachedEmbeddings:
+    """Buat embeddings sesuai EMBEDDINGS_BACKEND ("cohere" default, atau "fake" untuk offline)"""
+    cache = get_default_cache() if use_cache else None
+
+    if os.getenv("EMBEDDINGS_BACKEND", "cohere").lower() == "fake":
+        base = HashingEmbeddings()
+        return CachedEmbeddings(base, base.model, cache=cache, **kwargs)
+
+    import cohere
+    from langchain_cohere import CohereEmbeddings
+
+    cohere_api_key = os.getenv("COHERE_API_KEY")
+    if not cohere_api_key:
+        raise ValueError("❌ COHERE_API_KEY tidak ditemukan di .env")
+
+    # ✅ Gunakan client eksplisit (hindari error client/async_client)
+    base = CohereEmbeddings(
+        client=cohere.Client(api_key=cohere_api_key),
+        model=model,
+        async_client=None
+    )
+    return CachedEmbeddings(base, model, cache=cache, **kwargs)
@@ -0,0 +1,84 @@
+# faq_matcher.py
+# Fast path: jika pertanyaan user hampir sama dengan salah satu pertanyaan di
+# Mental_Health_FAQ.csv, langsung pakai jawaban kurasi tanpa memanggil LLM.
+
+import os
+import json
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+from embedding_cache import get_embeddings
+
+DEFAULT_FAQ_INDEX = "data/faq_index"
+DEFAULT_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.85"))
+
+
+@dataclass
+class FaqMatch:
+    question_id: str
+    question: str
+    answer: str
+    score: float
+
+
+class FaqMatcher:
+    """Cocokkan query ke index pertanyaan FAQ (dibuat oleh create_index.create_faq_index)"""
+
+    def __init__(self, index_path: str = DEFAULT_FAQ_INDEX, threshold: float = DEFAULT_THRESHOLD, embeddings=None):
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"❌ Index FAQ tidak ditemukan di: {index_path}")
+
+        with open(os.path.join(index_path, "entries.json"), encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.entries = data["entries"]
+        self.vectors = np.load(os.path.join(index_path, "vectors.npy"))
+        self.threshold = threshold
+        self.embeddings = embeddings or get_embeddings()
+
+        if len(self.entries) != len(self.vectors):
+            raise RuntimeError("Index FAQ tidak konsisten: jumlah vektor != jumlah entri")
+        if getattr(self.embeddings, "model_name", data["model"]) != data["model"]:
+            raise RuntimeError(
+                f"Index FAQ dibuat dengan model {data['model']}, bukan {self.embeddings.model_name}"
+            )
+
+    def top(self, query: str, k: int = 3) -> List[FaqMatch]:
+        """k pertanyaan FAQ paling mirip (cosine similarity), tanpa threshold"""
+        if not query or not query.strip():
+            return []
+        vector = np.asarray(self.embeddings.embed_query(query.strip()), dtype="float32")
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+
+        scores = self.vectors @ vector
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            FaqMatch(
+                question_id=self.entries[i]["question_id"],
+                question=self.entries[i]["question"],
+                answer=self.entries[i]["answer"],
+                score=float(scores[i]),
+            )
+            for i in best
+        ]
+
+    def match(self, query: str) -> Optional[FaqMatch]:
+        """Jawaban FAQ jika similarity >= threshold, selain itu None (lanjut ke LLM)"""
+        try:
+            hits = self.top(query, k=1)
+        except Exception as e:
+            print(f"❌ Error saat mencocokkan FAQ: {str(e)}")
+            return None
+        if hits and hits[0].score >= self.threshold:
+            return hits[0]
+        return None
+
+
+# Contoh penggunaan
+if __name__ == '__main__':
+    matcher = FaqMatcher()
+    for hit in matcher.top("What does it mean to have a mental illness?"):
+        print(f"{hit.score:.3f}  #{hit.question_id}  {hit.question}")
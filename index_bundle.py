@@ -0,0 +1,130 @@
+# index_bundle.py
+# Format index tanpa pickle yang bisa di-mmap: vektor & dokumen dibaca langsung
+# dari file (read-only), sehingga page-nya dibagi antar proses Streamlit dan
+# hanya dokumen top-k yang benar-benar di-decode.
+#
+# Isi folder bundle:
+#   bundle.json  -> metadata (jumlah, dimensi, model, metric)
+#   vectors.f32  -> matriks float32 (count x dim), row-major
+#   norms.f32    -> ||v||^2 per baris (untuk jarak L2 tanpa menghitung ulang norm)
+#   docs.bin     -> record JSON UTF-8 {id, page_content, metadata} disambung
+#   docs.idx     -> offset uint64 (count + 1) ke docs.bin
+
+import os
+import json
+import mmap
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+BUNDLE_DIR = "bundle"
+BUNDLE_FORMAT = "ruangteduh-bundle"
+BUNDLE_VERSION = 1
+
+
+def write_bundle(out_dir: str, ids: Sequence[str], vectors: np.ndarray, documents, model_name: str) -> None:
+    """Tulis bundle dari vektor + Document LangChain (urutan ids/vectors/documents sama)"""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if len(ids) != len(vectors) or len(ids) != len(documents):
+        raise ValueError("Jumlah ids, vectors dan documents harus sama")
+
+    os.makedirs(out_dir, exist_ok=True)
+    vectors.tofile(os.path.join(out_dir, "vectors.f32"))
+    np.einsum("ij,ij->i", vectors, vectors).astype("float32").tofile(os.path.join(out_dir, "norms.f32"))
+
+    offsets = np.zeros(len(ids) + 1, dtype="uint64")
+    with open(os.path.join(out_dir, "docs.bin"), "wb") as f:
+        for i, (doc_id, doc) in enumerate(zip(ids, documents)):
+            record = json.dumps(
+                {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata},
+                ensure_ascii=False,
+            ).encode("utf-8")
+            f.write(record)
+            offsets[i + 1] = offsets[i] + len(record)
+    offsets.tofile(os.path.join(out_dir, "docs.idx"))
+
+    meta = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "count": int(len(ids)),
+        "dim": int(vectors.shape[1]) if len(vectors) else 0,
+        "dtype": "float32",
+        "metric": "l2",
+        "model": model_name,
+    }
+    # bundle.json ditulis terakhir: bundle tanpa bundle.json dianggap belum lengkap
+    with open(os.path.join(out_dir, "bundle.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def has_bundle(index_path: str) -> bool:
+    return os.path.exists(os.path.join(index_path, BUNDLE_DIR, "bundle.json"))
+
+
+class IndexBundle:
+    """Pembaca bundle read-only berbasis mmap"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "bundle.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != BUNDLE_FORMAT or self.meta.get("version") != BUNDLE_VERSION:
+            raise RuntimeError(f"Format bundle tidak dikenal: {self.meta.get('format')} v{self.meta.get('version')}")
+
+        self.count = self.meta["count"]
+        self.dim = self.meta["dim"]
+        self.model = self.meta["model"]
+
+        if self.count:
+            self.vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype="float32", mode="r", shape=(self.count, self.dim))
+            self.norms = np.memmap(os.path.join(path, "norms.f32"), dtype="float32", mode="r", shape=(self.count,))
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype="float32")
+            self.norms = np.zeros(0, dtype="float32")
+        self.offsets = np.memmap(os.path.join(path, "docs.idx"), dtype="uint64", mode="r", shape=(self.count + 1,))
+
+        self._docs_file = open(os.path.join(path, "docs.bin"), "rb")
+        size = os.fstat(self._docs_file.fileno()).st_size
+        self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return self.count
+
+    def search(self, query_vector, k: int = 3) -> List[Tuple[int, float]]:
+        """Pencarian exact L2 (sama dengan IndexFlatL2), hasil (posisi, jarak^2) terurut"""
+        if not self.count:
+            return []
+        q = np.asarray(query_vector, dtype="float32")
+        distances = self.norms - 2.0 * (self.vectors @ q) + float(q @ q)
+        k = min(k, self.count)
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best])]
+        return [(int(i), float(distances[i])) for i in best]
+
+    def search_batch(self, query_vectors, k: int = 3) -> List[List[Tuple[int, float]]]:
+        """Seperti search(), untuk banyak query sekaligus (satu perkalian matriks)"""
+        queries = np.asarray(query_vectors, dtype="float32").reshape(-1, self.dim)
+        if not self.count or not len(queries):
+            return [[] for _ in range(len(queries))]
+        distances = self.norms[None, :] - 2.0 * (queries @ self.vectors.T) + (queries * queries).sum(axis=1)[:, None]
+        k = min(k, self.count)
+        best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(distances, best):
+            candidates = candidates[np.argsort(row[candidates])]
+            results.append([(int(i), float(row[i])) for i in candidates])
+        return results
+
+    def get_record(self, position: int) -> dict:
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        return json.loads(self._docs[start:end].decode("utf-8"))
+
+    def get_document(self, position: int):
+        from langchain_core.documents import Document
+
+        record = self.get_record(position)
+        return Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+
+    def close(self) -> None:
+        if isinstance(self._docs, mmap.mmap):
+            self._docs.close()
+        self._docs_file.close()
@@ -0,0 +1,230 @@
+# intent_router.py
+# Router lokal sebelum LLM: setiap pesan diklasifikasi dulu dengan aturan
+# keyword (trie regex, mikrodetik) lalu nearest-neighbour ke contoh kalimat per
+# intent yang sudah di-embed. Permintaan tips coping, bantuan profesional,
+# tanggal dan simpan riwayat langsung dijawab tool di folder tools/; hanya
+# pesan yang tidak cocok dengan yakin diteruskan ke Gemini.
+#
+# Deteksi krisis murni lokal: hanya aturan keyword (dicek paling awal), tidak
+# ada contoh krisis di index embedding, jadi pesan krisis tidak pernah
+# menunggu API embedding atau LLM. Parafrase krisis ditambahkan sebagai
+# keyword. Keyword intent tool (coping, bantuan profesional, tanggal, simpan
+# riwayat) hanya berlaku untuk permintaan pendek yang berdiri sendiri, supaya
+# "tanggal berapa sebaiknya aku mulai terapi?" tetap sampai ke LLM; kalimat
+# yang lebih panjang dicocokkan lewat contoh embedding. Vektor contoh intent lain di-cache di data/intent_index.npz,
+# dibangun ulang otomatis bila contoh/model berubah.
+
+import os
+import re
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from keyword_matcher import KeywordMatcher
+from telemetry import span
+
+DEFAULT_INTENT_INDEX = os.getenv("INTENT_INDEX_PATH", "data/intent_index.npz")
+DEFAULT_THRESHOLD = float(os.getenv("INTENT_MATCH_THRESHOLD", "0.8"))
+DEFAULT_MARGIN = 0.05   # selisih minimal dengan intent terdekat berikutnya
+# Kata di luar keyword yang masih dianggap permintaan tool ("hari ini tanggal berapa ya?")
+STANDALONE_EXTRA_WORDS = 3
+
+CRISIS = "crisis"
+PROFESSIONAL_HELP = "professional_help"
+COPING = "coping"
+DATE = "date"
+SAVE_HISTORY = "save_history"
+OTHER = "other"         # contoh negatif: curhat/pertanyaan umum -> LLM
+
+# Frasa yang cukup spesifik untuk langsung menentukan intent (urutan = prioritas)
+KEYWORD_RULES: Dict[str, List[str]] = {
+    CRISIS: [
+        "bunuh diri", "ingin mati", "pengen mati", "pingin mati", "mau mati aja", "mau mati saja",
+        "mengakhiri hidup", "akhiri hidup", "akhiri hidupku", "tidak ingin hidup", "gak mau hidup",
+        "nggak mau hidup", "ga mau hidup", "menyakiti diri", "melukai diri", "sayat tangan",
+        "suicide", "suicidal", "kill myself", "end my life", "want to die", "self harm", "self-harm",
+        "hurt myself", "ingin semuanya berakhir", "lebih baik aku tidak ada", "lebih baik aku mati",
+        "tidak ingin ada lagi", "don't want to be alive", "dont want to be alive", "ending it all",
+        "end it all", "better off dead", "better off without me",
+    ],
+    PROFESSIONAL_HELP: [
+        "cari psikolog", "butuh psikolog", "rekomendasi psikolog", "cari psikiater", "butuh psikiater",
+        "bantuan profesional", "layanan konseling", "nomor darurat", "find a therapist",
+        "need a therapist", "professional help", "find a psychologist",
+    ],
+    COPING: [
+        "tips coping", "strategi coping", "cara menenangkan diri", "teknik relaksasi",
+        "coping tips", "coping strategies", "coping strategy",
+    ],
+    DATE: [
+        "tanggal berapa", "hari apa sekarang", "hari ini hari apa", "tanggal hari ini",
+        "what day is it", "today's date", "what is the date", "what's the date",
+    ],
+    SAVE_HISTORY: [
+        "simpan riwayat", "simpan chat", "simpan percakapan", "save chat", "save history",
+        "save this conversation", "save our conversation",
+    ],
+}
+
+# Contoh kalimat per intent untuk nearest-neighbour (parafrase yang lolos keyword).
+# Sengaja tanpa CRISIS: krisis hanya lewat keyword supaya tidak bergantung API.
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    PROFESSIONAL_HELP: [
+        "Di mana aku bisa konsultasi dengan psikolog?",
+        "Aku mau ke konselor, ada rekomendasi tempat?",
+        "Bagaimana cara mendapatkan bantuan dari tenaga profesional kesehatan mental?",
+        "Where can I talk to a mental health professional?",
+        "Can you recommend a counselor or psychiatrist?",
+    ],
+    COPING: [
+        "Apa yang bisa aku lakukan supaya lebih tenang sekarang?",
+        "Kasih aku cara untuk meredakan cemas",
+        "Gimana cara mengatasi stres yang lagi aku rasakan?",
+        "What can I do to calm down right now?",
+        "Give me some ways to cope with anxiety",
+    ],
+    DATE: [
+        "Sekarang tanggal berapa ya?",
+        "Hari ini hari apa?",
+        "What is today's date?",
+        "What day is today?",
+    ],
+    SAVE_HISTORY: [
+        "Tolong simpan obrolan kita",
+        "Simpan percakapan ini ya",
+        "Please save our chat history",
+        "Save this conversation for me",
+    ],
+    OTHER: [
+        "Aku lagi sedih hari ini",
+        "Aku capek dengan pekerjaanku",
+        "Apa itu depresi?",
+        "Apa bedanya psikolog dan psikiater?",
+        "Halo, apa kabar?",
+        "What is mental illness?",
+        "I had a fight with my friend today",
+        "Terima kasih ya sudah mendengarkan",
+    ],
+}
+
+
+@dataclass
+class IntentMatch:
+    intent: str
+    score: float
+    source: str               # "keyword" atau "embedding"
+    evidence: str = ""        # keyword / contoh kalimat yang cocok
+
+
+def _is_standalone(text: str, matches) -> bool:
+    """True jika selain keyword hanya ada sedikit kata (bukan bagian kalimat lain)"""
+    rest, previous = [], 0
+    for match in matches:
+        rest.append(text[previous:match.start])
+        previous = match.end
+    rest.append(text[previous:])
+    return len(re.findall(r"\w+", " ".join(rest))) <= STANDALONE_EXTRA_WORDS
+
+
+class IntentRouter:
+    """Klasifikasi intent lokal: aturan keyword dulu, lalu nearest-neighbour contoh intent"""
+
+    def __init__(
+        self,
+        embeddings=None,
+        index_path: str = DEFAULT_INTENT_INDEX,
+        threshold: float = DEFAULT_THRESHOLD,
+        margin: float = DEFAULT_MARGIN,
+        rules: Dict[str, List[str]] = KEYWORD_RULES,
+        examples: Dict[str, List[str]] = INTENT_EXAMPLES
+    ):
+        self.threshold = threshold
+        self.margin = margin
+        self.rules = [(intent, KeywordMatcher(keywords, whole_words=True)) for intent, keywords in rules.items()]
+        self.examples = [(intent, text) for intent, texts in examples.items() for text in texts]
+        self.embeddings = embeddings
+        self.vectors = None
+        if embeddings is not None:
+            try:
+                self.vectors = self._load_or_build(index_path)
+            except Exception as e:
+                print(f"⚠️ Router intent hanya memakai keyword: {str(e)}")
+
+    def _load_or_build(self, index_path: str) -> np.ndarray:
+        model = getattr(self.embeddings, "model_name", type(self.embeddings).__name__)
+        digest = hashlib.sha256(
+            "\x00".join([model] + [f"{intent}\x01{text}" for intent, text in self.examples]).encode("utf-8")
+        ).hexdigest()
+        if os.path.exists(index_path):
+            with np.load(index_path) as data:
+                if str(data["digest"]) == digest:
+                    return data["vectors"]
+
+        with span("router.build_index", examples=len(self.examples)):
+            vectors = np.asarray(self.embeddings.embed_documents([text for _, text in self.examples]), dtype="float32")
+        # Normalisasi sekali di sini, jadi similarity saat query cukup dot product
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        try:
+            if os.path.dirname(index_path):
+                os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            tmp_path = f"{index_path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, vectors=vectors, digest=np.array(digest))
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            print(f"⚠️ Gagal menyimpan index intent: {str(e)}")
+        return vectors
+
+    def match_keywords(self, text: str) -> Optional[IntentMatch]:
+        """Krisis cocok di mana pun dalam pesan; intent tool hanya untuk permintaan pendek"""
+        for intent, matcher in self.rules:
+            matches = matcher.find_all(text)
+            if matches and (intent == CRISIS or _is_standalone(text, matches)):
+                return IntentMatch(intent, 1.0, "keyword", matches[0].keyword)
+        return None
+
+    def match_examples(self, text: str) -> Optional[IntentMatch]:
+        """Contoh intent terdekat jika cukup mirip dan jelas lebih dekat dari intent lain"""
+        if self.vectors is None:
+            return None
+        vector = np.asarray(self.embeddings.embed_query(text), dtype="float32")
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        scores = self.vectors @ vector
+
+        best = {}
+        for (intent, _), score in zip(self.examples, scores):
+            best[intent] = max(best.get(intent, -1.0), float(score))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        intent, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if intent == OTHER or score < self.threshold or score - runner_up < self.margin:
+            return None
+        example = max(
+            (i for i, (name, _) in enumerate(self.examples) if name == intent), key=lambda i: scores[i]
+        )
+        return IntentMatch(intent, score, "embedding", self.examples[example][1])
+
+    def route(self, text: str) -> Optional[IntentMatch]:
+        """IntentMatch untuk dijawab tool, atau None (teruskan ke LLM)"""
+        if not text or not text.strip():
+            return None
+        text = text.strip()
+        with span("router.route") as current:
+            match = self.match_keywords(text)
+            if match is None:
+                try:
+                    match = self.match_examples(text)
+                except Exception as e:
+                    current.set(error=type(e).__name__)
+                    print(f"❌ Error saat mencocokkan intent: {str(e)}")
+            if match is not None:
+                current.set(intent=match.intent, source=match.source)
+            return match
+
+
+# Contoh penggunaan
+if __name__ == '__main__':
+    router = IntentRouter()
+    for message in ["aku pengen mati aja", "hari ini tanggal berapa?", "tips coping dong", "apa itu depresi?"]:
+        print(f"{message!r} -> {router.route(message)}")
@@ -0,0 +1,104 @@
+# keyword_matcher.py
+# Pencocok multi-keyword: semua keyword digabung jadi SATU regex berbentuk trie
+# (prefix yang sama dibagi), dikompilasi sekali, lalu teks dipindai satu kali
+# untuk mendapatkan semua kecocokan beserta offset-nya. Deteksi, ringkasan dan
+# highlight cukup memakai offset tersebut tanpa memindai ulang per keyword.
+# Biaya per karakter praktis tidak bergantung pada jumlah keyword, jadi ribuan
+# istilah (mis. glosarium klinis) tetap cepat.
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    start: int
+    end: int
+    keyword: str
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def to_regex(node) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Quantifier greedy: kecocokan terpanjang didahulukan ("stress test" > "stress")
+        if is_end:
+            return f"(?:{body})?"
+        return body
+
+    return to_regex(trie)
+
+
+class KeywordMatcher:
+    """Cari semua keyword (case-insensitive) dalam satu pass dengan offset-nya"""
+
+    def __init__(self, keywords: Iterable[str], whole_words: bool = False):
+        self.keywords = {}
+        for keyword in keywords:
+            keyword = keyword.strip()
+            if keyword:
+                self.keywords.setdefault(keyword.lower(), keyword)
+
+        pattern = _trie_pattern(self.keywords) if self.keywords else None
+        if pattern and whole_words:
+            pattern = rf"(?<!\w){pattern}(?!\w)"
+        self._pattern = re.compile(pattern, re.IGNORECASE) if pattern else None
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "KeywordMatcher":
+        """Satu istilah per baris; baris kosong dan komentar (#) dilewati"""
+        with open(path, encoding="utf-8") as f:
+            terms = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+        return cls(terms, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Kecocokan non-overlapping, kiri ke kanan, terpanjang lebih dulu"""
+        if self._pattern is None or not text:
+            return []
+        return [
+            KeywordMatch(m.start(), m.end(), self.keywords.get(m.group().lower(), m.group()))
+            for m in self._pattern.finditer(text)
+        ]
+
+    def contains(self, text: str) -> bool:
+        return self._pattern is not None and bool(text) and self._pattern.search(text) is not None
+
+    def highlight(self, text: str, matches: Optional[Sequence[KeywordMatch]] = None, template: str = "**{}**") -> str:
+        """Ganti setiap kecocokan dengan keyword versi UPPERCASE dalam template"""
+        matches = self.find_all(text) if matches is None else matches
+        if not matches:
+            return text
+        parts = []
+        position = 0
+        for match in matches:
+            parts.append(text[position:match.start])
+            parts.append(template.format(match.keyword.upper()))
+            position = match.end
+        parts.append(text[position:])
+        return "".join(parts)
+
+
+def spans_with_matches(spans: Sequence[Tuple[int, int]], matches: Sequence[KeywordMatch]) -> List[int]:
+    """Index span (kalimat/paragraf, terurut) yang memuat awal minimal satu kecocokan"""
+    starts = [start for start, _ in spans]
+    hit = []
+    for match in matches:
+        i = bisect_right(starts, match.start) - 1
+        if i >= 0 and match.start < spans[i][1] and (not hit or hit[-1] != i):
+            hit.append(i)
+    return hit
@@ -0,0 +1,358 @@
+# llm_client.py
+# Client LLM bersama dengan timeout per panggilan, retry exponential backoff +
+# jitter, hedged request opsional (request kedua dikirim jika yang pertama
+# lebih lambat dari persentil latensi), penggabungan prompt identik yang sedang
+# berjalan (pemanggil bersamaan berbagi satu panggilan upstream) dan batas
+# jumlah panggilan upstream bersamaan.
+#
+# ResilientChatModel membungkus chat model LangChain mana pun, jadi bisa
+# dipakai langsung oleh stream_agent (main.py) dan chain RetrievalQA (rag.py).
+# Untuk streaming, timeout/retry/hedging berlaku sampai token pertama diterima;
+# setelah itu timeout berlaku per chunk. FaultyFakeChatModel (LLM_BACKEND=fake)
+# bisa menyuntikkan latensi dan error untuk testing offline.
+#
+# Panggilan yang timeout tidak bisa dibatalkan di thread-nya; slot
+# konkurensinya baru dilepas setelah panggilan upstream itu benar-benar selesai.
+
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from telemetry import inc, observe, percentile
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))               # detik per percobaan
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Contoh: LLM_HEDGE_QUANTILE=0.95 -> request cadangan setelah p95 latensi (kosong = mati)
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE")) if os.getenv("LLM_HEDGE_QUANTILE") else None
+HEDGE_MIN_SAMPLES = 20
+LATENCY_SAMPLES = 200
+
+# Error dari sisi request (API key salah, prompt ditolak): percuma diulang
+NON_RETRYABLE_STATUS = {400, 401, 403, 404}
+
+
+class LLMTimeoutError(TimeoutError):
+    pass
+
+
+class FakeUpstreamError(RuntimeError):
+    pass
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for attr in ("code", "status_code", "status"):
+        value = getattr(error, attr, None)
+        value = value() if callable(value) else value
+        value = getattr(value, "value", value)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ValueError, TypeError, PermissionError)):
+        return False
+    return _status_code(error) not in NON_RETRYABLE_STATUS
+
+
+def _prompt_key(messages: List[BaseMessage], stop: Optional[List[str]], kind: str, kwargs: Optional[dict] = None) -> str:
+    # kwargs (mis. temperature, tools) ikut menentukan jawaban, jadi ikut di key
+    payload = json.dumps(
+        [kind, stop, sorted((kwargs or {}).items()), [(message.type, message.content) for message in messages]],
+        ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _StreamHandle:
+    """Stream upstream yang sudah menghasilkan chunk pertama (memegang slot konkurensi)"""
+
+    def __init__(self, first, iterator, release: Callable[[], None]):
+        self.first = first
+        self.iterator = iterator
+        self._release = release
+        self._closed = False
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            close = getattr(self.iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._release()
+
+
+class _SharedStream:
+    """Chunk dari satu stream upstream, dibaca ulang oleh semua pemanggil yang digabung"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+
+    def publish(self, chunk=None, done: bool = False, error: Optional[Exception] = None) -> None:
+        with self._condition:
+            if chunk is not None:
+                self.chunks.append(chunk)
+            self.done = self.done or done
+            self.error = self.error or error
+            self._condition.notify_all()
+
+    def read(self, first_timeout: float, chunk_timeout: float) -> Iterator:
+        position = 0
+        while True:
+            timeout = chunk_timeout if position else first_timeout
+            with self._condition:
+                if not self._condition.wait_for(
+                    lambda: position < len(self.chunks) or self.done, timeout=timeout
+                ):
+                    raise LLMTimeoutError(f"Tidak ada respons LLM dalam {timeout:g} detik")
+                chunks = self.chunks[position:]
+                done, error = self.done, self.error
+            position += len(chunks)
+            yield from chunks
+            if done and position >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class LLMClient:
+    """Panggilan ke satu chat model dengan timeout, retry, hedging, coalescing dan batas konkurensi"""
+
+    def __init__(
+        self,
+        model,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        hedge_quantile: Optional[float] = LLM_HEDGE_QUANTILE
+    ):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_quantile = hedge_quantile
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Lebih banyak thread dari slot: percobaan yang ditinggal (timeout/kalah hedge)
+        # masih berjalan sementara retry berikutnya menunggu slot
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency * 4, thread_name_prefix="llm-call")
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    # ---- API ----
+
+    def invoke(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs) -> BaseMessage:
+        key = _prompt_key(messages, stop, "invoke", kwargs)
+        future, leader = self._join(key, Future)
+        if not leader:
+            inc("llm.coalesced")
+            return future.result()
+        try:
+            result = self._resilient(lambda: self._guarded(lambda: self.model.invoke(messages, stop=stop, **kwargs)))
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._leave(key)
+
+    def stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs) -> Iterator:
+        key = _prompt_key(messages, stop, "stream", kwargs)
+        shared, leader = self._join(key, _SharedStream)
+        if leader:
+            # Thread sendiri (bukan executor percobaan): pump menunggu percobaan selesai
+            threading.Thread(
+                target=self._pump, args=(key, shared, messages, stop, kwargs), name="llm-stream", daemon=True
+            ).start()
+        else:
+            inc("llm.coalesced")
+        # Token pertama dijaga timeout + retry di pump; sisanya timeout per chunk
+        first_timeout = (self.timeout + self.backoff_max) * (self.max_retries + 1)
+        return shared.read(first_timeout, self.timeout)
+
+    # ---- internal ----
+
+    def _join(self, key: str, factory):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                return entry, False
+            entry = self._inflight[key] = factory()
+            return entry, True
+
+    def _leave(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _guarded(self, fn: Callable[[], Any]) -> Any:
+        with self._slots:
+            return fn()
+
+    def _open_stream(self, messages, stop, kwargs) -> _StreamHandle:
+        self._slots.acquire()
+        try:
+            iterator = iter(self.model.stream(messages, stop=stop, **kwargs))
+            first = next(iterator, None)
+        except BaseException:
+            self._slots.release()
+            raise
+        return _StreamHandle(first, iterator, self._slots.release)
+
+    def _pump(self, key: str, shared: _SharedStream, messages, stop, kwargs) -> None:
+        handle = None
+        try:
+            handle = self._resilient(lambda: self._open_stream(messages, stop, kwargs))
+            if handle.first is not None:
+                shared.publish(handle.first)
+                for chunk in handle.iterator:
+                    shared.publish(chunk)
+            shared.publish(done=True)
+        except BaseException as e:
+            shared.publish(done=True, error=e)
+        finally:
+            self._leave(key)
+            if handle is not None:
+                handle.close()
+
+    def _resilient(self, fn: Callable[[], Any]) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._attempt(fn)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                # Full jitter: pemanggil yang gagal bersamaan tidak retry bersamaan
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                inc("llm.retries")
+                print(f"⚠️ Panggilan LLM gagal ({type(e).__name__}: {str(e)[:120]}), coba lagi dalam {delay:.2f}s")
+                time.sleep(delay)
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_quantile is None:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(samples, self.hedge_quantile)
+
+    def _attempt(self, fn: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        futures = [self._executor.submit(fn)]
+
+        hedge_after = self._hedge_delay()
+        if hedge_after is not None and hedge_after < self.timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                inc("llm.hedged")
+                futures.append(self._executor.submit(fn))
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        _abandon(other)
+                    latency = time.monotonic() - start
+                    with self._lock:
+                        self._latencies.append(latency)
+                    observe("llm.upstream", latency, log=False)
+                    return future.result()
+                errors.append(future.exception())
+        for future in pending:
+            _abandon(future)
+        if errors:
+            # Percobaan lain (hedge) belum selesai, tapi error asli lebih berguna dari timeout
+            raise errors[0]
+        inc("llm.timeouts")
+        raise LLMTimeoutError(f"Tidak ada respons LLM dalam {self.timeout:g} detik")
+
+
+def _abandon(future: Future) -> None:
+    """Percobaan yang ditinggal: tutup stream-nya (lepas slot) begitu selesai"""
+    def cleanup(done: Future) -> None:
+        if not done.cancelled() and done.exception() is None and isinstance(done.result(), _StreamHandle):
+            done.result().close()
+    future.add_done_callback(cleanup)
+
+
+class ResilientChatModel(BaseChatModel):
+    """Chat model LangChain yang meneruskan panggilan lewat LLMClient"""
+
+    client: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"resilient-{getattr(self.client.model, '_llm_type', 'chat')}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.client.invoke(messages, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(
+            content=message.content,
+            response_metadata=getattr(message, "response_metadata", {}),
+            usage_metadata=getattr(message, "usage_metadata", None)
+        ))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        # Callback token dipanggil oleh BaseChatModel.stream untuk setiap chunk di sini
+        for chunk in self.client.stream(messages, stop=stop, **kwargs):
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=chunk.content, usage_metadata=getattr(chunk, "usage_metadata", None)
+            ))
+
+
+class FaultyFakeChatModel(FakeListChatModel):
+    """FakeListChatModel dengan latensi (sebelum token pertama) dan error yang bisa diatur"""
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    fail_first: int = 0          # n panggilan pertama selalu gagal
+    calls: int = 0
+    seed: Optional[int] = None
+
+    def _inject(self) -> None:
+        rng = random.Random(None if self.seed is None else self.seed + self.calls)
+        self.calls += 1
+        delay = self.latency + rng.uniform(0, self.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.calls <= self.fail_first or rng.random() < self.error_rate:
+            raise FakeUpstreamError(f"Error upstream buatan (panggilan ke-{self.calls})")
+
+    def _call(self, *args, **kwargs) -> str:
+        self._inject()
+        return super()._call(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs) -> Iterator[ChatGenerationChunk]:
+        self._inject()
+        yield from super()._stream(*args, **kwargs)
@@ -1,46 +1,233 @@
+import resources  # import paling awal: titik nol pengukuran cold start
 import os
-from dotenv import load_dotenv
+import time
+import hashlib
 import streamlit as st
 import datetime
-from langchain_google_genai import ChatGoogleGenerativeAI
-from callback_handler import GeminiCallbackHandler
-import PyPDF2
+import uuid
+from typing import Dict, Iterator, List, Optional
+from callback_handler import GeminiCallbackHandler, coalesce_deltas
+from conversation_memory import ConversationMemory
+from tools.save_history import save_chat_history
+from session_store import SESSION_RETENTION_DAYS, get_session_store
+from intent_router import COPING, CRISIS, DATE, PROFESSIONAL_HELP, SAVE_HISTORY
+from tools.cooping_tools import get_coping_tips
+from tools.date_tools import show_current_date
+from tools.pscyologist_tools import get_professional_help
+from telemetry import span
 
-# Load API Key
+EMPTY_RESPONSE = "Hai, Saya Teman kamu"
+# Riwayat di layar: hanya jendela pesan terbaru, sisanya per halaman lewat tombol
+CHAT_RENDER_WINDOW = int(os.getenv("CHAT_RENDER_WINDOW", "20"))
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "20"))
+# Pesan di session_state dibatasi; yang lebih lama masuk ringkasan (+ session store jika disimpan)
+CHAT_STATE_MESSAGES = int(os.getenv("CHAT_STATE_MESSAGES", "40"))
+# Riwayat chat hanya disimpan ke disk jika user memilihnya (toggle / "simpan riwayat");
+# SAVE_CHAT_HISTORY=on menjadikan simpan sebagai default. Retensi: SESSION_RETENTION_DAYS
+SAVE_CHAT_HISTORY = os.getenv("SAVE_CHAT_HISTORY", "off").lower() in ("on", "1", "true")
+CRISIS_RESPONSE = (
+    "Aku sangat peduli dengan keselamatanmu, dan kamu tidak harus melewati ini sendirian. "
+    "Tolong segera hubungi orang yang kamu percaya atau layanan di bawah ini sekarang juga."
+)
+
+# Load CSS (isi file di-cache per proses)
 def load_css():
-    with open("style.css") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(f"<style>{resources.get_css()}</style>", unsafe_allow_html=True)
 
-# Chat ke LLM
-def run_agent(user_input: str, api_key: str) -> str:
+# Fast path FAQ (dimuat sekali per proses)
+def get_faq_matcher():
     try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=api_key,
-            temperature=0.2,
-            callbacks=[GeminiCallbackHandler()],
-            convert_system_message_to_human=True
-        )
-        response = llm.invoke(user_input)
-        return str(response.content)
+        return resources.get_faq_matcher()
     except Exception as e:
-        return f"Terjadi kesalahan: {str(e)}"
+        print(f"⚠️ FAQ fast path tidak aktif: {str(e)}")
+        return None
 
-# Ekstrak teks PDF
-def extract_text_from_pdf(uploaded_file) -> str:
-    text = ""
+# Router intent lokal (keyword + contoh intent), dimuat sekali per proses
+def get_intent_router():
     try:
-        reader = PyPDF2.PdfReader(uploaded_file)
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text.strip()
+        return resources.get_intent_router()
     except Exception as e:
-        return f"Terjadi kesalahan saat membaca PDF: {str(e)}"
+        print(f"⚠️ Router intent tidak aktif: {str(e)}")
+        return None
+
+# Jawaban tool untuk intent yang dikenali router (tanpa round trip ke Gemini)
+def answer_intent(intent: str) -> str:
+    if intent == CRISIS:
+        return f"{CRISIS_RESPONSE}\n\n{get_professional_help()}"
+    if intent == PROFESSIONAL_HELP:
+        return get_professional_help()
+    if intent == COPING:
+        return get_coping_tips()
+    if intent == DATE:
+        return show_current_date()
+    if intent == SAVE_HISTORY:
+        st.session_state.persist_history = True
+        save_history()
+        return "✅ Riwayat chat kita sudah disimpan, pesan berikutnya juga akan disimpan (matikan lewat toggle 💾)."
+    raise ValueError(f"Intent tidak dikenal: {intent}")
+
+# Chat ke LLM: token di-stream dan diteruskan ke UI sebagai delta.
+# Dengan memory + history, prompt berisi ringkasan + giliran terbaru (budget token).
+def stream_agent(
+    user_input: str,
+    api_key: str,
+    handler: Optional[GeminiCallbackHandler] = None,
+    memory: Optional[ConversationMemory] = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> Iterator[str]:
+    handler = handler or GeminiCallbackHandler()
+    streamed = False
+    with span("agent.run") as current:
+        try:
+            llm = resources.get_llm(api_key)
+            prompt = memory.to_langchain(history or [], user_input) if memory is not None else user_input
+            chunks = llm.stream(prompt, config={"callbacks": [handler]})
+            for delta in coalesce_deltas(str(chunk.content) for chunk in chunks):
+                streamed = True
+                yield delta
+            if not streamed:
+                yield EMPTY_RESPONSE
+        except Exception as e:
+            handler.metrics.finish(error=str(e))
+            current.set(error=type(e).__name__)
+            yield ("\n\n" if streamed else "") + f"Terjadi kesalahan: {str(e)}"
+        current.set(**{key: value for key, value in handler.metrics.as_dict().items() if value is not None})
+
+# Versi non-streaming; metrik giliran tersedia di handler.metrics
+def run_agent(
+    user_input: str,
+    api_key: str,
+    handler: Optional[GeminiCallbackHandler] = None,
+    memory: Optional[ConversationMemory] = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> str:
+    return "".join(stream_agent(user_input, api_key, handler, memory, history))
+
+# Memori percakapan per session (ringkasan berjalan + jendela giliran terbaru)
+def get_memory() -> ConversationMemory:
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory()
+    return st.session_state.memory
+
+# Riwayat chat di-append ke session store (ditulis thread background), hanya jika user memilih
+def save_history() -> None:
+    if not st.session_state.get("persist_history", SAVE_CHAT_HISTORY):
+        return
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    save_chat_history(
+        st.session_state.messages,
+        st.session_state.session_id,
+        st.session_state.get("user_name")
+    )
+
+# Pesan lama keluar dari session_state setelah masuk ringkasan memori (dan
+# tersimpan di store jika riwayat disimpan), jadi ukuran state tetap terbatas
+def trim_messages() -> None:
+    messages = st.session_state.messages
+    memory = get_memory()
+    drop = min(len(messages) - CHAT_STATE_MESSAGES, memory.summarized)
+    if drop <= 0:
+        return
+    del messages[:drop]
+    memory.forget(drop)
+    st.session_state.evicted_messages = st.session_state.get("evicted_messages", 0) + drop
+
+# Pesan sebelum jendela session_state dibaca dari session store (per halaman),
+# mulai dari seq pesan pertama yang masih ada di session_state
+def load_earlier(count: int) -> List[Dict]:
+    messages = st.session_state.messages
+    if count <= 0 or not st.session_state.get("evicted_messages", 0) or not messages:
+        return []
+    first_seq = messages[0].get("seq")
+    if not first_seq or not st.session_state.get("persist_history", SAVE_CHAT_HISTORY):
+        return []  # pesan sebelumnya tidak pernah disimpan
+    store = get_session_store()
+    store.flush(timeout=1.0)  # pesan yang baru dikeluarkan mungkin masih di antrean
+    return store.load_last(st.session_state.session_id, n=count, before_seq=first_seq)
+
+def render_message(message: Dict) -> None:
+    avatar = "🧑‍💻" if message["role"] == "user" else "💖"
+    with st.chat_message(message["role"], avatar=avatar):
+        st.markdown(message["content"])
+
+# Hanya jendela pesan terbaru yang dirender; "muat sebelumnya" menambah satu halaman
+def render_history() -> None:
+    messages = st.session_state.messages
+    pages = st.session_state.get("history_pages", 0)
+    wanted = CHAT_RENDER_WINDOW + pages * CHAT_PAGE_SIZE
+    missing = wanted - len(messages)
+    earlier = load_earlier(missing)
+    evicted = st.session_state.get("evicted_messages", 0)
+    has_more = len(messages) > wanted or (missing > 0 and len(earlier) == missing and earlier[0]["seq"] > 0)
+
+    if has_more or pages:
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            if has_more and st.button("⬆️ Muat pesan sebelumnya", use_container_width=True):
+                st.session_state.history_pages = pages + 1
+                st.rerun()
+        with col2:
+            if pages and st.button("⬇️ Sembunyikan pesan lama", use_container_width=True):
+                st.session_state.history_pages = 0
+                st.rerun()
+
+    # Riwayat tidak disimpan: pesan yang sudah dikeluarkan hanya tersisa sebagai ringkasan
+    evicted_unsaved = evicted and not st.session_state.get("persist_history", SAVE_CHAT_HISTORY)
+    if evicted_unsaved and len(messages) <= wanted and get_memory().summary:
+        with st.expander(f"🗂️ {evicted} pesan lama (ringkasan)"):
+            st.markdown(get_memory().summary)
+
+    for message in earlier + messages[-wanted:]:
+        render_message(message)
+
+# Ringkasan yang selesai di background diterapkan di rerun berikutnya
+def apply_compaction() -> None:
+    job = st.session_state.get("compact_job")
+    if job is None or not job["future"].done():
+        return
+    del st.session_state["compact_job"]
+    try:
+        summary = job["future"].result()
+    except Exception as e:
+        print(f"⚠️ Gagal memperbarui ringkasan percakapan: {str(e)}")
+        summary = None  # ringkasan ekstraktif
+    get_memory().apply_fold(job["folded"], summary, job["generation"])
+
+# Lipat giliran lama ke ringkasan setelah jawaban tampil: panggilan LLM jalan di
+# thread background, jadi script (dan UI) tidak menunggu ringkasan
+def compact_memory(api_key: str) -> None:
+    apply_compaction()
+    if "compact_job" in st.session_state:
+        return  # masih ada ringkasan yang berjalan
+    memory = get_memory()
+    folded = memory.fold_candidates(st.session_state.messages)
+    if not folded:
+        return
+
+    def summarize(prompt: str) -> str:
+        return str(resources.get_llm(api_key).invoke(prompt).content)
+
+    st.session_state.compact_job = {
+        "future": resources.get_background_executor().submit(summarize, memory.summary_prompt(folded)),
+        "folded": folded,
+        "generation": memory.generation,
+    }
+
+# Index PDF per upload (di-cache per SHA-256 isi file, lintas rerun & session)
+def get_pdf_index(uploaded_file):
+    pdf_bytes = uploaded_file.getvalue()
+    file_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{len(pdf_bytes)}"
+    if st.session_state.get("pdf_file_key") != file_key:
+        st.session_state.pdf_file_key = file_key
+        st.session_state.pdf_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+    return resources.get_pdf_index_cache().get_or_build(pdf_bytes, st.session_state.pdf_sha256)
 
 # Main App
 def main():
     st.set_page_config(page_title="CeritaTeduh", page_icon="💖", layout="centered")
     load_css()
+    resources.mark_startup("first_render")
 
     if "user_name" not in st.session_state or "gemini_api" not in st.session_state:
         st.markdown("""
@@ -57,6 +244,7 @@ def main():
             if name.strip() and gemini_key.strip():
                 st.session_state.user_name = name.strip()
                 st.session_state.gemini_api = gemini_key.strip()
+                st.session_state.session_id = uuid.uuid4().hex
                 st.rerun()
             else:
                 st.warning("Nama dan API Token wajib diisi dulu ya!")
@@ -69,18 +257,19 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
+        st.session_state.setdefault("persist_history", SAVE_CHAT_HISTORY)
         if "messages" not in st.session_state:
             st.session_state.messages = [{
                 "role": "assistant",
                 "content": f"Halo {st.session_state.user_name}! Aku senang bisa menemani kamu. Cerita apa hari ini?"
             }]
 
-        for message in st.session_state.messages:
-            avatar = "🧑‍💻" if message["role"] == "user" else "💖"
-            with st.chat_message(message["role"], avatar=avatar):
-                st.markdown(message["content"])
+        apply_compaction()
+        render_history()
 
         if user_input := st.chat_input("Tulis sesuatu..."):
+            turn_start = time.perf_counter()
+            st.session_state.history_pages = 0
             timestamp = datetime.datetime.now().strftime("%H:%M:%S")
             st.session_state.messages.append({"role": "user", "content": user_input})
 
@@ -89,19 +278,76 @@ def main():
                 st.caption(f"🕒 {timestamp}")
 
             with st.chat_message("assistant", avatar="💖"):
-                with st.spinner("Sedang memikirkan jawaban terbaik..."):
-                    response_text = run_agent(user_input, st.session_state.gemini_api)
+                turn_metrics = {}
+                faq_match = None
+                # Router dulu: krisis dikenali dari keyword tanpa menunggu API apa pun
+                intent_router = get_intent_router()
+                intent_match = intent_router.route(user_input) if intent_router else None
+                if not intent_match:
+                    faq_matcher = get_faq_matcher()
+                    faq_match = faq_matcher.match(user_input) if faq_matcher else None
+                if intent_match:
+                    response_text = answer_intent(intent_match.intent)
                     response_time = datetime.datetime.now().strftime("%H:%M:%S")
                     st.markdown(response_text)
-                    st.caption(f"🕒 {response_time}")
+                    st.caption(f"🧭 {intent_match.intent} · 🕒 {response_time}")
                     st.session_state.messages.append({"role": "assistant", "content": response_text})
+                elif faq_match:
+                    # Pertanyaan umum: pakai jawaban kurasi, tanpa round trip ke Gemini
+                    response_text = faq_match.answer
+                    response_time = datetime.datetime.now().strftime("%H:%M:%S")
+                    st.markdown(response_text)
+                    st.caption(f"📚 FAQ #{faq_match.question_id}: {faq_match.question} · 🕒 {response_time}")
+                    st.session_state.messages.append({"role": "assistant", "content": response_text})
+                else:
+                    handler = GeminiCallbackHandler()
+                    response_text = st.write_stream(stream_agent(
+                        user_input,
+                        st.session_state.gemini_api,
+                        handler,
+                        memory=get_memory(),
+                        history=st.session_state.messages[:-1]
+                    ))
+                    response_time = datetime.datetime.now().strftime("%H:%M:%S")
+                    turn_metrics = handler.metrics.as_dict()
+                    st.session_state.last_turn_metrics = turn_metrics
+                    caption = f"🕒 {response_time}"
+                    if turn_metrics["ttft_s"] is not None:
+                        caption += f" · ⚡ {turn_metrics['ttft_s']:.2f}s"
+                    if turn_metrics["tokens_per_s"] is not None:
+                        caption += f" · {turn_metrics['tokens_per_s']:.0f} token/s"
+                    st.caption(caption)
+                    st.session_state.messages.append({"role": "assistant", "content": response_text})
+
+            save_history()
+            compact_memory(st.session_state.gemini_api)
+            trim_messages()
+            resources.mark_startup(
+                "first_reply",
+                turn_seconds=round(time.perf_counter() - turn_start, 4),
+                faq_fast_path=bool(faq_match),
+                intent=intent_match.intent if intent_match else None,
+                ttft_s=turn_metrics.get("ttft_s")
+            )
 
         st.divider()
+        st.toggle(
+            "💾 Simpan riwayat chat",
+            key="persist_history",
+            on_change=save_history,
+            help=f"Riwayat disimpan di server dan dihapus otomatis setelah {SESSION_RETENTION_DAYS:g} hari tidak aktif."
+            if SESSION_RETENTION_DAYS > 0 else "Riwayat disimpan di server."
+        )
         col1, col2 = st.columns([1, 1.5])
 
         with col1:
             if st.button("🗑️ Hapus Chat", use_container_width=True):
                 st.session_state.messages = []
+                # Chat baru = session baru di store; riwayat lama tetap tersimpan
+                st.session_state.session_id = uuid.uuid4().hex
+                st.session_state.evicted_messages = 0
+                st.session_state.history_pages = 0
+                get_memory().reset()
                 st.success("Riwayat chat berhasil dihapus.")
 
         with col2:
@@ -109,16 +355,34 @@ def main():
             st.caption("📄 Upload PDF")
 
         if uploaded_pdf is not None:
-            pdf_text = extract_text_from_pdf(uploaded_pdf)
-            if pdf_text:
+            try:
+                with st.spinner("Sedang membaca PDF..."):
+                    pdf_index = get_pdf_index(uploaded_pdf)
+            except Exception as e:
+                pdf_index = None
+                st.error(f"Terjadi kesalahan saat membaca PDF: {str(e)}")
+
+            if pdf_index is not None and not pdf_index.chunks:
+                st.warning("Tidak ada teks yang bisa dibaca dari PDF ini.")
+            elif pdf_index is not None:
                 st.info("Teks dari PDF berhasil diambil. Kamu bisa tanya isi PDF:")
-                pdf_question = st.text_input("Tanya tentang PDF...")
-                if pdf_question:
+                # Form dikosongkan setelah dikirim, jadi pertanyaan tidak terkirim ulang setiap rerun
+                with st.form("pdf_question_form", clear_on_submit=True):
+                    pdf_question = st.text_input("Tanya tentang PDF...")
+                    submitted = st.form_submit_button("Tanya")
+                if submitted and pdf_question.strip():
                     with st.spinner("Sedang memproses jawaban..."):
-                        combined_input = f"Tolong jawab berdasarkan isi PDF:\n\n{pdf_text}\n\nPertanyaan:\n{pdf_question}"
+                        # Hanya potongan PDF yang relevan yang dikirim ke LLM
+                        pdf_context = "\n\n".join(
+                            f"[Halaman {chunk.page}]\n{chunk.text}" for chunk in pdf_index.top_k(pdf_question)
+                        )
+                        combined_input = f"Tolong jawab berdasarkan kutipan isi PDF berikut:\n\n{pdf_context}\n\nPertanyaan:\n{pdf_question}"
                         response_text = run_agent(combined_input, st.session_state.gemini_api)
                         st.session_state.messages.append({"role": "user", "content": pdf_question})
                         st.session_state.messages.append({"role": "assistant", "content": response_text})
+                        save_history()
+                        compact_memory(st.session_state.gemini_api)
+                        trim_messages()
                         st.rerun()
 
 if __name__ == "__main__":
@@ -1,116 +1,325 @@
 # mental_health_chatbot/mental_health_processor.py
-import PyPDF2
-import pdfplumber
-from typing import Dict, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import multiprocessing
+import threading
+import tempfile
+import atexit
 import re
 import io
+import os
+
+from keyword_matcher import KeywordMatch, KeywordMatcher, spans_with_matches
+from telemetry import span
+
+DEFAULT_KEYWORDS = [
+    'mental health', 'depression', 'anxiety', 'stress',
+    'psikologis', 'depresi', 'kecemasan', 'gangguan mood',
+    'terapi', 'konseling', 'skrining', 'diagnosis', 'DSM-5'
+]
+# File glosarium opsional (satu istilah per baris) menggantikan keyword default
+KEYWORDS_FILE = os.getenv("MENTAL_HEALTH_KEYWORDS_FILE")
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+LINE_BREAK = re.compile(r'\n')
+
+# Di atas jumlah halaman ini ekstraksi dibagi ke process pool
+PARALLEL_PAGE_THRESHOLD = 16
+PAGES_PER_TASK = 4
+
+# Process pool bersama: dibuat saat PDF besar pertama, dipakai ulang untuk
+# dokumen berikutnya (start worker spawn mahal: import ulang pdfplumber dkk.)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: aman dipanggil dari thread Streamlit (fork + thread rawan deadlock)
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers or min(os.cpu_count() or 1, 8),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor) -> None:
+    """Worker mati (mis. OOM): pool rusak dibuang, PDF berikutnya membuat pool baru"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _open_pdf(source):
+    """pdfplumber untuk bytes atau path file; None jika pdfplumber gagal membuka"""
+    import pdfplumber
+
+    try:
+        return pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    except Exception as pdfplumber_error:
+        print(f"pdfplumber error: {pdfplumber_error}, trying PyPDF2...")
+        return None
+
+
+def _iter_page_texts(source, start: int, end: int, pdf=None):
+    """Yield (nomor halaman, teks, engine) untuk halaman [start, end).
+
+    `source` berupa bytes PDF atau path file; `pdf` (pdfplumber yang sudah
+    dibuka) dipakai jika ada dan tidak ditutup di sini. pdfplumber dipakai
+    lebih dulu; jika gagal di satu halaman, hanya halaman itu yang dibaca
+    ulang dengan PyPDF2.
+    """
+    reader = None
+    owned = pdf is None
+    if owned:
+        pdf = _open_pdf(source)
+
+    try:
+        for i in range(start, end):
+            text, engine = None, None
+            if pdf is not None:
+                try:
+                    page = pdf.pages[i]
+                    text, engine = page.extract_text() or "", "pdfplumber"
+                    page.close()  # lepas cache objek halaman, memori tetap kecil
+                except Exception as pdfplumber_error:
+                    print(f"pdfplumber error di halaman {i + 1}: {pdfplumber_error}, trying PyPDF2...")
+
+            if text is None:
+                try:
+                    if reader is None:
+                        import PyPDF2
+                        reader = PyPDF2.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+                    text, engine = reader.pages[i].extract_text() or "", "pypdf2"
+                except Exception as e:
+                    print(f"PyPDF2 error di halaman {i + 1}: {e}")
+                    text = ""
+
+            yield i + 1, text, engine
+    finally:
+        if owned and pdf is not None:
+            pdf.close()
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[tuple]:
+    """Task untuk worker process (PDF dibaca dari file sementara)"""
+    if not os.path.exists(path):
+        return []  # consumer sudah berhenti dan file sementara dihapus
+    return list(_iter_page_texts(path, start, end))
+
+
+def _count_pages(pdf_bytes: bytes, pdf=None) -> int:
+    """Jumlah halaman dari pdfplumber yang sudah dibuka; PyPDF2 hanya jika pdfplumber gagal"""
+    if pdf is not None:
+        return len(pdf.pages)
+    try:
+        import PyPDF2
+        return len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+    except Exception as e:
+        raise ValueError(f"PDF tidak bisa dibaca: {e}")
+
+
+def _split_spans(text: str, separator: re.Pattern) -> List[tuple]:
+    """Offset (start, end) potongan teks seperti re.split(separator, text)"""
+    spans = []
+    position = 0
+    for match in separator.finditer(text):
+        spans.append((position, match.start()))
+        position = match.end()
+    spans.append((position, len(text)))
+    return spans
+
 
 class MentalHealthDocumentProcessor:
     """Processor khusus untuk dokumen kesehatan mental (PDF)"""
-    
-    def __init__(self):
-        self.mental_health_keywords = [
-            'mental health', 'depression', 'anxiety', 'stress', 
-            'psikologis', 'depresi', 'kecemasan', 'gangguan mood',
-            'terapi', 'konseling', 'skrining', 'diagnosis', 'DSM-5'
-        ]
-
-    def extract_text_from_pdf(self, file_stream) -> Dict[str, Union[str, dict]]:
-        """Ekstrak teks dari PDF dengan prioritas konten kesehatan mental"""
+
+    def __init__(self, keywords: Optional[Sequence[str]] = None, keywords_file: Optional[str] = KEYWORDS_FILE):
+        # Matcher dikompilasi sekali per processor, dipakai ulang untuk semua halaman
+        if keywords is None and keywords_file:
+            self.keyword_matcher = KeywordMatcher.from_file(keywords_file)
+        else:
+            self.keyword_matcher = KeywordMatcher(DEFAULT_KEYWORDS if keywords is None else keywords)
+        self.mental_health_keywords = list(self.keyword_matcher.keywords.values())
+
+    def iter_pages(
+        self,
+        file_stream,
+        max_pages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        parallel_threshold: int = PARALLEL_PAGE_THRESHOLD,
+        max_workers: Optional[int] = None
+    ) -> Iterator[Dict[str, Union[int, str, bool]]]:
+        """Streaming ekstraksi: yield satu dict per halaman, urut, begitu selesai diekstrak.
+
+        Setiap dict berisi page, text, engine, relevant, summary, paragraphs
+        (paragraf relevan untuk ringkasan), matches (offset keyword),
+        highlighted (teks dengan keyword di-highlight) dan truncated. Budget max_pages /
+        max_bytes (byte UTF-8 teks hasil ekstraksi) menghentikan ekstraksi lebih
+        awal; halaman terakhir yang di-yield ditandai truncated=True.
+        """
+        pdf_bytes = file_stream if isinstance(file_stream, bytes) else file_stream.read()
+        # Satu parser untuk jumlah halaman dan (jika tidak paralel) ekstraksi
+        pdf = _open_pdf(pdf_bytes)
+        source = None
+        try:
+            total_pages = _count_pages(pdf_bytes, pdf)
+            page_limit = min(total_pages, max_pages) if max_pages is not None else total_pages
+
+            if page_limit >= parallel_threshold:
+                source = self._iter_parallel(pdf_bytes, page_limit, max_workers)
+            else:
+                source = _iter_page_texts(pdf_bytes, 0, page_limit, pdf=pdf)
+            yield from self._iter_processed(source, page_limit, total_pages, max_bytes)
+        finally:
+            if source is not None:
+                source.close()
+            if pdf is not None:
+                pdf.close()
+
+    def _iter_processed(self, source, page_limit: int, total_pages: int, max_bytes: Optional[int]):
+        """Budget byte + deteksi keyword, ringkasan dan highlight per halaman"""
+        used_bytes = 0
+        for page_no, text, engine in source:
+            truncated = page_no == page_limit and page_limit < total_pages
+            if max_bytes is not None:
+                encoded = text.encode("utf-8")
+                remaining = max_bytes - used_bytes
+                if len(encoded) > remaining:
+                    text = encoded[:remaining].decode("utf-8", "ignore")
+                    truncated = True
+                used_bytes += len(text.encode("utf-8"))
+
+            # Satu pass keyword per halaman; deteksi, ringkasan dan highlight memakai offset ini
+            matches = self.keyword_matcher.find_all(text)
+            relevant = bool(matches)
+            yield {
+                'page': page_no,
+                'text': text,
+                'engine': engine,
+                'relevant': relevant,
+                'summary': self._summarize_page(text, matches) if relevant else "",
+                'paragraphs': self._relevant_paragraphs(text, matches) if relevant else [],
+                'matches': matches,
+                'highlighted': self.keyword_matcher.highlight(text, matches),
+                'truncated': truncated,
+            }
+            if truncated:
+                break
+
+    def _iter_parallel(self, pdf_bytes: bytes, page_limit: int, max_workers: Optional[int]):
+        """Bagi halaman ke process pool bersama, hasil tetap di-yield sesuai urutan halaman.
+
+        max_workers hanya berlaku saat pool pertama kali dibuat.
+        """
+        # Worker membaca PDF dari file sementara, bukan bytes yang di-pickle per task
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        pool = _get_pool(max_workers)
+        futures = []
         try:
-            # Coba dengan pdfplumber terlebih dahulu untuk presisi
-            with pdfplumber.open(file_stream) as pdf:
-                full_text = ""
-                mental_health_pages = {}
-                
-                for i, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                        
-                        # Deteksi halaman relevan
-                        if self._is_mental_health_content(page_text):
-                            mental_health_pages[i+1] = self._summarize_page(page_text)
-                
-                # Jika menemukan konten spesifik kesehatan mental
-                if mental_health_pages:
-                    highlighted_content = self._highlight_keywords(full_text)
-                    return {
-                        'status': 'success',
-                        'full_text': full_text,
-                        'mental_health_pages': mental_health_pages,
-                        'highlighted_content': highlighted_content,
-                        'summary': self._generate_summary(full_text)
-                    }
-                else:
-                    return {
-                        'status': 'success',
-                        'full_text': full_text,
-                        'summary': self._generate_summary(full_text)
-                    }
-
-        except Exception as pdfplumber_error:
-            print(f"pdfplumber error: {pdfplumber_error}, trying PyPDF2...")
+            futures = [
+                pool.submit(_extract_page_range, path, start, min(start + PAGES_PER_TASK, page_limit))
+                for start in range(0, page_limit, PAGES_PER_TASK)
+            ]
+            for future in futures:
+                yield from future.result()
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            raise
+        finally:
+            # Budget habis / consumer berhenti: batalkan task yang belum jalan
+            for future in futures:
+                future.cancel()
             try:
-                # Fallback ke PyPDF2
-                file_stream.seek(0)
-                pdf_reader = PyPDF2.PdfReader(file_stream)
-                full_text = ""
-                
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                
-                return {
-                    'status': 'success',
-                    'full_text': full_text,
-                    'summary': self._generate_summary(full_text)
-                }
-                
-            except Exception as e:
-                return {
-                    'status': 'error',
-                    'error': f"Gagal memproses PDF: {str(e)}"
-                }
+                os.remove(path)
+            except OSError:
+                pass  # Windows: worker yang masih berjalan memegang file
+
+    def extract_text_from_pdf(self, file_stream, max_pages: Optional[int] = None, max_bytes: Optional[int] = None) -> Dict[str, Union[str, dict]]:
+        """Ekstrak teks dari PDF dengan prioritas konten kesehatan mental"""
+        with span("pdf.extract") as current:
+            result = self._extract_text_from_pdf(file_stream, max_pages, max_bytes)
+            current.set(status=result['status'], chars=len(result.get('full_text', '')))
+            return result
+
+    def _extract_text_from_pdf(self, file_stream, max_pages: Optional[int], max_bytes: Optional[int]) -> Dict[str, Union[str, dict]]:
+        try:
+            page_texts = []
+            highlighted_pages = []
+            mental_health_pages = {}
+            summary_paragraphs = []
+            truncated = False
+
+            # Satu pass: teks, halaman relevan dan bahan ringkasan dikumpulkan per halaman
+            for page in self.iter_pages(file_stream, max_pages=max_pages, max_bytes=max_bytes):
+                truncated = truncated or page['truncated']
+                if not page['text']:
+                    continue
+                page_texts.append(page['text'])
+                highlighted_pages.append(page['highlighted'])
+                if page['relevant']:
+                    mental_health_pages[page['page']] = page['summary']
+                    summary_paragraphs.extend(page['paragraphs'][:3 - len(summary_paragraphs)])
+
+            full_text = "".join(text + "\n" for text in page_texts)
+            result = {
+                'status': 'success',
+                'full_text': full_text,
+                'summary': self._format_summary(summary_paragraphs),
+                'truncated': truncated
+            }
+            # Jika menemukan konten spesifik kesehatan mental
+            if mental_health_pages:
+                result['mental_health_pages'] = mental_health_pages
+                result['highlighted_content'] = "".join(text + "\n" for text in highlighted_pages)
+            return result
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': f"Gagal memproses PDF: {str(e)}"
+            }
 
     def _is_mental_health_content(self, text: str) -> bool:
         """Deteksi apakah teks mengandung konten kesehatan mental"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.mental_health_keywords)
+        return self.keyword_matcher.contains(text)
 
-    def _highlight_keywords(self, text: str) -> str:
+    def _highlight_keywords(self, text: str, matches: Optional[List[KeywordMatch]] = None) -> str:
         """Highlight keyword kesehatan mental dalam teks"""
-        highlighted = text
-        for keyword in self.mental_health_keywords:
-            pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-            highlighted = pattern.sub(f"**{keyword.upper()}**", highlighted)
-        return highlighted
+        return self.keyword_matcher.highlight(text, matches)
 
-    def _summarize_page(self, page_text: str) -> str:
+    def _summarize_page(self, page_text: str, matches: Optional[List[KeywordMatch]] = None) -> str:
         """Ringkas halaman yang relevan"""
-        sentences = re.split(r'(?<=[.!?])\s+', page_text)
-        relevant_sentences = [
-            s for s in sentences 
-            if any(keyword.lower() in s.lower() for keyword in self.mental_health_keywords)
-        ]
-        return " ".join(relevant_sentences[:3]) + "..." if relevant_sentences else ""
+        matches = self.keyword_matcher.find_all(page_text) if matches is None else matches
+        spans = _split_spans(page_text, SENTENCE_BREAK)
+        relevant_sentences = [page_text[slice(*spans[i])] for i in spans_with_matches(spans, matches)[:3]]
+        return " ".join(relevant_sentences) + "..." if relevant_sentences else ""
+
+    def _relevant_paragraphs(self, text: str, matches: Optional[List[KeywordMatch]] = None) -> List[str]:
+        """Paragraf (baris) yang mengandung konten kesehatan mental"""
+        matches = self.keyword_matcher.find_all(text) if matches is None else matches
+        spans = _split_spans(text, LINE_BREAK)
+        return [text[slice(*spans[i])] for i in spans_with_matches(spans, matches)]
 
     def _generate_summary(self, text: str) -> str:
         """Buat ringkasan dokumen yang fokus pada aspek kesehatan mental"""
-        paragraphs = [p for p in text.split('\n') if p.strip()]
-        relevant_paras = [
-            p for p in paragraphs 
-            if self._is_mental_health_content(p)
-        ][:3]
-        
+        return self._format_summary(self._relevant_paragraphs(text)[:3])
+
+    def _format_summary(self, relevant_paras: List[str]) -> str:
         if not relevant_paras:
             return "Dokumen ini tidak memiliki konten kesehatan mental yang terdeteksi."
-        
+
         return "\n\n".join([
             "DOKUMEN MENGANDUNG INFORMASI TENTANG:",
             "- " + "\n- ".join([
-                para[:150] + "..." if len(para) > 150 else para 
+                para[:150] + "..." if len(para) > 150 else para
                 for para in relevant_paras
             ]),
             "\nGunakan fitur chat untuk bertanya spesifik tentang dokumen ini."
@@ -0,0 +1,160 @@
+# pdf_index.py
+# Index vektor in-memory untuk PDF yang di-upload user. Setiap PDF dipecah jadi
+# chunk, di-embed sekali, lalu disimpan di cache LRU per proses dengan key
+# SHA-256 isi file: rerun Streamlit dan upload ulang file yang sama memakai
+# index yang sudah ada. Pertanyaan PDF hanya mengirim top-k chunk ke LLM.
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+PDF_CHUNK_SIZE = 800
+PDF_CHUNK_OVERLAP = 100
+PDF_TOP_K = int(os.getenv("PDF_TOP_K", "4"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "300"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(2 * 1024 * 1024)))
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "32"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+@dataclass
+class PdfChunk:
+    text: str
+    page: int
+    score: float = 0.0
+
+
+class PdfIndex:
+    """Chunk + vektor ternormalisasi dari satu PDF"""
+
+    def __init__(self, sha256: str, chunks: List[PdfChunk], vectors: np.ndarray, extraction: dict, embeddings):
+        self.sha256 = sha256
+        self.chunks = chunks
+        self.vectors = vectors
+        self.extraction = extraction
+        self.embeddings = embeddings
+
+    @property
+    def nbytes(self) -> int:
+        """Perkiraan memori yang dipakai (untuk batas ukuran cache)"""
+        text_bytes = sum(len(chunk.text) for chunk in self.chunks)
+        return int(self.vectors.nbytes) + text_bytes + len(self.extraction.get('summary', ''))
+
+    def top_k(self, question: str, k: int = PDF_TOP_K) -> List[PdfChunk]:
+        """Chunk paling relevan (cosine similarity), dikembalikan urut sesuai halaman"""
+        if not self.chunks or not question.strip():
+            return []
+        query = np.asarray(self.embeddings.embed_query(question), dtype="float32")
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        hits = [
+            PdfChunk(text=self.chunks[i].text, page=self.chunks[i].page, score=float(scores[i]))
+            for i in best
+        ]
+        # Urutan dokumen lebih mudah dibaca LLM daripada urutan skor
+        return sorted(hits, key=lambda chunk: (chunk.page, -chunk.score))
+
+
+def build_pdf_index(pdf_bytes: bytes, embeddings, processor=None, sha256: Optional[str] = None) -> PdfIndex:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from mental_health_processor import MentalHealthDocumentProcessor
+
+    from telemetry import span
+
+    processor = processor or MentalHealthDocumentProcessor()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=PDF_CHUNK_SIZE, chunk_overlap=PDF_CHUNK_OVERLAP)
+
+    chunks = []
+    relevant_pages = {}
+    summary_paragraphs = []
+    truncated = False
+    with span("pdf.extract", streaming=True) as current:
+        pages = 0
+        for page in processor.iter_pages(pdf_bytes, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES):
+            pages += 1
+            truncated = truncated or page['truncated']
+            if page['relevant']:
+                relevant_pages[page['page']] = page['summary']
+                summary_paragraphs.extend(page['paragraphs'][:3 - len(summary_paragraphs)])
+            chunks.extend(
+                PdfChunk(text=text, page=page['page'])
+                for text in splitter.split_text(page['text'])
+                if text.strip()
+            )
+        current.set(pages=pages, chunks=len(chunks))
+
+    if chunks:
+        with span("pdf.embed_chunks", texts=len(chunks)):
+            vectors = np.asarray(embeddings.embed_documents([chunk.text for chunk in chunks]), dtype="float32")
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    else:
+        vectors = np.zeros((0, 1), dtype="float32")
+
+    extraction = {
+        'summary': processor._format_summary(summary_paragraphs),
+        'mental_health_pages': relevant_pages,
+        'truncated': truncated,
+    }
+    return PdfIndex(sha256 or hashlib.sha256(pdf_bytes).hexdigest(), chunks, vectors, extraction, embeddings)
+
+
+class PdfIndexCache:
+    """Cache LRU lintas session, dibatasi jumlah entri dan total byte"""
+
+    def __init__(self, embeddings, max_entries: int = PDF_CACHE_MAX_ENTRIES, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def get(self, sha256: str) -> Optional[PdfIndex]:
+        with self._lock:
+            index = self._entries.get(sha256)
+            if index is not None:
+                self._entries.move_to_end(sha256)
+            return index
+
+    def get_or_build(self, pdf_bytes: bytes, sha256: Optional[str] = None) -> PdfIndex:
+        sha256 = sha256 or hashlib.sha256(pdf_bytes).hexdigest()
+        index = self.get(sha256)
+        if index is not None:
+            return index
+
+        # Upload file yang sama dari beberapa session sekaligus cukup dibangun sekali
+        with self._lock:
+            build_lock = self._building.setdefault(sha256, threading.Lock())
+        try:
+            with build_lock:
+                index = self.get(sha256)
+                if index is None:
+                    index = build_pdf_index(pdf_bytes, self.embeddings, sha256=sha256)
+                    self._put(index)
+        finally:
+            # Juga saat build gagal, supaya lock per-sha tidak menumpuk
+            with self._lock:
+                self._building.pop(sha256, None)
+        return index
+
+    def _put(self, index: PdfIndex) -> None:
+        with self._lock:
+            self._entries[index.sha256] = index
+            self._bytes += index.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                if len(self._entries) == 1:
+                    break  # satu PDF besar tetap boleh disimpan selama dipakai
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,20 +1,85 @@
-import streamlit as st
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.chains.retrieval_qa.base import BaseRetrievalQA
-from google.generativeai.generative_models import GenerativeModel
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List
 
+from langchain_core.retrievers import BaseRetriever
+
+import resources
+from rag_context import RAG_CONTEXT_TOKENS, RAG_FETCH_K, build_context
+from telemetry import span, traced
+
+# Chain RetrievalQA dibuat sekali per (FaissRetriever, k, llm) lalu dipakai ulang.
+# LRU terbatas: entri menyimpan referensi objeknya, jadi id() di key tidak
+# mungkin dipakai ulang objek lain selama entri masih ada.
+MAX_CHAINS = 8
+_CHAINS = OrderedDict()
+_CHAINS_LOCK = threading.Lock()
+
+
+class _CompressedRetriever(BaseRetriever):
+    """Ambil fetch_k kandidat, lalu MMR + pangkas kalimat + budget token (rag_context.py)"""
+    base: Any
+    k: int = 3
+    fetch_k: int = RAG_FETCH_K
+    token_budget: int = RAG_CONTEXT_TOKENS
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List:
+        with span("rag.context", fetch_k=self.fetch_k) as current:
+            faiss_retriever = getattr(self.base, "faiss_retriever", None)
+            term_weight = None
+            if faiss_retriever is not None:
+                documents, vectors, query_vector = faiss_retriever.search_with_vectors(query, k=self.fetch_k)
+                term_weight = faiss_retriever.term_weight
+            else:
+                documents, vectors, query_vector = self.base.invoke(query), None, None
+            context = build_context(
+                query, documents, vectors, query_vector,
+                k=self.k, token_budget=self.token_budget, term_weight=term_weight
+            )
+            current.set(
+                candidates=len(documents),
+                selected=len(context),
+                chars_in=sum(len(d.page_content) for d in documents[:self.k]),
+                chars_out=sum(len(d.page_content) for d in context)
+            )
+            return context
+
+
+@lru_cache(maxsize=None)
 def load_retriever():
-    client = GenerativeModel(model_name="embedding-001")  # model khusus untuk embeddings
-    embeddings = GoogleGenerativeAIEmbeddings(model="embedding-001")
-    db = FAISS.load_local("data/faiss_index", embeddings)
-    return db.as_retriever(search_kwargs={"k": 3})
+    # FAISS index + embeddings Cohere dimuat sekali per proses (lihat resources.py);
+    # adapter LangChain juga di-cache supaya chain di get_chain ikut dipakai ulang
+    return resources.get_retriever("data/faiss_index").as_retriever(k=3)
 
-def get_rag_response(query, retriever, llm):
-    qa: BaseRetrievalQA = BaseRetrievalQA.from_chain_type(
+
+def get_chain(retriever, llm):
+    from langchain.chains.retrieval_qa.base import RetrievalQA
+
+    # Adapter baru untuk FaissRetriever yang sama tetap memakai chain yang sama
+    base = getattr(retriever, "faiss_retriever", retriever)
+    k = getattr(retriever, "k", 3)
+    key = (id(base), k, id(llm))
+    with _CHAINS_LOCK:
+        entry = _CHAINS.get(key)
+        if entry is not None:
+            _CHAINS.move_to_end(key)
+            return entry[0]
+
+    # BaseRetrievalQA abstrak (tidak bisa dibuat), pakai implementasi RetrievalQA
+    qa: RetrievalQA = RetrievalQA.from_chain_type(
         llm=llm,
-        retriever=retriever,
+        retriever=_CompressedRetriever(base=retriever, k=k),
         chain_type="stuff",
         return_source_documents=True
     )
-    return qa({"query": query})
+    with _CHAINS_LOCK:
+        _CHAINS[key] = (qa, base, llm)
+        while len(_CHAINS) > MAX_CHAINS:
+            _CHAINS.popitem(last=False)
+    return qa
+
+
+@traced("rag.response")
+def get_rag_response(query, retriever, llm):
+    return get_chain(retriever, llm).invoke({"query": query})
@@ -0,0 +1,128 @@
+# rag_context.py
+# Tahap konteks sebelum panggilan LLM di RAG: kandidat hasil retrieval
+# diseleksi dengan MMR (relevan tapi tidak saling duplikat, memakai vektor yang
+# sudah ada di index), setiap chunk dipangkas ke kalimat yang relevan dengan
+# query, lalu totalnya dimuatkan ke budget token. Prompt lebih pendek ->
+# generate lebih cepat dan lebih murah.
+
+import os
+import re
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from bm25_index import tokenize
+from conversation_memory import count_tokens, truncate_tokens
+
+RAG_FETCH_K = int(os.getenv("RAG_FETCH_K", "12"))
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "600"))
+MMR_LAMBDA = 0.7               # bobot relevansi vs keberagaman
+DUPLICATE_SIMILARITY = 0.95    # cosine di atas ini dianggap duplikat
+DUPLICATE_JACCARD = 0.8        # pengganti saat vektor tidak tersedia
+MAX_SENTENCES = 4
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype="float32")
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def mmr_select(query_vector, vectors, k: int, lambda_mult: float = MMR_LAMBDA, duplicate_similarity: float = DUPLICATE_SIMILARITY) -> List[int]:
+    """Index kandidat terpilih (urut seleksi) dengan maximal marginal relevance"""
+    candidates = _normalize(vectors)
+    relevance = candidates @ _normalize(query_vector)
+    similarity = candidates @ candidates.T
+
+    selected = []
+    remaining = list(range(len(candidates)))
+    while remaining and len(selected) < k:
+        if selected:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype="float32")
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        best = remaining[int(np.argmax(scores))]
+        remaining.remove(best)
+        if selected and similarity[best, selected].max() >= duplicate_similarity:
+            continue  # near-duplicate dari chunk yang sudah dipilih
+        selected.append(best)
+    return selected
+
+
+def dedupe_lexical(texts: List[str], k: int, threshold: float = DUPLICATE_JACCARD) -> List[int]:
+    """Pengganti MMR tanpa vektor: buang chunk yang overlap token-nya (Jaccard) tinggi"""
+    selected, token_sets = [], []
+    for i, text in enumerate(texts):
+        tokens = set(tokenize(text))
+        if any(len(tokens & other) / max(len(tokens | other), 1) >= threshold for other in token_sets):
+            continue
+        selected.append(i)
+        token_sets.append(tokens)
+        if len(selected) == k:
+            break
+    return selected
+
+
+def trim_sentences(text: str, query: str, term_weight: Optional[Callable[[str], Optional[float]]] = None, max_sentences: int = MAX_SENTENCES) -> str:
+    """Pertahankan kalimat pertama (pertanyaan FAQ) + kalimat paling relevan, urutan asli"""
+    sentences = [s for s in SENTENCE_BREAK.split(text.strip()) if s]
+    if len(sentences) <= max_sentences:
+        return text.strip()
+
+    query_terms = set(tokenize(query))
+    weights = {}
+    for term in query_terms:
+        weight = term_weight(term) if term_weight is not None else None
+        # Tanpa IDF: abaikan kata sangat pendek (kebanyakan kata fungsi)
+        weights[term] = weight if weight is not None else (1.0 if len(term) > 3 else 0.0)
+
+    scores = [sum(weights[t] for t in set(tokenize(sentence)) & query_terms) for sentence in sentences]
+    ranked = sorted(range(1, len(sentences)), key=lambda i: (-scores[i], i))
+    keep = {0} | {i for i in ranked[:max_sentences - 1] if scores[i] > 0}
+    if len(keep) == 1:
+        keep |= set(range(1, min(max_sentences, len(sentences))))  # tidak ada yang cocok: awal jawaban
+    return " ".join(sentences[i] for i in sorted(keep))
+
+
+def build_context(
+    query: str,
+    documents: List,
+    vectors=None,
+    query_vector=None,
+    k: int = 3,
+    token_budget: int = RAG_CONTEXT_TOKENS,
+    term_weight: Optional[Callable[[str], Optional[float]]] = None
+) -> List:
+    """Dokumen (copy, isi dipangkas) yang dikirim ke LLM, total <= token_budget"""
+    from langchain_core.documents import Document
+
+    if not documents:
+        return []
+    if vectors is not None and query_vector is not None and len(vectors) == len(documents):
+        order = mmr_select(query_vector, vectors, k)
+    else:
+        order = dedupe_lexical([doc.page_content for doc in documents], k)
+
+    context = []
+    used = 0
+    for i in order:
+        document = documents[i]
+        text = trim_sentences(document.page_content, query, term_weight)
+        remaining = token_budget - used
+        if remaining <= 0:
+            break
+        tokens = count_tokens(text)
+        if tokens > remaining:
+            if context:
+                break  # chunk berikutnya tidak muat; yang paling relevan sudah masuk
+            text = truncate_tokens(text, remaining)
+            tokens = remaining
+        used += tokens
+        context.append(Document(
+            id=document.id,
+            page_content=text,
+            metadata={**document.metadata, "original_chars": len(document.page_content)}
+        ))
+    return context
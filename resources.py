@@ -0,0 +1,146 @@
+# resources.py
+# Resource bersama per proses (LLM client, embeddings, retriever, CSS) supaya
+# tidak dibuat ulang di setiap rerun Streamlit / setiap session baru.
+# Import berat (langchain_google_genai, FAISS, numpy) baru dilakukan saat
+# resource tersebut pertama kali dibutuhkan.
+
+import os
+import json
+import time
+import threading
+from functools import lru_cache
+
+# Titik nol pengukuran cold start: modul ini di-import paling awal oleh main.py
+# dan hanya sekali per proses (Streamlit hanya menjalankan ulang script utama).
+PROCESS_START = time.perf_counter()
+STARTUP_LOG = os.getenv("STARTUP_METRICS_PATH", "data/metrics/startup.jsonl")
+
+_marked = set()
+_marked_lock = threading.Lock()
+
+
+def mark_startup(stage: str, **extra) -> None:
+    """Catat sekali per proses: waktu dari start proses sampai `stage` tercapai"""
+    with _marked_lock:
+        if stage in _marked:
+            return
+        _marked.add(stage)
+
+    record = {
+        "stage": stage,
+        "seconds_since_start": round(time.perf_counter() - PROCESS_START, 4),
+        "release": os.getenv("APP_RELEASE", "dev"),
+        "pid": os.getpid(),
+        "timestamp": time.time(),
+        **extra,
+    }
+    try:
+        if os.path.dirname(STARTUP_LOG):
+            os.makedirs(os.path.dirname(STARTUP_LOG), exist_ok=True)
+        with open(STARTUP_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Gagal menulis metrik startup: {str(e)}")
+
+
+@lru_cache(maxsize=None)
+def get_css(path: str = "style.css") -> str:
+    with open(path) as f:
+        return f.read()
+
+
+FAKE_LLM_RESPONSE = (
+    "Terima kasih sudah bercerita. Perasaan seperti itu wajar dan kamu tidak sendirian. "
+    "Coba tarik napas perlahan, lalu ceritakan apa yang paling membebani pikiranmu hari ini."
+)
+
+
+@lru_cache(maxsize=16)
+def get_llm(api_key: str, model: str = "gemini-1.5-flash", temperature: float = 0.2):
+    """Satu chat model per (api_key, model); callback dipasang per pemanggilan.
+
+    Model dibungkus LLMClient (timeout, retry + jitter, hedging opsional,
+    penggabungan prompt identik, batas konkurensi; lihat llm_client.py).
+    LLM_BACKEND=fake memakai model lokal deterministik (untuk benchmark/testing
+    offline); LLM_FAKE_LATENCY / LLM_FAKE_ERROR_RATE menyuntikkan latensi & error.
+    """
+    from llm_client import LLM_TIMEOUT, FaultyFakeChatModel, LLMClient, ResilientChatModel
+
+    if os.getenv("LLM_BACKEND", "gemini").lower() == "fake":
+        upstream = FaultyFakeChatModel(
+            responses=[FAKE_LLM_RESPONSE],
+            latency=float(os.getenv("LLM_FAKE_LATENCY", "0")),
+            latency_jitter=float(os.getenv("LLM_FAKE_LATENCY_JITTER", "0")),
+            error_rate=float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+        )
+    else:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        upstream = ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            temperature=temperature,
+            convert_system_message_to_human=True,
+            # Retry ditangani LLMClient (dengan jitter), bukan di dalam SDK
+            max_retries=1,
+            timeout=LLM_TIMEOUT
+        )
+    return ResilientChatModel(client=LLMClient(upstream))
+
+
+@lru_cache(maxsize=None)
+def get_background_executor():
+    """Thread pool untuk pekerjaan setelah jawaban tampil (mis. ringkasan memori)"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="background")
+
+
+@lru_cache(maxsize=None)
+def get_embeddings():
+    from dotenv import load_dotenv
+    from embedding_cache import get_embeddings as build_embeddings
+
+    load_dotenv()
+    return build_embeddings()
+
+
+@lru_cache(maxsize=4)
+def get_retriever(index_path: str = "data/faiss_index"):
+    from retriever import FaissRetriever
+
+    # Mode client (RETRIEVAL_SERVER): index & client embedding ada di proses server
+    embeddings = None if os.getenv("RETRIEVAL_SERVER") else get_embeddings()
+    return FaissRetriever(index_path=index_path, embeddings=embeddings)
+
+
+@lru_cache(maxsize=4)
+def get_faq_matcher(index_path: str = "data/faq_index"):
+    from faq_matcher import FaqMatcher
+
+    return FaqMatcher(index_path=index_path, embeddings=get_embeddings())
+
+
+@lru_cache(maxsize=None)
+def get_intent_router():
+    """Router intent lokal; tanpa embeddings (mis. API key tidak ada) hanya aturan keyword"""
+    from intent_router import IntentRouter
+
+    try:
+        embeddings = get_embeddings()
+    except Exception as e:
+        print(f"⚠️ Embeddings tidak tersedia untuk router intent: {str(e)}")
+        embeddings = None
+    return IntentRouter(embeddings=embeddings)
+
+
+@lru_cache(maxsize=None)
+def get_pdf_index_cache():
+    """Cache index PDF upload (LRU lintas session, lihat pdf_index.py)"""
+    from embedding_cache import CachedEmbeddings
+    from pdf_index import PdfIndexCache
+
+    shared = get_embeddings()
+    # Isi PDF user tidak ditulis ke cache embedding di disk (privasi, dan
+    # supaya tidak mengusir vektor FAQ dari cache LRU)
+    return PdfIndexCache(CachedEmbeddings(shared.base, shared.model_name, cache=None))
@@ -0,0 +1,243 @@
+# retrieval_server.py
+# Server retrieval opsional: satu proses memegang satu salinan index (dan satu
+# client embedding) untuk semua session Streamlit. Query yang datang bersamaan
+# dikumpulkan jadi micro-batch (max_wait / max_batch), di-embed dengan satu
+# request, lalu dicari dengan satu pencarian FAISS batch.
+#
+#   python retrieval_server.py --socket /tmp/ruangteduh-retrieval.sock
+#   python retrieval_server.py --host 127.0.0.1 --port 8765 --max-batch 32 --max-wait-ms 5
+#
+# App memakai server ini dengan RETRIEVAL_SERVER=unix:/tmp/ruangteduh-retrieval.sock
+# (atau tcp:127.0.0.1:8765); FaissRetriever otomatis berjalan dalam mode client.
+#
+# Protokol: JSON per baris. Request {"id", "query", "k", "mode"} (atau
+# {"op": "ping"}), response {"id", "documents": [{id, page_content, metadata}]}
+# atau {"id", "error"}.
+
+import os
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+CLIENT_TIMEOUT = float(os.getenv("RETRIEVAL_SERVER_TIMEOUT", "10"))
+
+
+def parse_address(address: str):
+    """"unix:/path.sock" atau "tcp:host:port" (atau "host:port")"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if address.startswith("tcp:"):
+        address = address[len("tcp:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+class MicroBatcher:
+    """Kumpulkan request yang datang dalam max_wait jadi satu batch (maks max_batch)"""
+
+    def __init__(self, retriever, max_batch: int = DEFAULT_MAX_BATCH, max_wait: float = DEFAULT_MAX_WAIT_MS / 1000, workers: int = 2):
+        self.retriever = retriever
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        # Embedding (I/O) batch berikutnya bisa jalan selagi batch sebelumnya mencari
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieval-batch")
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, query: str, k: int, mode: Optional[str]):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, k, mode, future))
+        return await future
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            self.requests += len(batch)
+            loop.create_task(self._execute(batch))
+
+    async def _execute(self, batch) -> None:
+        # Satu search_batch per kombinasi (k, mode)
+        groups = {}
+        for item in batch:
+            groups.setdefault((item[1], item[2]), []).append(item)
+        loop = asyncio.get_running_loop()
+        for (k, mode), items in groups.items():
+            queries = [item[0] for item in items]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, lambda: self.retriever.search_batch(queries, k=k, mode=mode)
+                )
+            except Exception as e:
+                for item in items:
+                    if not item[3].done():
+                        item[3].set_exception(e)
+                continue
+            for item, documents in zip(items, results):
+                if not item[3].done():
+                    item[3].set_result(documents)
+
+
+def _document_to_json(document) -> dict:
+    return {"id": document.id, "page_content": document.page_content, "metadata": document.metadata}
+
+
+async def _handle_connection(batcher: MicroBatcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    write_lock = asyncio.Lock()
+
+    async def respond(message: dict) -> None:
+        async with write_lock:
+            writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+
+    async def handle(request: dict) -> None:
+        request_id = request.get("id")
+        try:
+            if request.get("op") == "ping":
+                await respond({"id": request_id, "ok": True, "batches": batcher.batches, "requests": batcher.requests})
+                return
+            documents = await batcher.submit(str(request.get("query", "")), int(request.get("k", 3)), request.get("mode"))
+            await respond({"id": request_id, "documents": [_document_to_json(d) for d in documents]})
+        except Exception as e:
+            await respond({"id": request_id, "error": str(e)})
+
+    tasks = set()
+    try:
+        # Request dalam satu koneksi boleh dipipeline; jawaban membawa id masing-masing
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+            except ValueError:
+                await respond({"error": "request bukan JSON"})
+                continue
+            task = asyncio.create_task(handle(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(address: str, index_path: str, max_batch: int, max_wait: float, workers: int) -> None:
+    from retriever import FaissRetriever
+
+    start = time.perf_counter()
+    # server=False: proses ini yang memuat index, bukan client ke server lain
+    retriever = FaissRetriever(index_path=index_path, server=False)
+    batcher = MicroBatcher(retriever, max_batch=max_batch, max_wait=max_wait, workers=workers)
+    asyncio.get_running_loop().create_task(batcher.run())
+
+    family, target = parse_address(address)
+    handler = lambda reader, writer: _handle_connection(batcher, reader, writer)
+    if family == socket.AF_UNIX:
+        if os.path.exists(target):
+            os.unlink(target)
+        server = await asyncio.start_unix_server(handler, path=target)
+    else:
+        server = await asyncio.start_server(handler, host=target[0], port=target[1])
+    print(f"✅ Retrieval server siap di {address} (index dimuat {time.perf_counter() - start:.2f}s, "
+          f"max_batch={max_batch}, max_wait={max_wait * 1000:.1f}ms)")
+    async with server:
+        await server.serve_forever()
+
+
+class RetrievalClient:
+    """Client sinkron (dipakai dari thread Streamlit); satu koneksi per thread"""
+
+    def __init__(self, address: str, timeout: float = CLIENT_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self._family, self._target = parse_address(address)
+        self._local = threading.local()
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(self._family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self._target)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn[1].close()
+            conn[0].close()
+
+    def request(self, message: dict) -> dict:
+        with self._counter_lock:
+            self._counter += 1
+            message = {**message, "id": self._counter}
+        payload = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        # Koneksi putus (mis. server restart): coba sekali lagi dengan koneksi baru
+        for attempt in range(2):
+            try:
+                sock, stream = self._connection()
+                sock.sendall(payload)
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("koneksi ditutup server")
+                response = json.loads(line)
+                if response.get("error"):
+                    raise RuntimeError(response["error"])
+                return response
+            except (OSError, ConnectionError):
+                self._close()
+                if attempt:
+                    raise
+
+    def ping(self) -> dict:
+        return self.request({"op": "ping"})
+
+    def search(self, query: str, k: int = 3, mode: Optional[str] = None) -> List:
+        from langchain_core.documents import Document
+
+        response = self.request({"query": query, "k": k, "mode": mode})
+        return [Document(**document) for document in response["documents"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server retrieval FAQ dengan micro-batching")
+    parser.add_argument("--index", default="data/faiss_index")
+    parser.add_argument("--socket", help="Path Unix socket (default: TCP --host/--port)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Maksimum query per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="Waktu tunggu maksimum mengumpulkan batch")
+    parser.add_argument("--workers", type=int, default=2, help="Batch yang boleh diproses bersamaan")
+    args = parser.parse_args()
+
+    address = f"unix:{args.socket}" if args.socket else f"tcp:{args.host}:{args.port}"
+    try:
+        asyncio.run(serve(address, args.index, args.max_batch, args.max_wait_ms / 1000, args.workers))
+    except KeyboardInterrupt:
+        print("👋 Retrieval server berhenti")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,329 @@
 # ✅ retriever.py (FINAL AMAN – fix error client/async_client)
 
 import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
-import cohere
-from langchain_cohere import CohereEmbeddings
-from langchain_community.vectorstores import FAISS
+from langchain_core.retrievers import BaseRetriever
+from embedding_cache import get_embeddings
+from ann_index import apply_search_params, read_index_meta, read_index_spec
+from bm25_index import BM25_DIR, BM25Index, has_bm25
+from index_bundle import BUNDLE_DIR, IndexBundle, has_bundle
+from telemetry import span
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+RRF_K = 60
+INDEX_LOAD_ATTEMPTS = 3
 
 class FaissRetriever:
-    def __init__(self, index_path: str):
+    """Retriever FAQ; index_format "bundle" (mmap, tanpa pickle), "faiss", atau "auto".
+
+    search_mode: "vector", "lexical" (BM25) atau "hybrid" (gabungan keduanya
+    dengan reciprocal-rank fusion). Default hybrid bila index BM25 tersedia.
+
+    Index bilingual (create_index.py --bilingual) berisi chunk asli dan
+    terjemahannya; hit digabung per chunk sumber dan yang dikembalikan selalu
+    dokumen sumber.
+
+    server: alamat retrieval_server.py (default env RETRIEVAL_SERVER). Jika
+    diisi dan server bisa dihubungi, index tidak dimuat di proses ini dan
+    semua pencarian diteruskan ke server; jika server gagal di tengah jalan,
+    index lokal dimuat saat itu dan dipakai sebagai cadangan. server=False
+    memaksa mode lokal.
+    """
+
+    def __init__(
+        self,
+        index_path: str,
+        embeddings=None,
+        index_format: str = None,
+        search_params: dict = None,
+        search_mode: str = None,
+        server=None
+    ):
         load_dotenv()
 
-        cohere_api_key = os.getenv("COHERE_API_KEY")
-        if not cohere_api_key:
-            raise ValueError("❌ COHERE_API_KEY tidak ditemukan di .env")
+        self.client = None
+        server = os.getenv("RETRIEVAL_SERVER") if server is None else server
+        if server:
+            from retrieval_server import RetrievalClient
 
-        if not os.path.exists(index_path):
-            raise FileNotFoundError(f"❌ Index FAISS tidak ditemukan di: {index_path}")
+            try:
+                client = RetrievalClient(server)
+                client.ping()
+                self.client = client
+                self.embeddings = embeddings
+                self.index_format = "server"
+                self.search_mode = search_mode
+                self.vectorstore = self.bundle = self.ann_index = self.lexical = None
+                self.bilingual = False
+                # Cadangan lokal baru dimuat saat server gagal (lihat _local_fallback)
+                self._fallback_args = (index_path, embeddings, index_format, search_params, search_mode)
+                self._fallback = None
+                self._fallback_lock = threading.Lock()
+                return
+            except Exception as e:
+                print(f"⚠️ Retrieval server {server} tidak bisa dihubungi ({str(e)}), index dimuat lokal")
 
         # Set user agent via environment
         os.environ["LANGCHAIN_USER_AGENT"] = "mental-health-chatbot"
 
-        # ✅ Gunakan client eksplisit (hindari error client/async_client)
-        cohere_client = cohere.Client(api_key=cohere_api_key)
-        self.embeddings = CohereEmbeddings(
-            client=cohere_client,
-            model="embed-multilingual-v3.0"
-        )
+        # ✅ Embeddings Cohere + cache disk bersama (query berulang tidak di-embed ulang)
+        self.embeddings = embeddings or get_embeddings(model="embed-multilingual-v3.0")
+
+        index_format = (index_format or os.getenv("FAISS_INDEX_FORMAT", "auto")).lower()
+        if index_format not in ("auto", "bundle", "faiss"):
+            raise ValueError(f"index_format tidak dikenal: {index_format}")
+        self._load_with_retry(index_path, index_format, search_params)
+
+        self.search_mode = (search_mode or os.getenv("RETRIEVAL_MODE") or ("hybrid" if self.lexical else "vector")).lower()
+        if self.search_mode not in SEARCH_MODES:
+            raise ValueError(f"search_mode tidak dikenal: {self.search_mode} (pilih: {', '.join(SEARCH_MODES)})")
+
+    def _load_with_retry(self, index_path: str, index_format: str, search_params: Dict = None) -> None:
+        """Muat index yang sedang dipublikasikan create_index.py secara konsisten.
+
+        Publish memakai dua rename folder, jadi index_path bisa sesaat tidak
+        ada; jika build_id berubah selagi file dibaca, file berasal dari build
+        berbeda dan index dimuat ulang. Gagal setelah INDEX_LOAD_ATTEMPTS.
+        """
+        error = None
+        for attempt in range(INDEX_LOAD_ATTEMPTS):
+            if attempt:
+                time.sleep(0.1)
+            if not os.path.exists(index_path):
+                error = FileNotFoundError(f"❌ Index FAISS tidak ditemukan di: {index_path}")
+                continue
+            try:
+                build_id = read_index_meta(index_path).get("build_id")
+                self._load_index(index_path, index_format, search_params)
+            except Exception as e:
+                error = RuntimeError(f"Gagal memuat FAISS index: {str(e)}")
+                continue
+            if read_index_meta(index_path).get("build_id") == build_id:
+                return
+            error = RuntimeError("Gagal memuat FAISS index: build baru dipublikasikan setiap kali index dimuat")
+        raise error
+
+    def _load_index(self, index_path: str, index_format: str, search_params: Dict = None) -> None:
+        if index_format == "auto":
+            index_format = "bundle" if has_bundle(index_path) else "faiss"
+        self.index_format = index_format
+        self.vectorstore = None
+        self.bundle = None
+        self.ann_index = None
+        self.lexical = None
+        # Tipe index + parameter search (nprobe/efSearch) dari index_meta.json
+        self.index_spec = read_index_spec(index_path)
+        self.index_spec["params"].update(search_params or {})
+        self.bilingual = bool(read_index_meta(index_path).get("bilingual"))
+
+        if index_format == "bundle":
+            # Vektor & dokumen di-mmap read-only: page dibagi antar proses
+            self.bundle = IndexBundle(os.path.join(index_path, BUNDLE_DIR))
+            if self.index_spec["type"] != "flat":
+                import faiss
+
+                self.ann_index = faiss.read_index(
+                    os.path.join(index_path, "index.faiss"),
+                    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+                apply_search_params(self.ann_index, self.index_spec)
+        elif index_format == "faiss":
+            from langchain_community.vectorstores import FAISS
 
-        try:
             self.vectorstore = FAISS.load_local(
                 index_path,
                 self.embeddings,
                 allow_dangerous_deserialization=True
             )
-        except Exception as e:
-            raise RuntimeError(f"Gagal memuat FAISS index: {str(e)}")
+            apply_search_params(self.vectorstore.index, self.index_spec)
+        else:
+            raise ValueError(f"index_format tidak dikenal: {index_format}")
+
+        if has_bm25(index_path):
+            self.lexical = BM25Index(os.path.join(index_path, BM25_DIR))
+
+    def search(self, query: str, k: int = 3, mode: str = None):
+        return self.search_batch([query], k=k, mode=mode)[0]
+
+    def search_batch(self, queries: List[str], k: int = 3, mode: str = None) -> List[List]:
+        """Cari banyak query sekaligus: satu request embedding + satu pencarian FAISS batch"""
+        if self.client is not None:
+            results = self._search_remote(queries, k, mode)
+            if results is not None:
+                return results
+            local = self._local_fallback()
+            return local.search_batch(queries, k=k, mode=mode) if local else [[] for _ in queries]
+        return [
+            [self._get_document(p) for p in positions]
+            for positions in self._search_positions(queries, k, mode)
+        ]
+
+    def search_with_vectors(self, query: str, k: int = 3, mode: str = None):
+        """(dokumen, vektor dokumen, vektor query) untuk tahap konteks RAG (MMR).
+
+        Vektor diambil dari index yang sudah ada (tanpa embed ulang dokumen);
+        None jika tidak tersedia (mode server / index tanpa rekonstruksi).
+        """
+        if self.client is not None:
+            results = self._search_remote([query], k, mode)
+            if results is not None:
+                return results[0], None, None
+            local = self._local_fallback()
+            return local.search_with_vectors(query, k=k, mode=mode) if local else ([], None, None)
+        positions = self._search_positions([query], k, mode)[0]
+        documents = [self._get_document(p) for p in positions]
+        vectors = self._get_vectors(positions) if positions else None
+        query_vector = self.embeddings.embed_query(query) if vectors is not None else None
+        return documents, vectors, query_vector
 
-    def search(self, query: str, k: int = 3):
+    def term_weight(self, term: str) -> Optional[float]:
+        """IDF term dari index BM25 (None jika tidak ada index leksikal)"""
+        if self.client is not None:
+            # Mode server: IDF hanya tersedia jika cadangan lokal sudah dimuat
+            return self._fallback.term_weight(term) if self._fallback is not None else None
+        return self.lexical.idf(term) if self.lexical is not None else None
+
+    def _search_remote(self, queries: List[str], k: int, mode: str = None) -> Optional[List[List]]:
+        """Hasil dari retrieval server, atau None jika server gagal (pakai cadangan lokal)"""
+        with span("retriever.search", k=k, batch=len(queries), remote=True) as current:
+            try:
+                return [self.client.search(query, k=k, mode=mode or self.search_mode) for query in queries]
+            except Exception as e:
+                current.set(error=type(e).__name__)
+                print(f"⚠️ Retrieval server gagal ({str(e)}), memakai index lokal")
+                return None
+
+    def _local_fallback(self) -> Optional["FaissRetriever"]:
+        """Retriever lokal (dimuat sekali, saat server pertama kali gagal); None jika gagal dimuat"""
+        with self._fallback_lock:
+            if self._fallback is None:
+                index_path, embeddings, index_format, search_params, search_mode = self._fallback_args
+                try:
+                    self._fallback = FaissRetriever(
+                        index_path, embeddings=embeddings, index_format=index_format,
+                        search_params=search_params, search_mode=search_mode, server=False
+                    )
+                except Exception as e:
+                    print(f"❌ Index lokal cadangan gagal dimuat: {str(e)}")
+            return self._fallback
+
+    def _search_positions(self, queries: List[str], k: int, mode: str = None) -> List[List[int]]:
+        with span("retriever.search", k=k, batch=len(queries)) as current:
+            results = [[] for _ in queries]
+            try:
+                valid = [i for i, query in enumerate(queries) if query]
+                if len(valid) < len(queries):
+                    print("❌ Error saat mencari: Query tidak boleh kosong")
+                if not valid:
+                    return results
+                texts = [queries[i] for i in valid]
+                mode = (mode or self.search_mode).lower()
+                if mode != "vector" and self.lexical is None:
+                    mode = "vector"
+                current.set(mode=mode)
+                # Bilingual: tiap sumber paling banyak punya 2 versi, jadi 2k hit cukup untuk k sumber
+                fetch_k = k * 2 if self.bilingual else k
+
+                if mode == "vector":
+                    rankings = self._search_vector_batch(self._embed_queries(texts), fetch_k)
+                    positions = [[p for p, _ in ranking] for ranking in rankings]
+                elif mode == "lexical":
+                    positions = [[p for p, _ in self._search_lexical(text, fetch_k)] for text in texts]
+                elif mode == "hybrid":
+                    positions = self._search_hybrid_batch(texts, fetch_k)
+                else:
+                    raise ValueError(f"Mode pencarian tidak dikenal: {mode}")
+                if self.bilingual:
+                    positions = [self._dedupe_sources(hits, k) for hits in positions]
+                for i, hits in zip(valid, positions):
+                    results[i] = hits
+                return results
+            except Exception as e:
+                current.set(error=type(e).__name__)
+                print(f"❌ Error saat mencari: {str(e)}")
+                return [[] for _ in queries]
+
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed batch query; embeddings non-CachedEmbeddings di-embed satu per satu"""
+        if hasattr(self.embeddings, "embed_queries"):
+            return self.embeddings.embed_queries(texts)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def _dedupe_sources(self, positions: List[int], k: int) -> List[int]:
+        """Posisi dokumen sumber, urut peringkat terbaik, tiap sumber sekali"""
+        sources = []
+        for position in positions:
+            source = self._get_document(position).metadata.get("source_position", position)
+            if source not in sources:
+                sources.append(source)
+                if len(sources) == k:
+                    break
+        return sources
+
+    def _get_vectors(self, positions: List[int]):
+        import numpy as np
+
+        if self.bundle is not None:
+            return np.asarray(self.bundle.vectors[positions], dtype="float32")
         try:
-            if not query:
-                raise ValueError("Query tidak boleh kosong")
-            return self.vectorstore.similarity_search(query, k=k)
-        except Exception as e:
-            print(f"❌ Error saat mencari: {str(e)}")
-            return []
+            return np.stack([self.vectorstore.index.reconstruct(int(p)) for p in positions])
+        except Exception:
+            return None  # mis. index IVF tanpa direct map
+
+    def _search_hybrid_batch(self, queries: List[str], k: int):
+        """Reciprocal-rank fusion: skor = sum 1 / (RRF_K + rank) dari tiap daftar hasil"""
+        depth = max(k * 4, 20)
+        vector_rankings = self._search_vector_batch(self._embed_queries(queries), depth)
+        fused_positions = []
+        for query, vector_ranking in zip(queries, vector_rankings):
+            fused = {}
+            for ranking in (vector_ranking, self._search_lexical(query, depth)):
+                for rank, (position, _) in enumerate(ranking):
+                    fused[position] = fused.get(position, 0.0) + 1.0 / (RRF_K + rank + 1)
+            fused_positions.append(sorted(fused, key=fused.get, reverse=True)[:k])
+        return fused_positions
+
+    def _search_vector(self, vector, k: int):
+        """(posisi, jarak) dari index ANN/FAISS bila ada, selain itu exact search di bundle"""
+        return self._search_vector_batch([vector], k)[0]
+
+    def _search_vector_batch(self, vectors, k: int):
+        with span("retriever.vector_search", k=k, batch=len(vectors)):
+            import numpy as np
+
+            queries = np.asarray(vectors, dtype="float32")
+            index = self.ann_index if self.bundle is not None else self.vectorstore.index
+            if index is None:
+                return self.bundle.search_batch(queries, k=k)
+            distances, positions = index.search(queries, k)
+            return [
+                [(int(p), float(d)) for p, d in zip(row_positions, row_distances) if p >= 0]
+                for row_positions, row_distances in zip(positions, distances)
+            ]
+
+    def _search_lexical(self, query: str, k: int):
+        with span("retriever.lexical_search", k=k):
+            return self.lexical.search(query, k=k)
+
+    def _get_document(self, position: int):
+        if self.bundle is not None:
+            return self.bundle.get_document(position)
+        return self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[position])
+
+    def as_retriever(self, k: int = 3) -> BaseRetriever:
+        """Adapter LangChain (dipakai chain RetrievalQA di rag.py)"""
+        return _LangChainRetriever(faiss_retriever=self, k=k)
+
+
+class _LangChainRetriever(BaseRetriever):
+    faiss_retriever: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List:
+        return self.faiss_retriever.search(query, k=self.k)
 
 # Contoh penggunaan
 if __name__ == '__main__':
@@ -0,0 +1,296 @@
+# session_store.py
+# Penyimpanan riwayat chat append-only di SQLite (WAL). Pesan baru masuk ke
+# antrean dan ditulis per batch oleh thread flusher di background, jadi thread
+# UI tidak pernah menunggu disk. Index per user/session + waktu untuk daftar
+# session, dan index (session, seq) untuk mengambil N pesan terakhir tanpa
+# membaca seluruh riwayat. compact() membuang session lama / pesan berlebih
+# lalu mengecilkan file database.
+#
+# Retensi: session yang tidak aktif lebih dari SESSION_RETENTION_DAYS hari
+# (default 30, 0 = simpan selamanya) dihapus setiap store dibuka lewat
+# get_session_store(). Aplikasi hanya menyimpan riwayat jika user memilihnya
+# (lihat SAVE_CHAT_HISTORY di main.py).
+#
+#   python session_store.py --max-age-days 90 --keep-last 500
+
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import argparse
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+DEFAULT_STORE_PATH = os.getenv("SESSION_STORE_PATH", "data/sessions.sqlite")
+SESSION_RETENTION_DAYS = float(os.getenv("SESSION_RETENTION_DAYS", "30"))
+FLUSH_INTERVAL = 0.5   # detik
+FLUSH_BATCH = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user TEXT,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_updated ON sessions(user, updated_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+    # auto_vacuum hanya berlaku untuk database baru (sebelum tabel dibuat)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SessionStore:
+    """Riwayat chat per session; append() tidak pernah memblokir pemanggil"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, flush_interval: float = FLUSH_INTERVAL, batch_size: int = FLUSH_BATCH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._writer = _connect(path)
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+        self._reader = _connect(path)
+        self._read_lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._next_seq: Dict[str, int] = {}
+        self._seq_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, name="session-store-flusher", daemon=True)
+        self._thread.start()
+
+    # ---- tulis (lewat antrean) ----
+
+    def append(self, session_id: str, role: str, content: str, user: Optional[str] = None, created_at: Optional[float] = None) -> int:
+        """Masukkan pesan ke antrean; return seq pesan di session (dipakai load_last before_seq)"""
+        seq = self._take_seq(session_id)
+        self._queue.put(("message", session_id, seq, user, role, content, created_at or time.time()))
+        return seq
+
+    def sync(self, session_id: str, messages: List[Dict[str, str]], user: Optional[str] = None) -> int:
+        """Append pesan yang belum pernah disimpan dari list riwayat session.
+
+        Cocok dipanggil tiap giliran dengan st.session_state.messages; pesan
+        yang sudah disimpan ditandai key "seq", jadi hanya pesan baru yang
+        masuk antrean walau pesan lama sudah dikeluarkan dari list. Return
+        jumlah pesan yang di-append.
+        """
+        appended = 0
+        for message in messages:
+            if "seq" not in message:
+                message["seq"] = self.append(session_id, message["role"], message["content"], user=user)
+                appended += 1
+        return appended
+
+    def _take_seq(self, session_id: str) -> int:
+        with self._seq_lock:
+            if session_id not in self._next_seq:
+                # Session lama (proses sebelumnya): lanjutkan dari seq terakhir di database
+                with self._read_lock:
+                    row = self._reader.execute(
+                        "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?", (session_id,)
+                    ).fetchone()
+                self._next_seq[session_id] = row[0]
+            seq = self._next_seq[session_id]
+            self._next_seq[session_id] = seq + 1
+            return seq
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Tunggu sampai semua pesan di antrean tertulis"""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(("stop",))
+        self._thread.join()
+        self._writer.close()
+        with self._read_lock:
+            self._reader.close()
+
+    def _flush_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch, events, stop = [], [], False
+            # Kumpulkan pesan yang datang dalam flush_interval jadi satu transaksi
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item[0] == "message":
+                    batch.append(item[1:])
+                elif item[0] == "flush":
+                    events.append(item[1])
+                else:
+                    stop = True
+                if events or stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Gagal menyimpan riwayat chat: {str(e)}")
+            for event in events:
+                event.set()
+            if stop:
+                return
+
+    def _write(self, batch) -> None:
+        rows = []
+        sessions = {}
+        for session_id, seq, user, role, content, created_at in batch:
+            rows.append((session_id, seq, role, content, created_at))
+
+            first, _, count, known_user = sessions.get(session_id, (created_at, created_at, 0, user))
+            sessions[session_id] = (first, created_at, count + 1, known_user or user)
+
+        with self._writer:
+            self._writer.executemany(
+                "INSERT OR REPLACE INTO messages (session_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._writer.executemany(
+                "INSERT INTO sessions (session_id, user, started_at, updated_at, message_count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at, "
+                "message_count = message_count + excluded.message_count, user = COALESCE(user, excluded.user)",
+                [(sid, user, first, last, count) for sid, (first, last, count, user) in sessions.items()]
+            )
+
+    # ---- baca ----
+
+    def load_last(self, session_id: str, n: int = 50, before_seq: Optional[int] = None) -> List[Dict]:
+        """N pesan terakhir session (urut kronologis); before_seq untuk halaman sebelumnya"""
+        query = "SELECT seq, role, content, created_at FROM messages WHERE session_id = ?"
+        params = [session_id]
+        if before_seq is not None:
+            query += " AND seq < ?"
+            params.append(before_seq)
+        query += " ORDER BY seq DESC LIMIT ?"
+        params.append(n)
+        with self._read_lock:
+            rows = self._reader.execute(query, params).fetchall()
+        return [
+            {"seq": seq, "role": role, "content": content, "created_at": created_at}
+            for seq, role, content, created_at in reversed(rows)
+        ]
+
+    def list_sessions(self, user: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None, limit: int = 50) -> List[Dict]:
+        """Session terbaru dulu, opsional difilter user dan rentang waktu (updated_at)"""
+        clauses, params = [], []
+        if user is not None:
+            clauses.append("user = ?")
+            params.append(user)
+        if since is not None:
+            clauses.append("updated_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("updated_at < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT session_id, user, started_at, updated_at, message_count FROM sessions"
+                f"{where} ORDER BY updated_at DESC LIMIT ?", params
+            ).fetchall()
+        keys = ("session_id", "user", "started_at", "updated_at", "message_count")
+        return [dict(zip(keys, row)) for row in rows]
+
+    # ---- pemeliharaan ----
+
+    def compact(self, max_age_days: Optional[float] = None, keep_last: Optional[int] = None) -> Dict[str, int]:
+        """Hapus session yang tidak aktif > max_age_days dan pesan di luar keep_last terakhir per session"""
+        self.flush()
+        conn = _connect(self.path)
+        stats = {"sessions_removed": 0, "messages_removed": 0}
+        try:
+            with conn:
+                if max_age_days is not None:
+                    cutoff = time.time() - max_age_days * 86400
+                    old = [row[0] for row in conn.execute("SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,))]
+                    for session_id in old:
+                        stats["messages_removed"] += conn.execute(
+                            "DELETE FROM messages WHERE session_id = ?", (session_id,)
+                        ).rowcount
+                        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                    stats["sessions_removed"] = len(old)
+                if keep_last is not None:
+                    for session_id, count in conn.execute(
+                        "SELECT session_id, message_count FROM sessions WHERE message_count > ?", (keep_last,)
+                    ).fetchall():
+                        # seq terus naik, jadi pesan lama dibuang berdasarkan batas seq
+                        removed = conn.execute(
+                            "DELETE FROM messages WHERE session_id = ? AND seq < ("
+                            " SELECT MIN(seq) FROM (SELECT seq FROM messages WHERE session_id = ?"
+                            " ORDER BY seq DESC LIMIT ?))",
+                            (session_id, session_id, keep_last)
+                        ).rowcount
+                        conn.execute(
+                            "UPDATE sessions SET message_count = message_count - ? WHERE session_id = ?",
+                            (removed, session_id)
+                        )
+                        stats["messages_removed"] += removed
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        return stats
+
+
+@lru_cache(maxsize=None)
+def get_session_store(path: str = DEFAULT_STORE_PATH) -> SessionStore:
+    """Satu store (dan satu thread flusher) per proses; session lewat masa retensi dihapus"""
+    store = SessionStore(path)
+    if SESSION_RETENTION_DAYS > 0:
+        try:
+            store.compact(max_age_days=SESSION_RETENTION_DAYS)
+        except sqlite3.Error as e:
+            print(f"⚠️ Gagal menghapus riwayat chat lama: {str(e)}")
+    atexit.register(store.close)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pemeliharaan riwayat chat")
+    parser.add_argument("--path", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--max-age-days", type=float, default=SESSION_RETENTION_DAYS or None, help="Hapus session yang tidak aktif lebih lama dari ini (default: SESSION_RETENTION_DAYS)")
+    parser.add_argument("--keep-last", type=int, help="Simpan hanya N pesan terakhir per session")
+    args = parser.parse_args()
+
+    store = SessionStore(args.path)
+    try:
+        stats = store.compact(max_age_days=args.max_age_days, keep_last=args.keep_last)
+    finally:
+        store.close()
+    print(f"✅ Compaction selesai: {stats['sessions_removed']} session, {stats['messages_removed']} pesan dihapus")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# telemetry.py
+# Instrumentasi ringan: span (durasi per tahap) dan histogram di memori proses.
+# Setiap span juga ditulis ke sink JSON-lines (di-buffer, ditulis per batch)
+# dan snapshot histogram diekspor dalam format teks Prometheus, jadi cukup
+# murah untuk tetap aktif di production. Laporan p50/p95/p99 per tahap:
+#
+#   python telemetry.py report                      # dari data/metrics/spans.jsonl
+#   python telemetry.py report --path lain.jsonl --since-hours 24
+#
+# TELEMETRY=off mematikan semuanya; TELEMETRY_SAMPLE_RATE (0..1) membatasi
+# jumlah span yang ditulis ke JSON-lines (histogram tetap menghitung semua).
+#
+# Setiap proses menulis snapshot Prometheus ke filenya sendiri
+# (metrics.<role>-<pid>.prom) dengan label role="<role>-<pid>", jadi beberapa
+# proses dari script yang sama (mis. dua replika Streamlit) tidak saling
+# menimpa dan textfile collector node_exporter bisa membaca semua file di
+# data/metrics/. File proses yang sudah mati perlu dibersihkan sendiri (mis.
+# cron). Penulisan ke disk dilakukan thread background, bukan di thread request.
+
+import os
+import sys
+import json
+import time
+import atexit
+import random
+import argparse
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional
+
+ENABLED = os.getenv("TELEMETRY", "on").lower() not in ("off", "0", "false")
+SPANS_PATH = os.getenv("TELEMETRY_PATH", "data/metrics/spans.jsonl")
+PROMETHEUS_PATH = os.getenv("TELEMETRY_PROMETHEUS_PATH", "data/metrics/metrics.prom")
+SAMPLE_RATE = float(os.getenv("TELEMETRY_SAMPLE_RATE", "1.0"))
+FLUSH_EVERY = 200        # jumlah record di buffer sebelum ditulis
+FLUSH_INTERVAL = 5.0     # detik
+# Nama proses di file & label Prometheus: TELEMETRY_ROLE atau nama script
+ROLE = os.getenv("TELEMETRY_ROLE") or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+# Batas bucket histogram (detik): 0.5 ms .. ~2 menit, kelipatan ~2
+BUCKETS = tuple(round(0.0005 * 2 ** i, 6) for i in range(19))
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Histogram:
+    """Histogram bucket tetap (kumulatif saat diekspor ke Prometheus)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Perkiraan kuantil (batas atas bucket) dari histogram di memori"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Telemetry:
+    def __init__(self, spans_path: str = SPANS_PATH, prometheus_path: str = PROMETHEUS_PATH, sample_rate: float = SAMPLE_RATE):
+        self.spans_path = spans_path
+        self.prometheus_path = prometheus_path
+        self.sample_rate = sample_rate
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._flusher_pid = None
+
+    def observe(self, name: str, value: float, record: Optional[dict] = None) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+            if record is not None and (self.sample_rate >= 1.0 or random.random() < self.sample_rate):
+                self._buffer.append(record)
+            due = len(self._buffer) >= FLUSH_EVERY
+        self._ensure_flusher()
+        if due:
+            self._flush_requested.set()
+
+    def _ensure_flusher(self) -> None:
+        # Thread tidak ikut ter-fork, jadi dicek per pid (proses anak membuat flusher sendiri)
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="telemetry-flusher", daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._flush_requested.wait(FLUSH_INTERVAL)
+            self._flush_requested.clear()
+            self.flush()
+
+    def prometheus_file(self) -> str:
+        """File Prometheus milik proses ini (tidak dipakai bersama proses lain)"""
+        root, ext = os.path.splitext(self.prometheus_path)
+        return f"{root}.{process_name()}{ext}"
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + value
+
+    def flush(self) -> None:
+        """Tulis buffer span ke JSON-lines dan snapshot histogram ke file Prometheus"""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        with self._write_lock:
+            try:
+                if records and self.spans_path:
+                    _ensure_dir(self.spans_path)
+                    with open(self.spans_path, "a", encoding="utf-8") as f:
+                        f.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+                # Proses tanpa data (mis. worker ekstraksi PDF) tidak membuat file
+                if self.prometheus_path and (self.histograms or self.counters):
+                    path = self.prometheus_file()
+                    _ensure_dir(path)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write(self.render_prometheus())
+                    os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ Gagal menulis telemetry: {str(e)}")
+
+    def render_prometheus(self) -> str:
+        lines = []
+        role = f'role="{process_name()}"'
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                metric = _metric_name(name) + "_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{role},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{role},le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum{{{role}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{role}}} {histogram.count}")
+            for name, value in sorted(self.counters.items()):
+                metric = _metric_name(name) + "_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{{{role}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def process_name() -> str:
+    """ROLE + pid: unik per proses, juga antar replika dari script yang sama"""
+    return f"{ROLE}-{os.getpid()}"
+
+
+def _ensure_dir(path: str) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+def _metric_name(name: str) -> str:
+    return "ruangteduh_" + "".join(char if char.isalnum() else "_" for char in name)
+
+
+_telemetry = Telemetry()
+atexit.register(_telemetry.flush)
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+class Span:
+    __slots__ = ("name", "attrs", "parent", "start")
+
+    def __init__(self, name: str, attrs: dict, parent):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.start = 0.0
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Ukur durasi blok kode sebagai tahap `name`; atribut tambahan lewat span.set()"""
+    if not ENABLED:
+        yield Span(name, attrs, None)
+        return
+    current = Span(name, attrs, _current_span.get())
+    token = _current_span.set(current)
+    current.start = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - current.start
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            pass  # generator ditutup dari context lain (mis. di-garbage-collect)
+        record = {"ts": time.time(), "span": name, "seconds": round(duration, 6), "pid": os.getpid()}
+        if current.parent is not None:
+            record["parent"] = current.parent.name
+        if error:
+            record["error"] = error
+        if current.attrs:
+            record.update(current.attrs)
+        _telemetry.observe(name, duration, record)
+
+
+def traced(name: str):
+    """Decorator: seluruh pemanggilan fungsi diukur sebagai satu span"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe(name: str, value: float, log: bool = True, **attrs) -> None:
+    """Catat durasi (detik) langsung ke histogram `name` tanpa span.
+
+    log=False hanya mengisi histogram (untuk event sangat sering seperti per token).
+    """
+    if ENABLED:
+        record = {"ts": time.time(), "span": name, "seconds": round(value, 6), "pid": os.getpid(), **attrs} if log else None
+        _telemetry.observe(name, value, record)
+
+
+def inc(name: str, value: float = 1.0) -> None:
+    if ENABLED:
+        _telemetry.inc(name, value)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def report(path: str = SPANS_PATH, since: Optional[float] = None) -> Dict[str, dict]:
+    """Statistik per tahap (p50/p95/p99 dalam milidetik) dari file JSON-lines"""
+    samples: Dict[str, List[float]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # baris terpotong (proses mati saat menulis)
+            if since is not None and record.get("ts", 0) < since:
+                continue
+            samples.setdefault(record["span"], []).append(record["seconds"] * 1000)
+
+    stats = {}
+    for name, values in samples.items():
+        values.sort()
+        stats[name] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.50),
+            "p95_ms": percentile(values, 0.95),
+            "p99_ms": percentile(values, 0.99),
+            "max_ms": values[-1],
+        }
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan telemetry RuangTeduh")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="p50/p95/p99 per tahap")
+    report_parser.add_argument("--path", default=SPANS_PATH)
+    report_parser.add_argument("--since-hours", type=float, help="Hanya data beberapa jam terakhir")
+    report_parser.add_argument("--json", action="store_true", help="Cetak sebagai JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ File telemetry tidak ditemukan: {args.path}")
+        sys.exit(1)
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    stats = report(args.path, since)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+
+    print(f"{'tahap':<32}{'count':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+    for name in sorted(stats):
+        row = stats[name]
+        print(f"{name:<32}{row['count']:>8}{row['p50_ms']:>11.2f}{row['p95_ms']:>11.2f}{row['p99_ms']:>11.2f}{row['max_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# conftest.py
+# Semua test jalan offline: embeddings/LLM/terjemahan memakai backend fake dan
+# setiap file data (cache, index, sesi, metrics) ditulis ke folder sementara.
+import os
+import csv
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="ruangteduh-tests-")
+
+# Modul membaca env saat di-import, jadi harus di-set sebelum import apa pun
+os.environ.update(
+    EMBEDDINGS_BACKEND="fake",
+    LLM_BACKEND="fake",
+    TRANSLATION_BACKEND="fake",
+    TELEMETRY="off",
+    RETRIEVAL_SERVER="",
+)
+os.makedirs(os.path.join(WORKDIR, "data"))
+shutil.copy(os.path.join(ROOT, "data", "Mental_Health_FAQ.csv"), os.path.join(WORKDIR, "data"))
+shutil.copy(os.path.join(ROOT, "style.css"), WORKDIR)
+os.chdir(WORKDIR)
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def faiss_index():
+    """Index FAQ (flat, monolingual) yang dibangun sekali dengan embeddings fake"""
+    from create_index import create_faiss_index
+
+    create_faiss_index(incremental=False, bilingual=False)
+    return os.path.join(WORKDIR, "data", "faiss_index")
+
+
+SMALL_FAQ = [
+    ("1", "What is depression?", "Depression is a mood disorder that causes persistent sadness."),
+    ("2", "What is anxiety?", "Anxiety is a feeling of worry, nervousness or unease."),
+    ("3", "How can I sleep better?", "Keep a regular schedule and avoid screens before bed."),
+]
+
+
+def write_faq_csv(rows):
+    with open(os.path.join("data", "Mental_Health_FAQ.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Question_ID", "Questions", "Answers"])
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def small_faq(tmp_path, monkeypatch):
+    """Folder kerja baru berisi data/Mental_Health_FAQ.csv kecil (SMALL_FAQ)"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    write_faq_csv(SMALL_FAQ)
+    return tmp_path
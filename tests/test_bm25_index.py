@@ -0,0 +1,28 @@
+from bm25_index import BM25Index, build_bm25, has_bm25, tokenize
+
+TEXTS = [
+    "Depression affects mood and sleep.",
+    "Anxiety causes worry. Anxiety can be treated.",
+    "The DSM-5 lists diagnostic criteria.",
+]
+
+
+def test_tokenize_keeps_compound_terms():
+    assert tokenize("DSM-5 criteria") == ["dsm-5", "dsm", "5", "criteria"]
+
+
+def test_search_ranks_by_bm25(tmp_path):
+    build_bm25(TEXTS, str(tmp_path / "bm25"))
+    assert has_bm25(str(tmp_path))
+    index = BM25Index(str(tmp_path / "bm25"))
+
+    assert [position for position, _ in index.search("anxiety treatment", k=3)] == [1]
+    assert index.search("dsm-5", k=1)[0][0] == 2
+    assert index.search("tidak ada", k=3) == []
+
+
+def test_idf_prefers_rare_terms(tmp_path):
+    build_bm25(TEXTS + ["Anxiety and depression often appear together."], str(tmp_path))
+    index = BM25Index(str(tmp_path))
+    assert index.idf("criteria") > index.idf("anxiety") > 0
+    assert index.idf("unknown") == 0.0
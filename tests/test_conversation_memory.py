@@ -0,0 +1,72 @@
+from conversation_memory import ConversationMemory, count_tokens, truncate_tokens
+
+
+def make_messages(count, words=20):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"pesan {i} " + "kata " * words}
+        for i in range(count)
+    ]
+
+
+def test_truncate_tokens():
+    text = "kata " * 100
+    assert count_tokens(truncate_tokens(text, 10)) <= 10
+    assert truncate_tokens("pendek", 10) == "pendek"
+
+
+def test_recent_fits_budget_and_keeps_newest():
+    memory = ConversationMemory(history_tokens=100, summary_tokens=50)
+    messages = make_messages(10)
+    window = memory.recent(messages)
+    assert window and window[-1] is messages[-1]
+    assert sum(count_tokens(m["content"]) + 4 for m in window) <= 100
+
+
+def test_compact_folds_old_messages_into_summary():
+    memory = ConversationMemory(history_tokens=100, summary_tokens=50)
+    messages = make_messages(10)
+    prompts = []
+
+    assert memory.compact(messages, summarize=lambda prompt: prompts.append(prompt) or "ringkasan singkat")
+    assert memory.summary == "ringkasan singkat"
+    assert 0 < memory.summarized < len(messages)
+    assert "pesan 0" in prompts[0]
+
+    prompt = memory.to_langchain(messages, "halo lagi")
+    assert "ringkasan singkat" in prompt[0].content
+    assert prompt[-1].content == "halo lagi"
+    assert not memory.compact(messages[:memory.summarized + 1])
+
+
+def test_extractive_summary_when_llm_fails():
+    memory = ConversationMemory(history_tokens=100, summary_tokens=50)
+
+    def broken(prompt):
+        raise RuntimeError("LLM mati")
+
+    assert memory.compact(make_messages(10), summarize=broken)
+    assert "pesan 0" in memory.summary or "pesan" in memory.summary
+    assert count_tokens(memory.summary) <= 50
+
+
+def test_stale_fold_is_discarded_after_reset():
+    memory = ConversationMemory(history_tokens=100, summary_tokens=50)
+    messages = make_messages(10)
+    folded = memory.fold_candidates(messages)
+    generation = memory.generation
+
+    memory.reset()
+    assert not memory.apply_fold(folded, "ringkasan lama", generation)
+    assert memory.summary == "" and memory.summarized == 0
+
+
+def test_forget_and_history_replacement():
+    memory = ConversationMemory(history_tokens=100, summary_tokens=50)
+    messages = make_messages(10)
+    memory.compact(messages)
+    summarized = memory.summarized
+
+    memory.forget(2)
+    assert memory.summarized == summarized - 2
+    memory.recent(messages[:1])  # riwayat diganti yang lebih pendek: ringkasan direset
+    assert memory.summarized == 0 and memory.summary == ""
@@ -0,0 +1,64 @@
+import os
+
+import create_index
+from conftest import SMALL_FAQ, write_faq_csv
+from retriever import FaissRetriever
+from tools import translate_tools
+
+
+def test_incremental_rebuild_embeds_only_changed_rows(small_faq, capsys):
+    create_index.create_faiss_index(bilingual=False)
+    assert "Build penuh: 3 chunk" in capsys.readouterr().out
+    assert os.path.isdir("data/faiss_index") and not os.path.islink("data/faiss_index")
+
+    create_index.create_faiss_index()
+    assert "sudah up-to-date" in capsys.readouterr().out
+
+    write_faq_csv(SMALL_FAQ[:1] + [("2", "What is anxiety?", "Anxiety is worry that does not go away.")])
+    create_index.create_faiss_index()
+    assert "Incremental: 1 chunk baru/berubah, 2 chunk dihapus" in capsys.readouterr().out
+
+    retriever = FaissRetriever("data/faiss_index", search_mode="vector")
+    assert sorted(d.metadata["Question_ID"] for d in retriever.search("anxiety", k=5)) == ["1", "2"]
+
+
+class WordBackend(translate_tools.LocalBackend):
+    """Terjemahan palsu: ganti kata per kata supaya teks berbeda dari aslinya"""
+
+    def __init__(self, words):
+        super().__init__()
+        self.words = words
+
+    def translate_batch(self, texts, target):
+        self.calls += 1
+        for word, translation in self.words.items():
+            texts = [text.replace(word, translation) for text in texts]
+        return texts
+
+
+def use_backend(monkeypatch, words):
+    service = translate_tools.TranslationService(WordBackend(words), cache=None)
+    monkeypatch.setattr(translate_tools, "get_translation_service", lambda: service)
+
+
+def test_bilingual_index_returns_each_source_once(small_faq, monkeypatch):
+    use_backend(monkeypatch, {"What": "Apa", "is": "adalah"})
+    create_index.create_faiss_index(bilingual=True)
+
+    retriever = FaissRetriever("data/faiss_index", search_mode="vector")
+    assert retriever.bilingual
+    for mode in ("vector", "hybrid"):
+        results = retriever.search("Apa adalah depression?", k=3, mode=mode)
+        assert len(results) == 3
+        assert len({d.metadata["Question_ID"] for d in results}) == 3
+
+
+def test_changed_translation_is_embedded_again(small_faq, monkeypatch, capsys):
+    use_backend(monkeypatch, {"What": "Apa"})
+    create_index.create_faiss_index(bilingual=True)
+    capsys.readouterr()
+
+    # Sumber sama, terjemahan berbeda (mis. ganti backend): vektor lama tidak boleh dipakai
+    use_backend(monkeypatch, {"What": "Apakah"})
+    create_index.create_faiss_index()
+    assert "Incremental: 2 chunk baru/berubah, 2 chunk dihapus" in capsys.readouterr().out
@@ -0,0 +1,46 @@
+from embedding_cache import CachedEmbeddings, EmbeddingCache, HashingEmbeddings
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(size=64)
+        self.documents = 0
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        self.documents += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def test_cached_embeddings_embed_each_text_once(tmp_path):
+    base = CountingEmbeddings()
+    embeddings = CachedEmbeddings(base, base.model, cache=EmbeddingCache(str(tmp_path / "c.sqlite")), batch_size=2)
+
+    first = embeddings.embed_documents(["a", "b", "a", "c"])
+    assert base.documents == 3
+    assert embeddings.embed_documents(["c", "a"]) == [first[3], first[0]]
+    assert base.documents == 3
+
+    assert embeddings.embed_queries(["q1", "q2", "q1"])[0] == embeddings.embed_query("q1")
+    assert base.queries == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite"), max_entries=2)
+    cache.put_many({"a": [1.0], "b": [2.0]})
+    cache.get_many(["a"])
+    cache.put_many({"c": [3.0]})
+    assert len(cache) == 2
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    cache.close()
+
+
+def test_hashing_embeddings_are_normalized_and_deterministic():
+    embeddings = HashingEmbeddings(size=32)
+    vector = embeddings.embed_query("apa itu depresi")
+    assert vector == embeddings.embed_documents(["apa itu depresi"])[0]
+    assert abs(sum(v * v for v in vector) - 1.0) < 1e-6
@@ -0,0 +1,15 @@
+import os
+
+from create_index import create_faq_index
+from faq_matcher import FaqMatcher
+
+
+def test_exact_question_matches(small_faq):
+    create_faq_index()
+    assert not os.path.islink("data/faq_index")
+
+    matcher = FaqMatcher("data/faq_index", threshold=0.99)
+    match = matcher.match("What is anxiety?")
+    assert (match.question_id, match.score > 0.99) == ("2", True)
+    assert matcher.match("Bagaimana cuaca hari ini?") is None
+    assert matcher.match("   ") is None
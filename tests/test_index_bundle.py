@@ -0,0 +1,30 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from index_bundle import IndexBundle, has_bundle, write_bundle
+
+
+def test_bundle_round_trip_and_exact_search(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8)).astype("float32")
+    documents = [Document(page_content=f"dokumen {i}", metadata={"i": i}) for i in range(20)]
+    write_bundle(str(tmp_path / "bundle"), [f"id{i}" for i in range(20)], vectors, documents, "model-x")
+    assert has_bundle(str(tmp_path))
+
+    bundle = IndexBundle(str(tmp_path / "bundle"))
+    assert len(bundle) == 20 and bundle.model == "model-x"
+    query = rng.normal(size=8).astype("float32")
+    expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:3]
+    assert [p for p, _ in bundle.search(query, k=3)] == list(expected)
+    assert [p for p, _ in bundle.search_batch([query], k=3)[0]] == list(expected)
+
+    document = bundle.get_document(5)
+    assert (document.id, document.page_content, document.metadata) == ("id5", "dokumen 5", {"i": 5})
+    bundle.close()
+
+
+def test_empty_bundle(tmp_path):
+    write_bundle(str(tmp_path), [], np.zeros((0, 4), dtype="float32"), [], "model-x")
+    bundle = IndexBundle(str(tmp_path))
+    assert bundle.search(np.ones(4), k=3) == []
+    bundle.close()
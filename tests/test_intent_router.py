@@ -0,0 +1,39 @@
+from embedding_cache import HashingEmbeddings
+from intent_router import COPING, CRISIS, DATE, INTENT_EXAMPLES, SAVE_HISTORY, IntentRouter
+
+
+def test_crisis_is_keyword_only():
+    assert CRISIS not in INTENT_EXAMPLES
+    router = IntentRouter()
+    match = router.route("Aku rasa lebih baik aku mati saja")
+    assert (match.intent, match.source) == (CRISIS, "keyword")
+    assert router.route("  ") is None
+
+
+def test_keyword_priority_and_whole_words():
+    router = IntentRouter()
+    assert router.route("Boleh minta tips coping?").intent == COPING
+    assert router.route("Ini hari apa sekarang?").intent == DATE
+    assert router.route("Aku menyimpan riwayatnya sendiri") is None
+
+
+def test_tool_keywords_only_for_standalone_requests():
+    router = IntentRouter()
+    assert router.route("Hari ini tanggal berapa ya?").intent == DATE
+    assert router.route("Tolong simpan chat ini").intent == SAVE_HISTORY
+    # Keyword tool di tengah pertanyaan lain tetap diteruskan ke LLM
+    assert router.route("Tanggal berapa sebaiknya aku mulai terapi?") is None
+    assert router.route("Kalau aku simpan chat ini, apakah psikolog bisa membacanya?") is None
+    # Krisis tetap terdeteksi di mana pun dalam kalimat
+    assert router.route("Tanggal berapa pun aku tetap ingin mati").intent == CRISIS
+
+
+def test_example_match_and_index_reuse(tmp_path):
+    path = str(tmp_path / "intent.npz")
+    router = IntentRouter(HashingEmbeddings(), index_path=path, threshold=0.99)
+    match = router.route("Hari ini hari apa?")
+    assert match.intent == DATE
+    assert router.route("Aku lagi sedih hari ini") is None  # contoh negatif -> LLM
+
+    reloaded = IntentRouter(HashingEmbeddings(), index_path=path)
+    assert (reloaded.vectors == router.vectors).all()
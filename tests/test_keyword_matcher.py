@@ -0,0 +1,35 @@
+from keyword_matcher import KeywordMatcher, spans_with_matches
+
+
+def test_longest_match_first_and_case_insensitive():
+    matcher = KeywordMatcher(["stress", "stress test", "depresi"])
+    matches = matcher.find_all("Stress test bikin DEPRESI dan stress")
+    assert [(m.keyword, m.start, m.end) for m in matches] == [
+        ("stress test", 0, 11), ("depresi", 18, 25), ("stress", 30, 36)
+    ]
+
+
+def test_whole_words():
+    matcher = KeywordMatcher(["mati"], whole_words=True)
+    assert matcher.contains("aku ingin mati")
+    assert not matcher.contains("aku sedang mematikan lampu")
+
+
+def test_highlight_and_spans():
+    matcher = KeywordMatcher(["anxiety"])
+    text = "Calm day. Anxiety again. Fine."
+    matches = matcher.find_all(text)
+    assert matcher.highlight(text, matches) == "Calm day. **ANXIETY** again. Fine."
+    assert spans_with_matches([(0, 9), (10, 24), (25, 30)], matches) == [1]
+
+
+def test_from_file_skips_comments(tmp_path):
+    path = tmp_path / "terms.txt"
+    path.write_text("# glosarium\nterapi\n\nkonseling\n", encoding="utf-8")
+    assert len(KeywordMatcher.from_file(str(path))) == 2
+
+
+def test_empty_matcher():
+    matcher = KeywordMatcher([])
+    assert matcher.find_all("apa saja") == []
+    assert not matcher.contains("apa saja")
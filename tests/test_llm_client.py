@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from llm_client import FakeUpstreamError, FaultyFakeChatModel, LLMClient, LLMTimeoutError, _prompt_key
+
+PROMPT = [HumanMessage(content="halo")]
+
+
+def make_client(model, **kwargs):
+    options = {"timeout": 1.0, "max_retries": 2, "backoff_base": 0.001, "backoff_max": 0.01}
+    options.update(kwargs)
+    return LLMClient(model, **options)
+
+
+class ScriptedFakeChatModel(FaultyFakeChatModel):
+    """Latensi / error per nomor panggilan: script[i] = (delay, gagal?)"""
+
+    script: list = []
+
+    def _inject(self) -> None:
+        delay, fail = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        time.sleep(delay)
+        if fail:
+            raise FakeUpstreamError(f"gagal (panggilan ke-{self.calls})")
+
+
+def test_retry_until_success():
+    model = FaultyFakeChatModel(responses=["oke"], fail_first=2)
+    assert make_client(model).invoke(PROMPT).content == "oke"
+    assert model.calls == 3
+
+
+def test_retries_exhausted_raises_upstream_error():
+    model = FaultyFakeChatModel(responses=["oke"], fail_first=5)
+    with pytest.raises(FakeUpstreamError):
+        make_client(model, max_retries=1).invoke(PROMPT)
+    assert model.calls == 2
+
+
+def test_timeout():
+    model = FaultyFakeChatModel(responses=["oke"], latency=0.5)
+    with pytest.raises(LLMTimeoutError):
+        make_client(model, timeout=0.05, max_retries=0).invoke(PROMPT)
+
+
+def test_identical_prompts_are_coalesced():
+    model = FaultyFakeChatModel(responses=["oke"], latency=0.2)
+    client = make_client(model)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.invoke(PROMPT).content)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["oke"] * 4
+    assert model.calls == 1
+
+
+def test_prompt_key_includes_kwargs():
+    assert _prompt_key(PROMPT, None, "invoke", {"temperature": 0.1}) != _prompt_key(PROMPT, None, "invoke", {"temperature": 0.9})
+    assert _prompt_key(PROMPT, None, "invoke", {"a": 1, "b": 2}) == _prompt_key(PROMPT, None, "invoke", {"b": 2, "a": 1})
+
+
+def test_hedged_request_wins_over_slow_attempt():
+    model = ScriptedFakeChatModel(responses=["oke"], script=[(0.5, False), (0.0, False)])
+    client = make_client(model, max_retries=0, hedge_quantile=0.5)
+    client._latencies.extend([0.01] * 20)
+    start = time.monotonic()
+    assert client.invoke(PROMPT).content == "oke"
+    assert time.monotonic() - start < 0.4
+    assert model.calls == 2
+
+
+def test_error_is_raised_when_hedge_outlives_deadline():
+    # Percobaan pertama gagal, hedge masih berjalan saat deadline: error asli, bukan timeout
+    model = ScriptedFakeChatModel(responses=["oke"], script=[(0.05, True), (1.0, False)])
+    client = make_client(model, timeout=0.2, max_retries=0, hedge_quantile=0.5)
+    client._latencies.extend([0.01] * 20)
+    with pytest.raises(FakeUpstreamError):
+        client.invoke(PROMPT)
+
+
+def test_stream_retries_before_first_chunk():
+    model = FaultyFakeChatModel(responses=["halo juga"], fail_first=1)
+    chunks = list(make_client(model).stream(PROMPT))
+    assert "".join(chunk.content for chunk in chunks) == "halo juga"
+    assert len(chunks) > 1
+    assert model.calls == 2
+
+
+def test_stream_first_chunk_timeout():
+    model = FaultyFakeChatModel(responses=["halo"], latency=0.5)
+    with pytest.raises(LLMTimeoutError):
+        list(make_client(model, timeout=0.05, max_retries=0, backoff_max=0.0).stream(PROMPT))
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pytest
+import streamlit as st
+
+from conftest import ROOT
+
+pytest.importorskip("streamlit.testing.v1")
+from streamlit.testing.v1 import AppTest
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("CONVERSATION_HISTORY_TOKENS", "60")
+    monkeypatch.setenv("CHAT_STATE_MESSAGES", "6")
+    monkeypatch.setenv("CHAT_RENDER_WINDOW", "4")
+    monkeypatch.setenv("CHAT_PAGE_SIZE", "4")
+    # Budget token dibaca saat import; paksa import ulang jika test lain sudah memuatnya
+    monkeypatch.delitem(sys.modules, "conversation_memory", raising=False)
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=30)
+    at.session_state["user_name"] = "Tes"
+    at.session_state["gemini_api"] = "fake"
+    return at
+
+
+def wait_for_compaction(at):
+    job = at.session_state["compact_job"] if "compact_job" in at.session_state else None
+    if job is not None:
+        job["future"].result(timeout=10)
+
+
+def chat(at, count):
+    at.run()
+    for i in range(count):
+        at.chat_input[0].set_value(f"pesan nomor {i} aku sedih").run()
+        wait_for_compaction(at)
+
+
+def rendered(at):
+    return [message.markdown[0].value for message in at.chat_message]
+
+
+def test_trimmed_history_pages_from_store(app, monkeypatch):
+    monkeypatch.setenv("SAVE_CHAT_HISTORY", "on")
+    chat(app, 10)
+    assert app.session_state["evicted_messages"] > 0
+    assert len(app.session_state["messages"]) <= 6
+
+    seen = rendered(app)
+    while any("Muat" in button.label for button in app.button):
+        next(button for button in app.button if "Muat" in button.label).click().run()
+        current = rendered(app)
+        # Halaman baru ditambahkan di atas tanpa celah atau duplikat
+        assert current[-len(seen):] == seen
+        seen = current
+
+    user_messages = [text for text in seen if text.startswith("pesan nomor")]
+    assert user_messages == [f"pesan nomor {i} aku sedih" for i in range(10)]
+    assert seen[0].startswith("Halo Tes!")
+
+
+def test_history_not_persisted_without_opt_in(app):
+    chat(app, 10)
+    assert not app.session_state["persist_history"]
+    assert all("seq" not in message for message in app.session_state["messages"])
+    while any("Muat" in button.label for button in app.button):
+        next(button for button in app.button if "Muat" in button.label).click().run()
+    # Hanya pesan di session_state; yang sudah dikeluarkan tersisa sebagai ringkasan
+    assert len(app.chat_message) == len(app.session_state["messages"])
+    assert [expander.label for expander in app.expander] == [
+        f"🗂️ {app.session_state['evicted_messages']} pesan lama (ringkasan)"
+    ]
+
+
+class UploadedPdf:
+    name = "panduan.pdf"
+    file_id = "panduan"
+
+    def getvalue(self):
+        from benchmarks.pdf_fixtures import make_pdf
+
+        return make_pdf(2, lines_per_page=10)
+
+
+def test_pdf_question_is_sent_once(app, monkeypatch):
+    pytest.importorskip("pdfplumber")
+    monkeypatch.setattr(st, "file_uploader", lambda *args, **kwargs: UploadedPdf())
+    app.run()
+    app.text_input[0].input("Apa gejala depresi?")
+    app.button[-1].click().run()
+    questions = [m for m in app.session_state["messages"] if m["content"] == "Apa gejala depresi?"]
+    assert len(questions) == 1
+
+    # Rerun berikutnya tidak mengirim ulang pertanyaan yang sama
+    app.run()
+    assert [m["content"] for m in app.session_state["messages"]].count("Apa gejala depresi?") == 1
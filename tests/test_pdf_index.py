@@ -0,0 +1,43 @@
+import pytest
+
+from benchmarks.pdf_fixtures import make_pdf
+from embedding_cache import HashingEmbeddings
+
+pytest.importorskip("pdfplumber")
+import pdf_index
+from pdf_index import PdfIndexCache, build_pdf_index
+
+
+def test_build_pdf_index_and_top_k():
+    index = build_pdf_index(make_pdf(3, lines_per_page=10), HashingEmbeddings())
+    assert index.chunks and len(index.vectors) == len(index.chunks)
+    assert {chunk.page for chunk in index.chunks} == {1, 2, 3}
+
+    hits = index.top_k("depression sleep appetite", k=4)
+    assert len(hits) == 4
+    assert [hit.page for hit in hits] == sorted(hit.page for hit in hits)
+    assert index.top_k("   ") == []
+
+
+def test_cache_reuses_index_and_evicts_oldest():
+    cache = PdfIndexCache(HashingEmbeddings(), max_entries=2)
+    pdfs = [make_pdf(1, lines_per_page=5, seed=seed) for seed in range(3)]
+    first = cache.get_or_build(pdfs[0])
+    assert cache.get_or_build(pdfs[0]) is first
+
+    cache.get_or_build(pdfs[1])
+    cache.get_or_build(pdfs[2])
+    assert len(cache) == 2
+    assert cache.get(first.sha256) is None
+
+
+def test_failed_build_releases_its_lock(monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("ekstraksi gagal")
+
+    monkeypatch.setattr(pdf_index, "build_pdf_index", broken)
+    cache = PdfIndexCache(HashingEmbeddings())
+    with pytest.raises(RuntimeError):
+        cache.get_or_build(b"%PDF-rusak")
+    assert cache._building == {}
+    assert len(cache) == 0
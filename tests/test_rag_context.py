@@ -0,0 +1,30 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from conversation_memory import count_tokens
+from rag_context import build_context, dedupe_lexical, mmr_select, trim_sentences
+
+
+def test_mmr_skips_near_duplicates():
+    vectors = np.array([[1.0, 0.0], [1.0, 0.001], [0.7, 0.7]])
+    assert mmr_select(np.array([1.0, 0.0]), vectors, k=3) == [0, 2]
+
+
+def test_dedupe_lexical():
+    texts = ["apa itu depresi", "Apa itu depresi?", "gejala kecemasan"]
+    assert dedupe_lexical(texts, k=3) == [0, 2]
+
+
+def test_trim_keeps_question_and_relevant_sentences():
+    text = "What is sleep? Filler one. Filler two. Sleep hygiene helps insomnia. Filler three. Filler four."
+    trimmed = trim_sentences(text, "insomnia hygiene", max_sentences=2)
+    assert trimmed == "What is sleep? Sleep hygiene helps insomnia."
+
+
+def test_build_context_respects_token_budget():
+    documents = [Document(page_content=f"Question {i}? " + "answer words here. " * 30) for i in range(3)]
+    context = build_context("answer", documents, k=3, token_budget=60)
+    assert context
+    assert sum(count_tokens(d.page_content) for d in context) <= 60
+    assert context[0].metadata["original_chars"] == len(documents[0].page_content)
+    assert build_context("answer", []) == []
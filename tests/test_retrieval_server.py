@@ -0,0 +1,50 @@
+import asyncio
+
+from retrieval_server import MicroBatcher
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.calls = []
+
+    def search_batch(self, queries, k=3, mode=None):
+        self.calls.append((list(queries), k, mode))
+        if "rusak" in queries:
+            raise ValueError("index rusak")
+        return [[f"{query}:{k}:{mode}"] for query in queries]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_requests_are_batched_per_k_and_mode():
+    retriever = FakeRetriever()
+
+    async def scenario():
+        batcher = MicroBatcher(retriever, max_batch=8, max_wait=0.05)
+        runner = asyncio.create_task(batcher.run())
+        results = await asyncio.gather(
+            batcher.submit("a", 3, None), batcher.submit("b", 3, None), batcher.submit("c", 5, "vector")
+        )
+        runner.cancel()
+        return batcher, results
+
+    batcher, results = run(scenario())
+    assert results == [["a:3:None"], ["b:3:None"], ["c:5:vector"]]
+    assert (batcher.batches, batcher.requests) == (1, 3)
+    assert sorted(retriever.calls) == [(["a", "b"], 3, None), (["c"], 5, "vector")]
+
+
+def test_error_is_delivered_to_every_request_in_group():
+    async def scenario():
+        batcher = MicroBatcher(FakeRetriever(), max_batch=8, max_wait=0.05)
+        runner = asyncio.create_task(batcher.run())
+        results = await asyncio.gather(
+            batcher.submit("rusak", 3, None), batcher.submit("x", 3, None), return_exceptions=True
+        )
+        runner.cancel()
+        return results
+
+    results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
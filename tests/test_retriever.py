@@ -0,0 +1,101 @@
+import itertools
+import os
+import shutil
+import threading
+
+import pytest
+
+import retriever as retriever_module
+from embedding_cache import HashingEmbeddings
+from langchain_core.documents import Document
+from retriever import FaissRetriever
+
+
+def test_search_with_cached_embeddings(faiss_index):
+    retriever = FaissRetriever(faiss_index, search_mode="vector")
+    results = retriever.search("What is depression?", k=3)
+    assert len(results) == 3
+
+
+def test_search_with_plain_embeddings(faiss_index):
+    # Embeddings tanpa embed_queries (bukan CachedEmbeddings) tetap harus bisa mencari
+    retriever = FaissRetriever(faiss_index, embeddings=HashingEmbeddings(), search_mode="vector")
+    cached = FaissRetriever(faiss_index, search_mode="vector")
+    assert not hasattr(retriever.embeddings, "embed_queries")
+
+    for mode in ("vector", "hybrid"):
+        results = retriever.search("What is depression?", k=3, mode=mode)
+        assert [d.page_content for d in results] == [
+            d.page_content for d in cached.search("What is depression?", k=3, mode=mode)
+        ]
+
+
+def test_load_waits_for_index_being_published(faiss_index, tmp_path):
+    # Publish di create_index.py: index_path sesaat tidak ada di antara dua rename
+    index_path = str(tmp_path / "faiss_index")
+    staging = str(tmp_path / "staging")
+    shutil.copytree(faiss_index, staging)
+    timer = threading.Timer(0.05, os.rename, (staging, index_path))
+    timer.start()
+    try:
+        retriever = FaissRetriever(index_path, search_mode="vector")
+    finally:
+        timer.join()
+    assert len(retriever.search("What is depression?", k=3)) == 3
+
+
+def test_load_fails_when_build_keeps_changing(faiss_index, monkeypatch):
+    builds = itertools.count()
+    monkeypatch.setattr(retriever_module, "read_index_meta", lambda path: {"build_id": next(builds)})
+    with pytest.raises(RuntimeError, match="build baru"):
+        FaissRetriever(faiss_index, search_mode="vector")
+
+
+class FakeClient:
+    """Pengganti RetrievalClient: jawab dari retriever lokal, atau gagal jika down"""
+
+    def __init__(self, address):
+        self.down = False
+        self.queries = []
+
+    def ping(self):
+        return {"ok": True}
+
+    def search(self, query, k=3, mode=None):
+        if self.down:
+            raise ConnectionError("server mati")
+        self.queries.append(query)
+        return [Document(page_content=f"remote:{query}")]
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    import retrieval_server
+
+    monkeypatch.setattr(retrieval_server, "RetrievalClient", FakeClient)
+
+
+def test_client_mode_routes_every_search_to_server(fake_server, tmp_path):
+    # Index lokal tidak ada: mode client tidak boleh menyentuhnya selama server sehat
+    retriever = FaissRetriever(str(tmp_path / "tidak_ada"), server="unix:/tmp/fake.sock")
+    assert retriever.search("a", k=3)[0].page_content == "remote:a"
+    assert [r[0].page_content for r in retriever.search_batch(["b", "c"], k=3)] == ["remote:b", "remote:c"]
+    documents, vectors, query_vector = retriever.search_with_vectors("d", k=3)
+    assert (documents[0].page_content, vectors, query_vector) == ("remote:d", None, None)
+    assert retriever.client.queries == ["a", "b", "c", "d"]
+    assert retriever.term_weight("depression") is None
+
+
+def test_client_mode_falls_back_to_local_index(fake_server, faiss_index):
+    retriever = FaissRetriever(faiss_index, search_mode="vector", server="unix:/tmp/fake.sock")
+    local = FaissRetriever(faiss_index, search_mode="vector", server=False)
+    retriever.client.down = True
+
+    expected = [d.page_content for d in local.search("What is depression?", k=3)]
+    assert [d.page_content for d in retriever.search("What is depression?", k=3)] == expected
+    documents, vectors, _ = retriever.search_with_vectors("What is depression?", k=3)
+    assert [d.page_content for d in documents] == expected and vectors is not None
+
+    # Server pulih: kembali dilayani server
+    retriever.client.down = False
+    assert retriever.search("x")[0].page_content == "remote:x"
@@ -0,0 +1,60 @@
+from session_store import SessionStore
+
+
+def make_messages(start, count):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"pesan {i}"} for i in range(start, start + count)]
+
+
+def test_sync_marks_seq_and_skips_saved_messages(tmp_path):
+    store = SessionStore(str(tmp_path / "s.sqlite"), flush_interval=0.01)
+    messages = make_messages(0, 3)
+    assert store.sync("a", messages) == 3
+    assert [m["seq"] for m in messages] == [0, 1, 2]
+    messages += make_messages(3, 2)
+    assert store.sync("a", messages) == 2
+    store.flush()
+    assert [m["content"] for m in store.load_last("a", n=10)] == [f"pesan {i}" for i in range(5)]
+    store.close()
+
+
+def test_trim_sync_and_paging(tmp_path):
+    # Alur main.py: sync tiap giliran, pesan lama dikeluarkan dari list, halaman
+    # sebelumnya dibaca mulai dari seq pesan pertama yang masih di list
+    store = SessionStore(str(tmp_path / "s.sqlite"), flush_interval=0.01)
+    messages = make_messages(0, 10)
+    store.sync("a", messages)
+    del messages[:6]
+    messages += make_messages(10, 4)
+    assert store.sync("a", messages) == 4
+    store.flush()
+
+    first_seq = messages[0]["seq"]
+    assert first_seq == 6
+    page = store.load_last("a", n=4, before_seq=first_seq)
+    assert [m["content"] for m in page] == ["pesan 2", "pesan 3", "pesan 4", "pesan 5"]
+    page = store.load_last("a", n=4, before_seq=page[0]["seq"])
+    assert [m["content"] for m in page] == ["pesan 0", "pesan 1"]
+    store.close()
+
+
+def test_seq_continues_after_reopen(tmp_path):
+    path = str(tmp_path / "s.sqlite")
+    store = SessionStore(path)
+    store.sync("a", make_messages(0, 3))
+    store.close()
+
+    store = SessionStore(path)
+    messages = make_messages(3, 2)
+    store.sync("a", messages)
+    assert [m["seq"] for m in messages] == [3, 4]
+    store.close()
+
+
+def test_compact_removes_old_sessions(tmp_path):
+    store = SessionStore(str(tmp_path / "s.sqlite"))
+    store.append("lama", "user", "halo", created_at=1.0)
+    store.append("baru", "user", "halo")
+    stats = store.compact(max_age_days=30)
+    assert stats == {"sessions_removed": 1, "messages_removed": 1}
+    assert [s["session_id"] for s in store.list_sessions()] == ["baru"]
+    store.close()
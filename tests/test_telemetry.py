@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+from telemetry import Histogram, Telemetry, percentile, report
+
+
+def test_histogram_quantile():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float("inf")
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_flush_writes_spans_and_prometheus(tmp_path):
+    telemetry = Telemetry(str(tmp_path / "spans.jsonl"), str(tmp_path / "metrics.prom"))
+    telemetry.observe("llm.generate", 0.2, {"ts": 1.0, "span": "llm.generate", "seconds": 0.2})
+    telemetry.observe("llm.generate", 0.4, {"ts": 2.0, "span": "llm.generate", "seconds": 0.4})
+    telemetry.inc("llm.retries", 2)
+    telemetry.flush()
+
+    stats = report(str(tmp_path / "spans.jsonl"))
+    assert stats["llm.generate"]["count"] == 2
+    assert abs(stats["llm.generate"]["p50_ms"] - 300) < 1e-6
+    assert report(str(tmp_path / "spans.jsonl"), since=1.5)["llm.generate"]["count"] == 1
+
+    text = open(telemetry.prometheus_file(), encoding="utf-8").read()
+    assert "ruangteduh_llm_generate_seconds_count{role=" in text
+    assert "ruangteduh_llm_retries_total{role=" in text and text.rstrip().endswith(" 2.0")
+
+
+def test_report_skips_truncated_lines(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    path.write_text(json.dumps({"ts": 1, "span": "a", "seconds": 0.001}) + "\n{\"ts\": 2, \"sp", encoding="utf-8")
+    assert report(str(path))["a"]["count"] == 1
+
+
+def test_percentile_interpolates():
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
+    assert percentile([], 0.9) == 0.0
+
+
+def test_processes_from_same_script_write_separate_files(tmp_path):
+    script = tmp_path / "replica.py"
+    script.write_text(
+        "import sys\n"
+        "from telemetry import Telemetry\n"
+        "telemetry = Telemetry(sys.argv[1] + '/spans.jsonl', sys.argv[1] + '/metrics.prom')\n"
+        "telemetry.inc('chat.turns')\n"
+        "telemetry.flush()\n"
+        "print(telemetry.prometheus_file())\n",
+        encoding="utf-8",
+    )
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    env.pop("TELEMETRY_ROLE", None)
+    replicas = [
+        subprocess.Popen([sys.executable, str(script), str(tmp_path)], env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(2)
+    ]
+    paths = [replica.communicate(timeout=60)[0].strip() for replica in replicas]
+
+    assert paths[0] != paths[1]
+    for replica, path in zip(replicas, paths):
+        assert os.path.basename(path) == f"metrics.replica-{replica.pid}.prom"
+        assert f'role="replica-{replica.pid}"' in open(path, encoding="utf-8").read()
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from tools.translate_tools import FAILED_TRANSLATION, LocalBackend, TokenBucket, TranslationCache, TranslationService
+
+
+class SlowBackend(LocalBackend):
+    def translate_batch(self, texts, target):
+        time.sleep(0.1)
+        return super().translate_batch(texts, target)
+
+
+class BrokenBackend(LocalBackend):
+    def translate_batch(self, texts, target):
+        self.calls += 1
+        raise RuntimeError("jaringan mati")
+
+
+def test_batch_keeps_order_and_caches(tmp_path):
+    backend = LocalBackend({("hello", "id"): "halo", "sad": "sedih"})
+    cache = TranslationCache(str(tmp_path / "t.sqlite"))
+    service = TranslationService(backend, cache=cache)
+
+    assert service.translate_batch(["hello", "", "sad", "hello"], "id") == ["halo", "", "sedih", "halo"]
+    assert service.translate("sad", "id") == "sedih"
+    assert backend.calls == 1
+
+    # Service baru (memori kosong) membaca dari cache SQLite
+    fresh = TranslationService(LocalBackend(), cache=cache)
+    assert fresh.translate("hello", "id") == "halo"
+    assert fresh.backend.calls == 0
+    cache.close()
+
+
+def test_concurrent_requests_are_coalesced():
+    backend = SlowBackend({"hello": "halo"})
+    service = TranslationService(backend, cache=None)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.translate("hello", "id"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["halo"] * 4
+    assert backend.calls == 1
+
+
+def test_failed_translation_is_not_cached(monkeypatch):
+    monkeypatch.setattr(TranslationService, "BASE_DELAY", 0.0)
+    service = TranslationService(BrokenBackend(), cache=None)
+    assert service.translate("hello", "id") == FAILED_TRANSLATION
+    assert service.backend.calls == TranslationService.MAX_RETRIES
+
+    service.backend = LocalBackend({"hello": "halo"})
+    assert service.translate("hello", "id") == "halo"
+
+
+def test_token_bucket_waits_only_when_empty():
+    bucket = TokenBucket(rate=50, capacity=2)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() > 0.0
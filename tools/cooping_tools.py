@@ -1,5 +1,4 @@
 # mental_health_chatbot/tools/coping_tool.py
-import streamlit as st
 
 COPING_TIPS = [
     "Practice deep breathing: Inhale for 4 seconds, hold for 7, exhale for 8",
@@ -10,9 +9,5 @@ COPING_TIPS = [
 ]
 
 def get_coping_tips():
-    tip = st.session_state.messages.append({
-        "role": "assistant",
-        "content": "Here are some coping strategies you can try:\n\n" + 
-                   "\n".join(f"• {tip}" for tip in COPING_TIPS)
-    })
-    st.rerun()
+    """Daftar strategi coping (dipakai intent router, tanpa LLM)"""
+    return "Here are some coping strategies you can try:\n\n" + "\n".join(f"• {tip}" for tip in COPING_TIPS)
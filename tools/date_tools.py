@@ -1,12 +1,8 @@
 # mental_health_chatbot/tools/date_tool.py
-import streamlit as st
 from datetime import datetime
 
 def show_current_date():
+    """Tanggal hari ini (dipakai intent router, tanpa LLM)"""
     now = datetime.now()
     current_date = now.strftime("%A, %B %d, %Y")
-    st.session_state.message.append({
-        "role": "assistant", 
-        "content": f"Today is {current_date}"
-    })
-    st.rerun()
+    return f"Today is {current_date}"
@@ -1,13 +1,17 @@
 # mental_health_chatbot/tools/save_history_tool.py
-import json
 from datetime import datetime
+from session_store import get_session_store
 
-def save_chat_history(messages):
+def save_chat_history(messages, session_id=None, user=None):
+    """Simpan pesan baru dari riwayat chat ke session store (append, non-blocking).
+
+    Pesan yang tersimpan ditandai key "seq" (urutan pesan di session).
+    """
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"chat_history_{timestamp}.json"
-        
-        with open(filename, "w") as f:
-            json.dump(messages, f, indent=2)
+        # Tanpa session_id: setiap panggilan jadi session baru (perilaku lama: satu file per panggilan)
+        session_id = session_id or f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        get_session_store().sync(session_id, messages, user=user)
+        return session_id
     except Exception as e:
         print(f"Error saving chat history: {str(e)}")
+        return None
@@ -1,31 +1,257 @@
-from deep_translator import GoogleTranslator
-from time import sleep
+# tools/translate_tools.py
+# Layanan terjemahan dengan batch API, cache (LRU di memori + SQLite di disk),
+# rate limiter token bucket (hanya menunggu saat limit benar-benar tercapai)
+# dan penggabungan request yang sama yang sedang berjalan. Backend bisa diganti:
+# TRANSLATION_BACKEND=fake memakai backend lokal (testing offline).
+import os
+import time
 import random
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "data/translation_cache.sqlite")
+DEFAULT_RATE = float(os.getenv("TRANSLATION_RATE", "5"))      # request per detik
+DEFAULT_BURST = int(os.getenv("TRANSLATION_BURST", "5"))
+DEFAULT_MEMORY_ENTRIES = 2048
+DEFAULT_MAX_WORKERS = 4
+FAILED_TRANSLATION = "Translation failed after multiple attempts."
+
+
+class TokenBucket:
+    """Rate limiter: `rate` token per detik, maksimal `capacity` token tersimpan"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Ambil token; tidur hanya jika bucket kosong. Return lama menunggu (detik)"""
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class GoogleBackend:
+    """deep_translator.GoogleTranslator; satu request HTTP per teks"""
+
+    name = "google"
+    max_batch = 1
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _translator(self, target: str):
+        from deep_translator import GoogleTranslator
+
+        # Translator dipakai ulang per thread & bahasa, tidak dibuat per panggilan
+        translators = self._local.__dict__.setdefault("translators", {})
+        if target not in translators:
+            translators[target] = GoogleTranslator(source="auto", target=target)
+        return translators[target]
+
+    def translate_batch(self, texts: List[str], target: str) -> List[str]:
+        translator = self._translator(target)
+        return [translator.translate(text) for text in texts]
+
+
+class LocalBackend:
+    """Backend lokal tanpa jaringan: glosarium {(teks, bahasa): terjemahan} atau {teks: terjemahan}.
+
+    Teks yang tidak ada di glosarium dikembalikan apa adanya.
+    """
+
+    name = "local"
+    max_batch = 256
+
+    def __init__(self, glossary: Optional[Dict] = None):
+        self.glossary = glossary or {}
+        self.calls = 0
+
+    def translate_batch(self, texts: List[str], target: str) -> List[str]:
+        self.calls += 1
+        return [self.glossary.get((text, target), self.glossary.get(text, text)) for text in texts]
+
+
+class TranslationCache:
+    """Cache terjemahan di SQLite, key = hash(backend + bahasa tujuan + teks)"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, text TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                found.update(self._conn.execute(
+                    f"SELECT key, text FROM translations WHERE key IN ({placeholders})", part
+                ).fetchall())
+        return found
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, text) VALUES (?, ?)", list(items.items())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
 
 class TranslationService:
     MAX_RETRIES = 3
     BASE_DELAY = 1.5
 
+    def __init__(
+        self,
+        backend=None,
+        cache: Optional[TranslationCache] = None,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        max_workers: int = DEFAULT_MAX_WORKERS
+    ):
+        self.backend = backend or GoogleBackend()
+        self.cache = cache
+        self.memory_entries = memory_entries
+        self.limiter = TokenBucket(rate, burst)
+        self._memory = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+
+    # API lama (dipakai tools lain) tetap ada, sekarang lewat service bersama
     @staticmethod
     def translate_to_indonesian(text: str) -> str:
-        return TranslationService._translate(text, target='id')
+        return get_translation_service().translate(text, target='id')
 
     @staticmethod
     def translate_to_english(text: str) -> str:
-        return TranslationService._translate(text, target='en')
+        return get_translation_service().translate(text, target='en')
 
-    @staticmethod
-    def _translate(text: str, target: str) -> str:
-        if not text:
-            return ""
-        
-        for attempt in range(TranslationService.MAX_RETRIES):
+    def _key(self, text: str, target: str) -> str:
+        return hashlib.sha256(f"{self.backend.name}\x00{target}\x00{text}".encode("utf-8")).hexdigest()
+
+    def translate(self, text: str, target: str) -> str:
+        return self.translate_batch([text], target)[0]
+
+    def translate_batch(self, texts: List[str], target: str) -> List[str]:
+        """Terjemahkan banyak teks sekaligus; urutan hasil sama dengan input"""
+        keys = {text: self._key(text, target) for text in texts if text}
+        results = self._from_memory(keys.values())
+
+        missing = [key for key in set(keys.values()) if key not in results]
+        if missing and self.cache is not None:
+            stored = self.cache.get_many(missing)
+            self._remember(stored)
+            results.update(stored)
+
+        # Request yang sama dari thread lain sedang berjalan: tunggu hasilnya saja
+        owned, waiting = {}, {}
+        with self._lock:
+            for text, key in keys.items():
+                if key in results or key in owned or key in waiting:
+                    continue
+                if key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    owned[key] = text
+                    self._inflight[key] = Future()
+
+        if owned:
+            results.update(self._translate_owned(owned, target))
+        for key, future in waiting.items():
+            if future.result() is not None:
+                results[key] = future.result()
+
+        return [(results.get(keys[text]) or FAILED_TRANSLATION) if text else "" for text in texts]
+
+    def _translate_owned(self, owned: Dict[str, str], target: str) -> Dict[str, str]:
+        items = list(owned.items())
+        size = max(1, self.backend.max_batch)
+        batches = [items[start:start + size] for start in range(0, len(items), size)]
+        done = {}
+        try:
+            for batch, translated in zip(batches, self._executor.map(lambda b: self._call_backend(b, target), batches)):
+                for (key, _), text in zip(batch, translated):
+                    if text is not None:
+                        done[key] = text
+            self._remember(done)
+            if self.cache is not None:
+                self.cache.put_many(done)
+        finally:
+            # Terjemahan gagal tidak di-cache; penunggu menerima None
+            with self._lock:
+                for key in owned:
+                    self._inflight.pop(key).set_result(done.get(key))
+        return done
+
+    def _call_backend(self, batch, target: str) -> List[Optional[str]]:
+        texts = [text for _, text in batch]
+        for attempt in range(self.MAX_RETRIES):
             try:
-                # Translate using Google Translator
-                translated_text = GoogleTranslator(target=target).translate(text)
-                sleep(random.uniform(TranslationService.BASE_DELAY, TranslationService.BASE_DELAY * 2))
-                return translated_text
+                self.limiter.acquire(len(texts))
+                return self.backend.translate_batch(texts, target)
             except Exception as e:
                 print(f"Translation failed on attempt {attempt + 1}: {e}")
-                sleep(TranslationService.BASE_DELAY)
-        return "Translation failed after multiple attempts."
+                if attempt + 1 < self.MAX_RETRIES:
+                    # Backoff hanya setelah gagal, dengan jitter
+                    time.sleep(random.uniform(self.BASE_DELAY, self.BASE_DELAY * 2) * (2 ** attempt))
+        return [None] * len(texts)
+
+    def _from_memory(self, keys) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        return found
+
+    def _remember(self, items: Dict[str, str]) -> None:
+        with self._lock:
+            for key, text in items.items():
+                self._memory[key] = text
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+
+@lru_cache(maxsize=None)
+def get_translation_service() -> TranslationService:
+    """Satu service per proses (cache & rate limiter dipakai bersama)"""
+    if os.getenv("TRANSLATION_BACKEND", "google").lower() == "fake":
+        return TranslationService(backend=LocalBackend(), cache=None)
+    return TranslationService(cache=TranslationCache())